@@ -0,0 +1,61 @@
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# Format attendu par Whisper : 16 kHz, mono, float32
+SAMPLE_RATE = 16000
+PCM_SUFFIX = '.f32'
+
+
+def decode_to_pcm(source, target):
+    """
+    Décoder un fichier audio (webm/m4a/...) en PCM brut float32 16 kHz mono
+
+    Un seul passage ffmpeg, sans ré-encodage intermédiaire : le fichier
+    produit est directement utilisable par model.transcribe via load_pcm().
+
+    Returns:
+        Path: Chemin du fichier PCM
+    """
+    cmd = [
+        'ffmpeg', '-nostdin', '-threads', '0',
+        '-i', str(source),
+        '-f', 'f32le', '-ac', '1', '-ar', str(SAMPLE_RATE),
+        '-y', str(target)
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Échec du décodage audio: {e.stderr.decode(errors='ignore')[-200:]}") from e
+    return Path(target)
+
+
+def load_pcm(path):
+    """
+    Charger un fichier PCM float32 en tableau numpy projeté en mémoire
+
+    Le mode copy-on-write évite de lire tout le fichier à l'avance tout en
+    donnant un tableau modifiable (requis par torch.from_numpy).
+    """
+    if Path(path).stat().st_size == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode='c')
+
+
+def is_pcm(path):
+    """Indique si le fichier est un PCM brut produit par decode_to_pcm()"""
+    return str(path).endswith(PCM_SUFFIX)
+
+
+def load_audio(path):
+    """
+    Charger un audio en tableau float32 16 kHz mono
+
+    Les PCM bruts sont projetés en mémoire ; les autres formats sont décodés
+    par ffmpeg via Whisper.
+    """
+    if is_pcm(path):
+        return load_pcm(path)
+    from whisper.audio import load_audio as whisper_load_audio
+    return whisper_load_audio(str(path))
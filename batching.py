@@ -0,0 +1,378 @@
+import threading
+import time
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FRAMES, N_SAMPLES
+from whisper.decoding import DecodingOptions
+from whisper.tokenizer import get_tokenizer
+
+from audio import SAMPLE_RATE
+
+# Options de model.transcribe transmises à whisper.decode (la langue est celle de chaque audio)
+DECODE_KEYS = ('task', 'temperature', 'fp16', 'beam_size', 'best_of', 'patience',
+               'length_penalty', 'suppress_tokens', 'suppress_blank')
+
+
+def is_out_of_memory(error):
+    out_of_memory = getattr(torch.cuda, 'OutOfMemoryError', ())
+    return isinstance(error, out_of_memory) or 'out of memory' in str(error).lower()
+
+
+def fit_batch_size(model, max_batch, fp16=False, beams=1):
+    """
+    Taille de lot initiale d'après la mémoire libre du GPU
+
+    Estimation large par fenêtre : activations de l'encodeur (matrice
+    d'attention comprise) et cache KV du décodeur pour chaque faisceau. Hors
+    GPU, max_batch est gardé ; un manque de mémoire réel divise ensuite le
+    lot par deux (voir BatchEngine).
+    """
+    if model.device.type != 'cuda' or max_batch <= 1:
+        return max(1, max_batch)
+    free, _ = torch.cuda.mem_get_info(model.device)
+    dims = model.dims
+    encoder = 8 * dims.n_audio_ctx * dims.n_audio_state + dims.n_audio_head * dims.n_audio_ctx ** 2
+    decoder = 2 * dims.n_text_layer * (dims.n_audio_ctx + dims.n_text_ctx) * dims.n_text_state
+    per_window = (encoder + beams * decoder) * (2 if fp16 else 4)
+    return max(1, min(max_batch, int(0.8 * free // per_window)))
+
+
+class _Stream:
+    def __init__(self, audio, offset_samples, options, n_mels, translate=False):
+        """Un audio transcrit fenêtre par fenêtre (une vidéo ou un morceau de vidéo)"""
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        self.mel = whisper.log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES)
+        self.content_frames = self.mel.shape[-1] - N_FRAMES
+        self.offset = offset_samples / SAMPLE_RATE
+        self.options = options
+        self.language = options.get('language')
+        self.seek = 0
+        self.segments = []
+        self.translation = [] if translate else None
+        self.error = None
+
+    @property
+    def done(self):
+        return self.error is not None or self.seek >= self.content_frames
+
+    @property
+    def key(self):
+        """Fenêtres décodables ensemble : mêmes options et même langue"""
+        options = sorted((name, value) for name, value in self.options.items() if name != 'language')
+        return repr(options), self.language, self.translation is not None
+
+    def window(self):
+        """Fenêtre courante : (mel complété à 30 s, nombre de trames réelles)"""
+        size = min(N_FRAMES, self.content_frames - self.seek)
+        return whisper.pad_or_trim(self.mel[:, self.seek:self.seek + size], N_FRAMES), size
+
+
+def needs_fallback(result, options):
+    """Même critère que model.transcribe pour redécoder à la température suivante"""
+    compression = options.get('compression_ratio_threshold')
+    logprob = options.get('logprob_threshold')
+    no_speech = options.get('no_speech_threshold')
+    if no_speech is not None and logprob is not None and \
+            result.no_speech_prob > no_speech and result.avg_logprob < logprob:
+        return False  # Silence
+    return (compression is not None and result.compression_ratio > compression) or \
+        (logprob is not None and result.avg_logprob < logprob)
+
+
+class BatchEngine:
+    def __init__(self, model, lock, max_batch=8):
+        """
+        Décodage par lots des fenêtres de 30 s de plusieurs audios
+
+        Les threads qui transcrivent avec le même modèle déposent leurs audios
+        (vidéos, ou morceaux d'une longue vidéo) dans le moteur ; à chaque
+        étape, la fenêtre courante de plusieurs audios passe ensemble dans
+        l'encodeur puis dans la recherche gloutonne/en faisceau de
+        whisper.decode. L'étape est exécutée par l'un des threads en attente,
+        sous le verrou d'inférence du modèle.
+
+        Chaque audio avance comme dans model.transcribe (timestamps, saut des
+        silences, repli en température), sans conditionnement sur le texte
+        précédent ni timestamps par mot.
+
+        Avec translate, la sortie de l'encodeur de chaque fenêtre sert aussi
+        au décodage de la traduction anglaise (task='translate') : les deux
+        textes sont produits pour le coût d'un seul passage de l'encodeur.
+
+        Args:
+            model: Modèle Whisper (du registre)
+            lock: Verrou d'inférence du modèle
+            max_batch: Fenêtres décodées ensemble au plus ; la taille réelle est
+                       bornée par la mémoire libre et divisée par deux à chaque
+                       manque de mémoire
+        """
+        self.model = model
+        self.lock = lock
+        self.max_batch = max(1, max_batch)
+        self.batch_size = None
+        self.tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+        self.input_stride = N_FRAMES // model.dims.n_audio_ctx  # Trames mel par token de temps
+        self.time_precision = self.input_stride * HOP_LENGTH / SAMPLE_RATE
+        self._streams = []
+        self._leader = False
+        self._cond = threading.Condition()
+        self._stats = {'batches': 0, 'windows': 0, 'audio_seconds': 0.0, 'busy_seconds': 0.0,
+                       'out_of_memory': 0}
+
+    def transcribe(self, slices, options, translate=False):
+        """
+        Transcrire plusieurs audios, ensemble et avec ceux des autres threads
+
+        Args:
+            slices: (audio float32 16 kHz, position du début en échantillons) de chaque audio
+            options: Options de model.transcribe
+            translate: Produire aussi la traduction anglaise, sur les mêmes fenêtres
+
+        Returns:
+            list: {'segments', 'language'} de chaque audio (et 'translation' :
+                  segments traduits), dans l'ordre de slices (timestamps dans
+                  l'audio complet)
+        """
+        n_mels = self.model.dims.n_mels
+        streams = [_Stream(audio, offset, options, n_mels, translate) for audio, offset in slices]
+        with self._cond:
+            self._streams.extend(stream for stream in streams if not stream.done)
+            self._cond.notify_all()
+
+        try:
+            while True:
+                with self._cond:
+                    while self._leader and not all(stream.done for stream in streams):
+                        self._cond.wait()
+                    if all(stream.done for stream in streams):
+                        break
+                    self._leader = True
+                try:
+                    self._step()
+                finally:
+                    with self._cond:
+                        self._leader = False
+                        self._cond.notify_all()
+        finally:
+            # Sur une erreur, les audios de l'appelant ne restent pas à décoder pour les autres threads
+            with self._cond:
+                self._streams = [stream for stream in self._streams if stream not in streams]
+                self._cond.notify_all()
+
+        for stream in streams:
+            if stream.error is not None:
+                raise stream.error
+        results = []
+        for stream in streams:
+            result = {'segments': stream.segments, 'language': stream.language}
+            if translate:
+                result['translation'] = stream.translation
+            results.append(result)
+        return results
+
+    def stats(self):
+        """
+        Returns:
+            dict: batch_size, batches, windows, audio_seconds, busy_seconds,
+                  out_of_memory et audio_per_second (secondes d'audio par
+                  seconde de décodage)
+        """
+        with self._cond:
+            stats = dict(self._stats, batch_size=self.batch_size or self.max_batch)
+        stats['audio_per_second'] = stats['audio_seconds'] / stats['busy_seconds'] if stats['busy_seconds'] else None
+        return stats
+
+    def _step(self):
+        """Décoder la fenêtre courante d'un lot d'audios et les faire avancer"""
+        with self._cond:
+            if not self._streams:
+                return
+            if self.batch_size is None:
+                options = self._streams[0].options
+                self.batch_size = fit_batch_size(self.model, self.max_batch, self._fp16(options),
+                                                 options.get('beam_size') or 1)
+            # Les audios arrivés en premier d'abord, avec tous ceux décodables en même temps
+            key = self._streams[0].key
+            batch = [stream for stream in self._streams if stream.key == key][:self.batch_size]
+
+        start = time.perf_counter()
+        windows = [stream.window() for stream in batch]
+        with self.lock:
+            while True:
+                try:
+                    results, translations = self._decode([mel for mel, _ in windows], batch[0])
+                    break
+                except Exception as e:
+                    if is_out_of_memory(e) and len(batch) > 1:
+                        # Moitié moins de fenêtres par lot, pour la suite aussi
+                        self.batch_size = max(1, len(batch) // 2)
+                        batch, windows = batch[:self.batch_size], windows[:self.batch_size]
+                        self._stats['out_of_memory'] += 1
+                        if torch.cuda.is_available():
+                            torch.cuda.empty_cache()
+                        continue
+                    for stream in batch:
+                        stream.error = e
+                    results = None
+                    break
+        if results is not None:
+            for index, (stream, (_, size), result) in enumerate(zip(batch, windows, results)):
+                self._advance(stream, size, result, translations[index] if translations else None)
+
+        with self._cond:
+            self._streams = [stream for stream in self._streams if not stream.done]
+            self._stats['batches'] += 1
+            self._stats['windows'] += len(batch)
+            self._stats['audio_seconds'] += sum(size for _, size in windows) * HOP_LENGTH / SAMPLE_RATE
+            self._stats['busy_seconds'] += time.perf_counter() - start
+
+    def _fp16(self, options):
+        return bool(options.get('fp16', True)) and self.model.device.type != 'cpu'
+
+    def _decode(self, mels, first):
+        """
+        Encodeur une fois pour tout le lot, puis whisper.decode pour chaque tâche
+
+        Returns:
+            tuple: (résultats de la transcription, résultats de la traduction ou None)
+        """
+        options = first.options
+        dtype = torch.float16 if self._fp16(options) else torch.float32
+        mel = torch.stack(mels).to(self.model.device).to(dtype)
+        # Sortie de l'encodeur (n, n_audio_ctx, n_audio_state) : whisper.decode ne le relance pas
+        with torch.no_grad():
+            features = self.model.embed_audio(mel)
+        results = self._decode_task(features, first, options.get('task') or 'transcribe')
+        translations = self._decode_task(features, first, 'translate') if first.translation is not None else None
+        return results, translations
+
+    def _decode_task(self, features, first, task):
+        """
+        whisper.decode sur tout le lot, avec repli en température
+
+        Seules les fenêtres dont le résultat est douteux sont redécodées à la
+        température suivante, toujours ensemble.
+        """
+        options = first.options
+        temperature = options.get('temperature', 0.0)
+        temperatures = [temperature] if isinstance(temperature, (int, float)) else list(temperature)
+
+        kwargs = {name: options[name] for name in DECODE_KEYS if options.get(name) is not None}
+        kwargs.pop('temperature', None)
+        kwargs.update(task=task, language=first.language, fp16=self._fp16(options))
+        results = [None] * len(features)
+        pending = list(range(len(features)))
+        for t in temperatures:
+            decode_kwargs = dict(kwargs)
+            if t > 0:
+                decode_kwargs.pop('beam_size', None)
+                decode_kwargs.pop('patience', None)
+            else:
+                decode_kwargs.pop('best_of', None)
+            decoded = whisper.decode(self.model, features[pending], DecodingOptions(temperature=t, **decode_kwargs))
+            for index, result in zip(pending, decoded):
+                results[index] = result
+            pending = [index for index in pending if needs_fallback(results[index], options)]
+            if not pending:
+                break
+        return results
+
+    def _advance(self, stream, size, result, translation=None):
+        """Segments d'une fenêtre décodée et position de la fenêtre suivante (comme model.transcribe)"""
+        options = stream.options
+        if stream.language is None:
+            stream.language = result.language
+
+        no_speech = options.get('no_speech_threshold')
+        logprob = options.get('logprob_threshold')
+        if no_speech is not None and result.no_speech_prob > no_speech and \
+                not (logprob is not None and result.avg_logprob > logprob):
+            stream.seek += size  # Silence : fenêtre suivante
+            return
+
+        segments, advance = self._segments(stream, size, result)
+        stream.segments.extend(segments)
+        if translation is not None:
+            # La fenêtre suivante commence là où s'arrête la transcription : un segment
+            # traduit à cheval est gardé par la fenêtre qui contient son milieu
+            boundary = stream.offset + (stream.seek + advance) * HOP_LENGTH / SAMPLE_RATE
+            translated, _ = self._segments(stream, size, translation)
+            for segment in translated:
+                if advance >= size or (segment['start'] + segment['end']) / 2 < boundary:
+                    segment['id'] = len(stream.translation)
+                    stream.translation.append(segment)
+        stream.seek += max(advance, 1)
+
+    def _segments(self, stream, size, result):
+        """
+        Découper les tokens d'une fenêtre en segments selon leurs timestamps
+
+        Returns:
+            tuple: (segments, trames mel à avancer pour la fenêtre suivante)
+        """
+        tokenizer = self.tokenizer
+        time_offset = stream.seek * HOP_LENGTH / SAMPLE_RATE
+        tokens = np.asarray(result.tokens, dtype=np.int64)
+        is_timestamp = tokens >= tokenizer.timestamp_begin
+        single_timestamp_ending = is_timestamp[-2:].tolist() == [False, True]
+        consecutive = (np.where(is_timestamp[:-1] & is_timestamp[1:])[0] + 1).tolist()
+
+        spans = []
+        if consecutive:
+            if single_timestamp_ending:
+                consecutive.append(len(tokens))
+            last = 0
+            for current in consecutive:
+                sliced = tokens[last:current]
+                spans.append((sliced[0] - tokenizer.timestamp_begin, sliced[-1] - tokenizer.timestamp_begin, sliced))
+                last = current
+            if single_timestamp_ending:
+                advance = size
+            else:
+                # Segment inachevé : la fenêtre suivante reprend au dernier timestamp
+                advance = int(tokens[last - 1] - tokenizer.timestamp_begin) * self.input_stride
+        else:
+            duration = size * HOP_LENGTH / SAMPLE_RATE
+            timestamps = tokens[is_timestamp]
+            if len(timestamps) and timestamps[-1] != tokenizer.timestamp_begin:
+                duration = (timestamps[-1] - tokenizer.timestamp_begin) * self.time_precision
+            spans.append((0, duration / self.time_precision, tokens))
+            advance = size
+
+        segments = []
+        for start, end, sliced in spans:
+            text = tokenizer.decode([int(token) for token in sliced if token < tokenizer.eot])
+            start = time_offset + float(start) * self.time_precision
+            end = time_offset + float(end) * self.time_precision
+            if start == end or not text.strip():
+                continue  # Segment instantané ou sans texte : écarté, comme en séquentiel
+            segments.append({
+                'id': len(stream.segments) + len(segments),
+                'seek': stream.seek,
+                'start': stream.offset + start,
+                'end': stream.offset + end,
+                'text': text,
+                'tokens': [int(token) for token in sliced],
+                'temperature': result.temperature,
+                'avg_logprob': result.avg_logprob,
+                'compression_ratio': result.compression_ratio,
+                'no_speech_prob': result.no_speech_prob,
+            })
+        return segments, advance
+
+
+# Un moteur par modèle : les transcripteurs qui partagent un modèle décodent ensemble
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def shared_engine(model, lock, max_batch=8):
+    """Moteur de décodage par lots du modèle (créé au premier appel, lot au plus grand demandé)"""
+    with _engines_lock:
+        engine = _engines.get(id(model))
+        if engine is None or engine.model is not model:
+            engine = _engines[id(model)] = BatchEngine(model, lock, max_batch)
+        engine.max_batch = max(engine.max_batch, max_batch)
+        return engine
@@ -0,0 +1,108 @@
+"""
+Benchmark du chemin audio : conversion MP3 historique vs décodage PCM direct
+
+Chemin 'mp3' (historique) :
+    webm -> MP3 192k (FFmpegExtractAudio) -> copie en mémoire du fichier
+    -> second décodage ffmpeg MP3 -> PCM par Whisper
+Chemin 'pcm' :
+    webm -> PCM float32 16 kHz mono (un seul décodage) -> memmap
+
+Usage:
+    python benchmarks/bench_audio_decode.py --duration 600
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio import SAMPLE_RATE, decode_to_pcm, load_pcm
+
+
+def make_fixture(path, duration):
+    """Générer un audio opus/webm synthétique (ton + bruit) de la durée voulue"""
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=220:duration={duration}',
+        '-f', 'lavfi', '-i', f'anoisesrc=amplitude=0.05:duration={duration}',
+        '-filter_complex', 'amix=inputs=2', '-ac', '2', '-ar', '48000',
+        '-c:a', 'libopus', '-b:a', '128k', str(path)
+    ], check=True)
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure(func):
+    cpu_start, wall_start = children_cpu(), time.perf_counter()
+    io_bytes = func()
+    return {
+        'cpu_s': children_cpu() - cpu_start,
+        'wall_s': time.perf_counter() - wall_start,
+        'io_bytes': io_bytes,
+    }
+
+
+def mp3_path(source, work_dir):
+    """Chemin historique : encodage MP3, copie, décodage par Whisper"""
+    mp3 = work_dir / 'audio.mp3'
+    subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-i', str(source),
+                    '-vn', '-c:a', 'libmp3lame', '-b:a', '192k', str(mp3)], check=True)
+    copy = work_dir / 'whisper_temp.mp3'
+    data = mp3.read_bytes()
+    copy.write_bytes(data)
+    # Équivalent de whisper.audio.load_audio
+    out = subprocess.run(['ffmpeg', '-nostdin', '-threads', '0', '-i', str(copy),
+                          '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-'],
+                         capture_output=True, check=True).stdout
+    # Écriture MP3 + lecture/écriture de la copie + relecture par ffmpeg
+    return len(data) * 4 + len(out)
+
+
+def pcm_path(source, work_dir):
+    """Nouveau chemin : un seul décodage vers un PCM projeté en mémoire"""
+    target = decode_to_pcm(source, work_dir / 'audio.f32')
+    audio = load_pcm(target)
+    audio.sum()  # Forcer la lecture des pages
+    return target.stat().st_size * 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duration', type=int, default=600, help='Durée du fixture en secondes')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_audio_'))
+    try:
+        source = work_dir / 'source.webm'
+        make_fixture(source, args.duration)
+
+        results = {'duration_s': args.duration}
+        for name, func in (('mp3', mp3_path), ('pcm', pcm_path)):
+            results[name] = measure(lambda: func(source, work_dir))
+
+        # Ramener à une heure d'audio
+        scale = 3600 / args.duration
+        results['saved_per_hour'] = {
+            'cpu_s': (results['mp3']['cpu_s'] - results['pcm']['cpu_s']) * scale,
+            'wall_s': (results['mp3']['wall_s'] - results['pcm']['wall_s']) * scale,
+            'io_mb': (results['mp3']['io_bytes'] - results['pcm']['io_bytes']) * scale / 1e6,
+        }
+        print(json.dumps(results, indent=2))
+        if args.output:
+            Path(args.output).write_text(json.dumps(results, indent=2))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Décodage par lots : débit (secondes d'audio par seconde) selon la taille des lots
+
+Chaque taille de lot est mesurée dans son propre processus : --videos
+transcripteurs partageant un modèle du registre transcrivent les fixtures
+en même temps (un thread par vidéo, comme le service HTTP ou le pipeline).
+Avec --batch-sizes 1, les vidéos passent à tour de rôle dans
+model.transcribe ; au-delà, leurs fenêtres de 30 s (et celles des morceaux
+de chaque vidéo) sont décodées ensemble par batching.BatchEngine.
+
+Mesures par taille de lot :
+    audio_per_second    secondes d'audio transcrites par seconde écoulée
+    speedup             par rapport à la première taille de --batch-sizes
+    batch_size          taille réelle après adaptation à la mémoire
+    out_of_memory       lots divisés par deux faute de mémoire
+    wer                 écart de texte avec la première taille (avec --audio)
+
+Échoue (code 1) si le WER dépasse --max-wer sur de vrais enregistrements.
+
+Usage:
+    python benchmarks/bench_batching.py -m small -d cuda --batch-sizes 1,8,16 --videos 8
+    python benchmarks/bench_batching.py -m tiny -d cpu --audio interview.wav conference.mp3
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import make_fixtures
+
+
+def run_batch_size(model_size, device, batch_size, audio_paths, output_dir):
+    """Transcrire toutes les vidéos en même temps avec cette taille de lot (processus dédié)"""
+    from audio import SAMPLE_RATE, load_audio
+    from models import peak_rss_bytes
+    from transcriber import YouTubeTranscriber
+
+    transcribers = [
+        YouTubeTranscriber(output_dir=output_dir, model_size=model_size, device=device,
+                           use_cache=False, batch_size=batch_size)
+        for _ in audio_paths
+    ]
+    audio_seconds = sum(len(load_audio(path)) for path in audio_paths) / SAMPLE_RATE
+    texts = {}
+
+    def transcribe(transcriber, path):
+        result = transcriber.transcribe_audio(path)
+        texts[Path(path).name] = result['text'] if result else None
+
+    threads = [threading.Thread(target=transcribe, args=(transcriber, path))
+               for transcriber, path in zip(transcribers, audio_paths)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    engine = transcribers[0].batch_engine
+    stats = engine.stats() if engine else {}
+    return {
+        'wall_s': round(wall, 3),
+        'audio_seconds': round(audio_seconds, 1),
+        'audio_per_second': round(audio_seconds / wall, 2),
+        'batch_size': stats.get('batch_size', 1),
+        'windows_per_batch': round(stats['windows'] / stats['batches'], 2) if stats.get('batches') else 1.0,
+        'out_of_memory': stats.get('out_of_memory', 0),
+        'failed': sum(text is None for text in texts.values()),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'texts': texts,
+    }
+
+
+def main():
+    from quality import word_error_rate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-m', '--model', default='tiny', help='Taille du modèle Whisper')
+    parser.add_argument('-d', '--device', default='cpu', help='cuda, mps ou cpu')
+    parser.add_argument('--batch-sizes', default='1,4,8', help='Tailles de lot comparées (la première sert de référence)')
+    parser.add_argument('--videos', type=int, default=4, help='Vidéos transcrites en même temps (fixtures générées)')
+    parser.add_argument('--duration', type=int, default=120, help='Durée de chaque fixture générée (s)')
+    parser.add_argument('--audio', nargs='*', default=[], help='Enregistrements de parole (remplacent les fixtures)')
+    parser.add_argument('--max-wer', type=float, default=0.1, help='WER maximal toléré par rapport à la référence')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',')]
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_batching_'))
+    try:
+        audio_paths = [str(Path(path).resolve()) for path in args.audio]
+        if not audio_paths:
+            print('Pas de --audio : fixtures synthétiques, WER non significatif', file=sys.stderr)
+            fixtures = make_fixtures(work_dir / 'fixtures', ['speech'], [args.duration])
+            fixture, _ = next(iter(fixtures.values()))
+            # Copies distinctes : une vidéo par transcripteur
+            for index in range(args.videos):
+                path = work_dir / 'fixtures' / f'video-{index}{fixture.suffix}'
+                shutil.copyfile(fixture, path)
+                audio_paths.append(str(path))
+
+        results = {}
+        context = multiprocessing.get_context('spawn')
+        for batch_size in batch_sizes:
+            print(f'Lots de {batch_size}: transcription de {len(audio_paths)} vidéo(s)...', file=sys.stderr, flush=True)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[batch_size] = executor.submit(run_batch_size, args.model, args.device, batch_size,
+                                                      audio_paths, str(work_dir / f'out-{batch_size}')).result()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    reference = results[batch_sizes[0]]
+    errors = []
+    for batch_size, result in results.items():
+        result['speedup'] = round(result['audio_per_second'] / reference['audio_per_second'], 3)
+        if batch_size != batch_sizes[0]:
+            wers = [word_error_rate(reference['texts'][name], text)
+                    for name, text in result['texts'].items() if text is not None and reference['texts'][name]]
+            result['wer'] = round(sum(wers) / len(wers), 4) if wers else None
+            if args.audio and result['wer'] is not None and result['wer'] > args.max_wer:
+                errors.append(f'Lots de {batch_size}: WER {result["wer"]:.2%} au-dessus de {args.max_wer:.0%}')
+        if result['failed']:
+            errors.append(f"Lots de {batch_size}: {result['failed']} transcription(s) en échec")
+        print(f"Lots de {batch_size} (réel {result['batch_size']}, {result['windows_per_batch']} fenêtres par lot): "
+              f"{result['audio_per_second']:.1f} s d'audio/s, x{result['speedup']}", file=sys.stderr)
+    for result in results.values():
+        del result['texts']
+
+    output = json.dumps({'model': args.model, 'device': args.device, 'videos': len(audio_paths),
+                         'results': results}, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
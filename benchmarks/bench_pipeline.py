@@ -0,0 +1,265 @@
+"""
+Benchmark reproductible du pipeline complet, sans réseau
+
+Fixtures synthétiques et de type parole de plusieurs durées, servies par un
+serveur HTTP local (yt-dlp les télécharge avec son extracteur générique).
+Mesure :
+    process_video        de bout en bout (téléchargement -> fichier .txt)
+    download_audio       téléchargement + décodage PCM
+    transcribe_audio     transcription d'un PCM déjà décodé
+    clean_repetitions    nettoyage d'un texte de 10k / 100k mots
+    save_transcription   écriture d'un résultat de 100k mots
+
+Pour chaque mesure : temps (médiane sur --repeat), facteur temps réel (RTF),
+pic de mémoire du processus et détail par étape (metrics.Metrics). Les
+résultats sont comparés à une référence enregistrée ; une mesure plus lente
+que la référence de plus de --tolerance fait échouer le script (code 1).
+
+Usage:
+    python benchmarks/bench_pipeline.py -m tiny -d cpu --save-baseline
+    python benchmarks/bench_pipeline.py -m tiny -d cpu --durations 30,120,600 --output run.json
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import FixtureServer, make_fixtures
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / 'baseline.json'
+
+
+class _Messages:
+    """File de messages silencieuse qui garde la dernière erreur du transcripteur"""
+    def __init__(self):
+        self.last_error = None
+
+    def put(self, message):
+        msg_type, content, extra = message
+        if msg_type == 'log' and extra == 'ERROR':
+            self.last_error = content.strip()
+
+
+def repetitive_text(words, seed=0):
+    """Texte de type transcription, avec des boucles d'hallucination de Whisper"""
+    import random
+
+    rng = random.Random(seed)
+    vocabulary = ('le modèle transcrit la vidéo avec une bonne précision mais il arrive '
+                  'que la même phrase revienne plusieurs fois de suite').split()
+    out = []
+    while len(out) < words:
+        if rng.random() < 0.05:
+            loop = [rng.choice(vocabulary) for _ in range(rng.randint(1, 6))]
+            out.extend(loop * rng.randint(3, 12))
+        else:
+            out.extend(rng.choice(vocabulary) for _ in range(rng.randint(5, 20)))
+    return ' '.join(out[:words])
+
+
+def timed(func, repeat):
+    """Exécuter func repeat fois ; médiane des durées et dernier résultat"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations), result
+
+
+def stage_seconds(metrics):
+    return {name: round(totals['seconds'], 4) for name, totals in metrics.summary()['stages'].items()}
+
+
+def run_benchmarks(args, work_dir):
+    from metrics import Metrics
+    from models import peak_rss_bytes
+    from transcriber import YouTubeTranscriber
+
+    fixtures = make_fixtures(args.fixtures_dir or work_dir / 'fixtures', args.kinds, args.durations,
+                             args.speech_file)
+    results = {}
+
+    def record(name, wall, audio_seconds=None, metrics=None, **extra):
+        entry = {'wall_s': round(wall, 4)}
+        if audio_seconds:
+            entry['audio_seconds'] = audio_seconds
+            entry['rtf'] = round(wall / audio_seconds, 4)
+        entry['peak_rss_bytes'] = peak_rss_bytes()
+        if metrics:
+            entry['stages'] = stage_seconds(metrics)
+        entry.update(extra)
+        results[name] = entry
+        print(f"{name:<40} {wall:8.3f} s" + (f"  RTF {entry['rtf']:.3f}" if audio_seconds else ''),
+              file=sys.stderr, flush=True)
+
+    messages = _Messages()
+
+    def make_transcriber(output_dir, metrics=None):
+        return YouTubeTranscriber(output_dir=str(output_dir), model_size=args.model, device=args.device,
+                                  message_queue=messages, use_cache=False, vad=args.vad,
+                                  metrics=metrics)
+
+    start = time.perf_counter()
+    transcriber = make_transcriber(work_dir / 'out')
+    record('model_load', time.perf_counter() - start)
+
+    with FixtureServer(next(iter(fixtures.values()))[0].parent) as server:
+        for name, (path, duration) in fixtures.items():
+            url = server.url(path.name)
+
+            # Bout en bout : un transcripteur neuf (modèle partagé) par exécution
+            metrics = Metrics()
+
+            def end_to_end():
+                output_dir = work_dir / 'e2e'
+                shutil.rmtree(output_dir, ignore_errors=True)
+                if not make_transcriber(output_dir, metrics).process_video(url):
+                    raise RuntimeError(f'process_video a échoué pour {name}: {messages.last_error}')
+            wall, _ = timed(end_to_end, args.repeat)
+            record(f'process_video/{name}', wall, duration, metrics)
+
+            metrics = Metrics()
+            transcriber.metrics = metrics
+
+            def download():
+                audio_path, _ = transcriber.download_audio(url)
+                if not audio_path:
+                    raise RuntimeError(f'download_audio a échoué pour {name}: {messages.last_error}')
+                transcriber.discard_audio(audio_path)
+            wall, _ = timed(download, args.repeat)
+            record(f'download_audio/{name}', wall, duration, metrics,
+                   bytes=path.stat().st_size)
+
+            audio_path, _ = transcriber.download_audio(url)
+            metrics = Metrics()
+            transcriber.metrics = metrics
+            try:
+                wall, result = timed(lambda: transcriber.transcribe_audio(audio_path), args.repeat)
+            finally:
+                transcriber.discard_audio(audio_path)
+            record(f'transcribe_audio/{name}', wall, duration, metrics,
+                   segments=len(result['segments']) if result else 0)
+
+    for words in (10_000, 100_000):
+        text = repetitive_text(words)
+        wall, cleaned = timed(lambda: transcriber.clean_repetitions(text), args.repeat)
+        record(f'clean_repetitions/{words // 1000}k_words', wall,
+               words_in=words, words_out=len(cleaned.split()))
+
+    text = repetitive_text(100_000)
+    transcription = {'text': text, 'language': 'fr',
+                     'segments': [{'id': 0, 'start': 0.0, 'end': 1.0, 'text': text}]}
+    transcriber.output_dir = work_dir / 'save'
+    transcriber.output_dir.mkdir(exist_ok=True)
+    wall, _ = timed(lambda: transcriber.save_transcription(transcription, 'Benchmark', 'benchmark00'),
+                    args.repeat)
+    record('save_transcription/100k_words', wall)
+
+    transcriber.close()
+    return results
+
+
+def environment(args):
+    import torch
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'torch': torch.__version__,
+        'model': args.model,
+        'device': args.device,
+        'vad': args.vad,
+        'repeat': args.repeat,
+        'threads': torch.get_num_threads(),
+    }
+
+
+def compare(results, baseline, tolerance, min_delta=0.05):
+    """
+    Comparer chaque mesure à la référence
+
+    Un écart de moins de min_delta secondes n'est jamais une régression
+    (bruit de mesure sur les opérations de quelques millisecondes).
+
+    Returns:
+        list: Noms des mesures plus lentes que la référence de plus de tolerance
+    """
+    regressions = []
+    print(f"\n{'mesure':<40} {'référence':>10} {'actuel':>10} {'écart':>8}", file=sys.stderr)
+    for name, entry in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference.get('wall_s'):
+            continue
+        change = entry['wall_s'] / reference['wall_s'] - 1
+        flag = ''
+        if change > tolerance and entry['wall_s'] - reference['wall_s'] > min_delta:
+            regressions.append(name)
+            flag = '  RÉGRESSION'
+        print(f"{name:<40} {reference['wall_s']:10.3f} {entry['wall_s']:10.3f} {change:+8.1%}{flag}",
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-m', '--model', default='tiny', help='Taille du modèle Whisper')
+    parser.add_argument('-d', '--device', default='cpu', help='cuda, mps ou cpu')
+    parser.add_argument('--durations', default='30,120', help='Durées des fixtures en secondes (liste)')
+    parser.add_argument('--kinds', default='synthetic,speech', help='Familles de fixtures (liste)')
+    parser.add_argument('--speech-file', help='Enregistrement de parole réel à utiliser pour les fixtures speech')
+    parser.add_argument('--fixtures-dir', type=Path, help='Dossier des fixtures, réutilisées entre exécutions')
+    parser.add_argument('--vad', action='store_true', help='Activer le pré-filtre des silences')
+    parser.add_argument('--repeat', type=int, default=1, help='Exécutions par mesure (médiane)')
+    parser.add_argument('--output', help='Fichier JSON de résultats (défaut: sortie standard)')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Fichier de référence')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer les résultats comme référence')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Ralentissement toléré par rapport à la référence (0.2 = +20 %%)')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='Écart minimal (secondes) pour signaler une régression')
+    args = parser.parse_args()
+    args.durations = [int(d) for d in args.durations.split(',')]
+    args.kinds = args.kinds.split(',')
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_pipeline_'))
+    try:
+        report = {'environment': environment(args), 'results': run_benchmarks(args, work_dir)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    else:
+        print(output)
+
+    if args.save_baseline:
+        args.baseline.write_text(output, encoding='utf-8')
+        print(f'Référence enregistrée: {args.baseline}', file=sys.stderr)
+        return 0
+    if not args.baseline.exists():
+        print(f'Pas de référence ({args.baseline}) : comparaison ignorée', file=sys.stderr)
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    if baseline.get('environment') != report['environment']:
+        print('Attention: référence mesurée dans un autre environnement', file=sys.stderr)
+    regressions = compare(report['results'], baseline['results'], args.tolerance, args.min_delta)
+    if regressions:
+        print(f"{len(regressions)} régression(s): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
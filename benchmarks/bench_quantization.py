@@ -0,0 +1,141 @@
+"""
+Précision réduite sur CPU : mémoire, vitesse et WER par rapport au fp32
+
+Chaque précision (fp32, int8, ...) est mesurée dans son propre processus
+(pic mémoire non faussé par l'autre modèle) : chargement, taille des poids,
+temps de transcription de chaque fixture. La transcription fp32 sert de
+référence pour le taux d'erreur par mot (WER) des autres précisions ; le
+script échoue (code 1) si le WER dépasse --max-wer.
+
+Le WER n'a de sens que sur de la vraie parole : passer des enregistrements
+avec --audio (sinon des fixtures synthétiques de type parole sont générées,
+utiles seulement pour la mémoire et la vitesse).
+
+Usage:
+    python benchmarks/bench_quantization.py -m large-v3 --audio interview.wav conference.mp3
+    python benchmarks/bench_quantization.py -m small --dtypes fp32,int8 --max-wer 0.03
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import make_fixtures
+
+
+def run_dtype(model_size, dtype, audio_paths, output_dir, threads):
+    """Charger le modèle dans cette précision et transcrire toutes les fixtures (processus dédié)"""
+    import torch
+    from audio import SAMPLE_RATE, load_audio
+    from models import registry
+    from transcriber import YouTubeTranscriber
+
+    if threads:
+        torch.set_num_threads(threads)
+    start = time.perf_counter()
+    transcriber = YouTubeTranscriber(output_dir=output_dir, model_size=model_size, device='cpu',
+                                     use_cache=False, dtype=dtype)
+    load_seconds = time.perf_counter() - start
+
+    fixtures = {}
+    for path in audio_paths:
+        duration = len(load_audio(path)) / SAMPLE_RATE
+        start = time.perf_counter()
+        result = transcriber.transcribe_audio(path)
+        seconds = time.perf_counter() - start
+        fixtures[Path(path).name] = {
+            'seconds': round(seconds, 3),
+            'rtf': round(seconds / duration, 4) if duration else None,
+            'text': result['text'] if result else '',
+        }
+
+    stats = registry.memory_usage()
+    return {
+        'load_seconds': round(load_seconds, 3),
+        'model_bytes': stats['total_model_bytes'],
+        'peak_rss_bytes': stats['peak_rss_bytes'],
+        'transcribe_seconds': round(sum(f['seconds'] for f in fixtures.values()), 3),
+        'fixtures': fixtures,
+    }
+
+
+def main():
+    from quality import word_error_rate
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-m', '--model', default='small', help='Taille du modèle Whisper')
+    parser.add_argument('--dtypes', default='fp32,int8', help='Précisions à comparer (la première sert de référence)')
+    parser.add_argument('--audio', nargs='*', default=[], help='Enregistrements de parole (fixtures du WER)')
+    parser.add_argument('--durations', default='30,120', help='Durées des fixtures générées sans --audio')
+    parser.add_argument('-t', '--threads', type=int, help='Threads torch')
+    parser.add_argument('--max-wer', type=float, default=0.05, help='WER maximal toléré par rapport à la référence')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+    dtypes = args.dtypes.split(',')
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_quant_'))
+    try:
+        audio_paths = [str(Path(p).resolve()) for p in args.audio]
+        if not audio_paths:
+            print('Pas de --audio : fixtures synthétiques, WER non significatif', file=sys.stderr)
+            durations = [int(d) for d in args.durations.split(',')]
+            fixtures = make_fixtures(work_dir / 'fixtures', ['speech'], durations)
+            audio_paths = [str(path) for path, _ in fixtures.values()]
+
+        results = {}
+        context = multiprocessing.get_context('spawn')
+        for dtype in dtypes:
+            print(f'{dtype}: chargement et transcription...', file=sys.stderr, flush=True)
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[dtype] = executor.submit(run_dtype, args.model, dtype, audio_paths,
+                                                 str(work_dir / dtype), args.threads).result()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    reference = results[dtypes[0]]
+    failed = []
+    for dtype in dtypes[1:]:
+        result = results[dtype]
+        wers = {
+            name: word_error_rate(reference['fixtures'][name]['text'], fixture['text'])
+            for name, fixture in result['fixtures'].items()
+        }
+        result['wer'] = {name: round(wer, 4) for name, wer in wers.items()}
+        result['wer_mean'] = round(sum(wers.values()) / max(1, len(wers)), 4)
+        result['vs_reference'] = {
+            'model_bytes': round(result['model_bytes'] / reference['model_bytes'], 3),
+            'peak_rss_bytes': round(result['peak_rss_bytes'] / reference['peak_rss_bytes'], 3)
+            if result['peak_rss_bytes'] and reference['peak_rss_bytes'] else None,
+            'transcribe_seconds': round(result['transcribe_seconds'] / reference['transcribe_seconds'], 3)
+            if reference['transcribe_seconds'] else None,
+        }
+        ratios = result['vs_reference']
+        print(f"{dtype} / {dtypes[0]}: poids x{ratios['model_bytes']}, pic mémoire x{ratios['peak_rss_bytes']}, "
+              f"temps x{ratios['transcribe_seconds']}, WER {result['wer_mean']:.2%}", file=sys.stderr)
+        if result['wer_mean'] > args.max_wer:
+            failed.append(dtype)
+
+    for result in results.values():
+        for fixture in result['fixtures'].values():
+            fixture['text'] = fixture['text'][:200]
+    output = json.dumps({'model': args.model, 'reference': dtypes[0], 'results': results},
+                        indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+
+    if failed:
+        print(f"WER au-dessus de {args.max_wer:.0%}: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark de la détection des boucles de répétition (repetitions.py)
+
+Textes de type transcription de 100k à 1M mots contenant des boucles de 1 à
+6 mots. Mesure clean_text (texte brut) et clean_segments (segments Whisper de
+~12 mots) et vérifie que le temps par mot reste constant : le script échoue
+(code 1) si le plus grand texte coûte plus de --max-slowdown fois plus par
+mot que le plus petit, ou si une phrase ordinaire (REGRESSIONS) est modifiée
+autrement qu'attendu.
+
+Usage:
+    python benchmarks/bench_repetitions.py --words 100000,1000000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_pipeline import repetitive_text
+from repetitions import clean_segments, clean_text
+
+
+# Phrases courantes qui ne sont pas des boucles d'hallucination : texte -> résultat attendu
+REGRESSIONS = {
+    'step by step by step we go': 'step by step by step we go',
+    'more and more and more people': 'more and more and more people',
+    'New York, New York, New Jersey and more': 'New York, New York, New Jersey and more',
+    # Trois copies complètes de "it is what" : la troisième est en trop, la fin partielle reste
+    'It is what it is, what it is, what it is': 'It is what it is, what it is',
+    'merci merci merci merci merci beaucoup': 'merci merci merci beaucoup',
+}
+
+
+def check_regressions():
+    """
+    Returns:
+        list: Messages d'erreur des phrases mal nettoyées
+    """
+    errors = []
+    for text, expected in REGRESSIONS.items():
+        cleaned = clean_text(text)
+        segments, _ = clean_segments([{'id': 0, 'start': 0.0, 'end': 5.0, 'text': ' ' + text}])
+        for got in (cleaned, ''.join(segment['text'] for segment in segments).strip()):
+            if got != expected:
+                errors.append(f'{text!r} -> {got!r} (attendu {expected!r})')
+    return errors
+
+
+def to_segments(text, words_per_segment=12):
+    words = text.split()
+    return [
+        {'id': i, 'start': float(i), 'end': float(i + 1),
+         'text': ' ' + ' '.join(words[start:start + words_per_segment])}
+        for i, start in enumerate(range(0, len(words), words_per_segment))
+    ]
+
+
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--words', default='100000,300000,1000000', help='Tailles des textes (liste)')
+    parser.add_argument('--max-slowdown', type=float, default=2.0,
+                        help='Rapport maximal du temps par mot entre le plus grand et le plus petit texte')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+
+    results = {}
+    for words in sorted(int(w) for w in args.words.split(',')):
+        text = repetitive_text(words)
+        segments = to_segments(text)
+        text_s, cleaned = measure(lambda: clean_text(text))
+        segments_s, (_, removed) = measure(lambda: clean_segments(segments))
+        results[words] = {
+            'clean_text_s': round(text_s, 4),
+            'clean_segments_s': round(segments_s, 4),
+            'words_per_second': round(words / segments_s),
+            'words_removed': removed,
+            'words_out': len(cleaned.split()),
+        }
+        print(f"{words:>9} mots: texte {text_s:.3f} s, segments {segments_s:.3f} s "
+              f"({words / segments_s / 1e6:.2f} M mots/s), {removed} mots supprimés", file=sys.stderr)
+
+    sizes = sorted(results)
+    per_word = [results[size]['clean_segments_s'] / size for size in sizes]
+    slowdown = per_word[-1] / per_word[0]
+    report = {'results': results, 'per_word_slowdown': round(slowdown, 2)}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output)
+
+    errors = check_regressions()
+    if slowdown > args.max_slowdown:
+        errors.append(f'Temps par mot x{slowdown:.1f} entre {sizes[0]} et {sizes[-1]} mots : pas linéaire')
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Ordonnancement d'un lot : durée totale (makespan) selon l'ordre des vidéos
+
+Simule des lots mêlant vidéos courtes et longues, dans l'ordre où elles ont
+été collées, traités par N workers : chaque vidéo part sur le premier
+worker libre et l'occupe durée x RTF. L'ordre « la plus longue d'abord »
+est celui que donne réellement JobStore.claim(longest_first=True) (les
+vidéos passent par une file temporaire), comparé à l'ordre de soumission et
+à la borne inférieure max(durée totale / N, plus longue vidéo).
+
+Échoue (code 1) si l'ordre par durée est plus lent que l'ordre de
+soumission sur un des lots.
+
+Usage:
+    python benchmarks/bench_scheduling.py
+    python benchmarks/bench_scheduling.py --workers 2,4,8 --videos 40 --long-share 0.15 --batches 20
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jobs import JobStore
+from scheduling import simulate_makespan
+
+
+def mixed_batch(videos, long_share, seed):
+    """Durées (s) d'un lot : extraits de 2 à 15 min, et une part de vidéos de 1 à 3 h"""
+    rng = random.Random(seed)
+    return [rng.uniform(3600, 3 * 3600) if rng.random() < long_share else rng.uniform(120, 900)
+            for _ in range(videos)]
+
+
+def store_order(durations, longest_first):
+    """Ordre de traitement donné par la file persistante"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = JobStore(Path(temp_dir) / 'jobs.db')
+        urls = [f'https://youtu.be/bench{index:06d}' for index in range(len(durations))]
+        keys = store.submit(urls)
+        store.set_durations(dict(zip(keys, durations)))
+        by_key = dict(zip(keys, durations))
+        order = []
+        while True:
+            job = store.claim(longest_first)
+            if job is None:
+                return order
+            order.append(by_key[job['key']])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='2,4,8', help='Nombres de workers simulés')
+    parser.add_argument('--videos', type=int, default=40, help='Vidéos par lot')
+    parser.add_argument('--long-share', type=float, default=0.15, help='Part de vidéos longues')
+    parser.add_argument('--batches', type=int, default=20, help='Lots simulés (graines différentes)')
+    parser.add_argument('--rtf', type=float, default=0.3, help='Temps de traitement par seconde d\'audio')
+    args = parser.parse_args()
+
+    results = {}
+    slower = 0
+    for workers in (int(w) for w in args.workers.split(',')):
+        fifo, lpt, bound = [], [], []
+        for seed in range(args.batches):
+            durations = mixed_batch(args.videos, args.long_share, seed)
+            fifo.append(simulate_makespan(store_order(durations, False), workers, args.rtf))
+            lpt.append(simulate_makespan(store_order(durations, True), workers, args.rtf))
+            bound.append(max(sum(durations) / workers, max(durations)) * args.rtf)
+            slower += lpt[-1] > fifo[-1] + 1e-6
+
+        reductions = [1 - l / f for f, l in zip(fifo, lpt)]
+        results[workers] = {
+            'fifo_makespan_h': round(statistics.mean(fifo) / 3600, 3),
+            'lpt_makespan_h': round(statistics.mean(lpt) / 3600, 3),
+            'lower_bound_h': round(statistics.mean(bound) / 3600, 3),
+            'reduction_mean': round(statistics.mean(reductions), 4),
+            'reduction_max': round(max(reductions), 4),
+            'lpt_over_bound': round(statistics.mean(l / b for l, b in zip(lpt, bound)), 4),
+        }
+        print(f"{workers} workers: ordre de soumission {results[workers]['fifo_makespan_h']:.2f} h, "
+              f"plus longue d'abord {results[workers]['lpt_makespan_h']:.2f} h "
+              f"(-{100 * results[workers]['reduction_mean']:.1f} %), "
+              f"borne {results[workers]['lower_bound_h']:.2f} h", file=sys.stderr)
+
+    print(json.dumps({'videos': args.videos, 'long_share': args.long_share, 'batches': args.batches,
+                      'rtf': args.rtf, 'workers': results}, indent=2))
+    if slower:
+        print(f"{slower} lot(s) plus lents avec l'ordre par durée", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Recherche plein texte : temps de réponse selon le volume indexé
+
+Construit un index (search.SearchIndex) de --hours heures de transcriptions
+synthétiques : vidéos de 20 à 90 min, segments de ~5 s, vocabulaire à
+fréquences de Zipf (quelques mots très fréquents, une longue traîne de mots
+rares), puis mesure les requêtes de plusieurs fréquences :
+
+    rare        mot de la traîne (quelques dizaines de segments)
+    medium      mot moyennement fréquent
+    common      mot présent dans une grande partie des segments
+    phrase      deux mots consécutifs entre guillemets
+    prefix      préfixe (mot*)
+
+Mesures : p50 / p95 par type de requête (ms), segments trouvés, taille de
+l'index, débit d'indexation (heures par seconde). Échoue (code 1) si le p95
+des requêtes rares ou de phrase dépasse --max-ms.
+
+Usage:
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --hours 10000 --queries 50 --keep /data/bench.db
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search import SearchIndex
+
+VOCABULARY = 50000
+SEGMENT_SECONDS = 5.0
+WORDS_PER_SEGMENT = 14
+
+
+def word(rank):
+    """Mot synthétique de rang rank (lettres seules, même tokenisation que du texte réel)"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    text = ''
+    rank += 1
+    while rank:
+        rank, rest = divmod(rank, 26)
+        text += letters[rest]
+    return 'mot' + text
+
+
+def zipf_sampler(rng, size):
+    """Tirage de rangs de mots selon une loi de Zipf (s = 1)"""
+    weights = [1 / (rank + 1) for rank in range(size)]
+    cumulative, total = [], 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+
+    def sample(count):
+        return rng.choices(range(size), cum_weights=cumulative, k=count)
+    return sample
+
+
+def build_index(index, hours, seed):
+    """
+    Indexer hours heures de vidéos synthétiques
+
+    Returns:
+        tuple: (vidéos indexées, segments indexés)
+    """
+    rng = random.Random(seed)
+    sample = zipf_sampler(rng, VOCABULARY)
+    remaining = hours * 3600
+    videos = segments = 0
+    while remaining > 0:
+        duration = min(remaining, rng.uniform(20, 90) * 60)
+        count = max(1, int(duration / SEGMENT_SECONDS))
+        ranks = sample(count * WORDS_PER_SEGMENT)
+        transcription = {
+            'language': 'fr',
+            'duration': duration,
+            'segments': [
+                {'start': i * SEGMENT_SECONDS, 'end': (i + 1) * SEGMENT_SECONDS,
+                 'text': ' '.join(word(r) for r in ranks[i * WORDS_PER_SEGMENT:(i + 1) * WORDS_PER_SEGMENT])}
+                for i in range(count)
+            ],
+        }
+        video_id = f'{videos:011d}'
+        index.add(f'video_{video_id}.txt', f'Vidéo {videos}', transcription, video_id)
+        videos += 1
+        segments += count
+        remaining -= duration
+    return videos, segments
+
+
+def queries(rng, kind, count):
+    """Requêtes d'un type (rangs de mots choisis selon leur fréquence)"""
+    if kind == 'rare':
+        return [word(rng.randrange(VOCABULARY // 2, VOCABULARY)) for _ in range(count)]
+    if kind == 'medium':
+        return [word(rng.randrange(100, 1000)) for _ in range(count)]
+    if kind == 'common':
+        return [word(rng.randrange(0, 5)) for _ in range(count)]
+    if kind == 'phrase':
+        return [f'"{word(rng.randrange(0, 50))} {word(rng.randrange(1000, 5000))}"' for _ in range(count)]
+    return [word(rng.randrange(200, 2000))[:-1] + '*' for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=500, help="Heures de transcriptions indexées")
+    parser.add_argument('--queries', type=int, default=30, help='Requêtes par type')
+    parser.add_argument('--limit', type=int, default=20, help='Résultats par requête')
+    parser.add_argument('--max-ms', type=float, default=50, help='p95 maximal des requêtes rares et de phrase')
+    parser.add_argument('--keep', help="Fichier d'index à garder (réutilisé s'il existe déjà)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench_search_') as temp_dir:
+        db_path = Path(args.keep) if args.keep else Path(temp_dir) / 'search.db'
+        reuse = db_path.exists()
+        index = SearchIndex(db_path)
+        indexing = None
+        if not reuse:
+            print(f'Indexation de {args.hours:.0f} h de transcriptions...', file=sys.stderr, flush=True)
+            start = time.perf_counter()
+            build_index(index, args.hours, args.seed)
+            indexing = time.perf_counter() - start
+        stats = index.stats()
+
+        rng = random.Random(args.seed + 1)
+        results = {}
+        errors = []
+        for kind in ('rare', 'medium', 'common', 'phrase', 'prefix'):
+            timings, found = [], []
+            for query in queries(rng, kind, args.queries):
+                start = time.perf_counter()
+                hits = index.search(query, args.limit, raw=kind == 'phrase')
+                timings.append((time.perf_counter() - start) * 1000)
+                found.append(len(hits))
+            timings.sort()
+            results[kind] = {
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 2),
+                'results_mean': round(statistics.mean(found), 1),
+            }
+            print(f"{kind}: p50 {results[kind]['p50_ms']:.1f} ms, p95 {results[kind]['p95_ms']:.1f} ms",
+                  file=sys.stderr)
+            if kind in ('rare', 'phrase') and results[kind]['p95_ms'] > args.max_ms:
+                errors.append(f"Requêtes {kind}: p95 {results[kind]['p95_ms']:.1f} ms au-dessus de {args.max_ms:.0f} ms")
+        index_bytes = sum(path.stat().st_size for path in db_path.parent.glob(db_path.name + '*'))
+
+    print(json.dumps({
+        'hours': stats['hours'],
+        'videos': stats['videos'],
+        'segments': stats['segments'],
+        'index_bytes': index_bytes,
+        'indexing_hours_per_second': round(stats['hours'] / indexing, 1) if indexing else None,
+        'queries': results,
+    }, indent=2))
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
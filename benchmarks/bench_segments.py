@@ -0,0 +1,129 @@
+"""
+Segments en colonnes : mémoire et coût des formats de sortie
+
+Génère des transcriptions de --hours heures au format des segments de
+Whisper (dict avec texte, tokens, scores), puis compare :
+
+    list_bytes          mémoire de la liste de dict (tracemalloc)
+    store_bytes         mémoire de segments.SegmentStore (colonnes + textes)
+    extend_ms           construction du stockage morceau par morceau (--chunk-minutes),
+                        comme dans transcribe_chunks
+    store_file_bytes    taille du fichier .segments.npz
+    <format>_ms         écriture SRT, VTT, JSON depuis le stockage
+    <format>_peak_bytes pic de mémoire allouée pendant l'écriture
+
+Un pic d'écriture constant quand --hours augmente montre que les formats
+sont écrits segment par segment. Échoue (code 1) si le stockage n'est pas
+au moins --min-ratio fois plus petit que la liste.
+
+Usage:
+    python benchmarks/bench_segments.py
+    python benchmarks/bench_segments.py --hours 1,4,12 --min-ratio 5
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from segments import FORMATS, SegmentStore
+
+WORDS = ('la', 'transition', 'énergétique', 'coûte', 'cher', 'mais', 'nous', 'avons', 'le', 'temps',
+         'de', 'voir', 'comment', 'les', 'choses', 'évoluent', 'dans', 'ce', 'domaine', 'aujourd\'hui')
+
+
+def whisper_segments(hours, seed=0):
+    """Segments de ~4 s comme ceux de model.transcribe (tokens compris)"""
+    rng = random.Random(seed)
+    segments, start = [], 0.0
+    while start < hours * 3600:
+        end = start + rng.uniform(2, 6)
+        words = rng.choices(WORDS, k=rng.randint(6, 16))
+        segments.append({
+            'id': len(segments), 'seek': int(start * 100), 'start': round(start, 2), 'end': round(end, 2),
+            'text': ' ' + ' '.join(words) + '.',
+            'tokens': [rng.randrange(50257) for _ in range(len(words) * 2)],
+            'temperature': 0.0, 'avg_logprob': rng.uniform(-1, 0), 'compression_ratio': rng.uniform(1, 2),
+            'no_speech_prob': rng.uniform(0, 0.2),
+        })
+        start = end
+    return segments
+
+
+def build_by_chunks(segments, chunk_seconds):
+    """SegmentStore rempli morceau par morceau (SegmentStore.extend)"""
+    store = SegmentStore.empty('fr')
+    chunk, chunk_end = [], chunk_seconds
+    for segment in segments:
+        if segment['start'] >= chunk_end:
+            store.extend(chunk)
+            chunk, chunk_end = [], chunk_end + chunk_seconds
+        chunk.append(segment)
+    store.extend(chunk)
+    return store
+
+
+def measure(function):
+    """(résultat, octets alloués encore vivants, pic) d'un appel"""
+    tracemalloc.start()
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', default='1,4,12', help='Durées de transcription comparées (heures)')
+    parser.add_argument('--min-ratio', type=float, default=5.0, help='Rapport mémoire liste / stockage minimal')
+    parser.add_argument('--chunk-minutes', type=float, default=10, help='Durée des morceaux ajoutés au stockage')
+    args = parser.parse_args()
+
+    results = {}
+    errors = []
+    with tempfile.TemporaryDirectory(prefix='bench_segments_') as temp_dir:
+        for hours in (float(h) for h in args.hours.split(',')):
+            segments, list_bytes, _ = measure(lambda: whisper_segments(hours))
+            store, store_bytes, _ = measure(lambda: SegmentStore.from_segments(segments, 'fr'))
+            store_path = Path(temp_dir) / f'{hours}h.segments.npz'
+            store.save(store_path)
+            start = time.perf_counter()
+            chunked = build_by_chunks(segments, args.chunk_minutes * 60)
+            extend_ms = round((time.perf_counter() - start) * 1000, 1)
+            if chunked.text_buffer != store.text_buffer or len(chunked) != len(store):
+                errors.append(f'{hours:g} h: stockage construit par morceaux différent')
+            del segments, chunked
+
+            result = {
+                'segments': len(store),
+                'list_bytes': list_bytes,
+                'store_bytes': store_bytes,
+                'store_file_bytes': store_path.stat().st_size,
+                'ratio': round(list_bytes / store_bytes, 1),
+                'extend_ms': extend_ms,
+            }
+            for fmt in FORMATS:
+                start = time.perf_counter()
+                _, _, peak = measure(lambda: store.export(Path(temp_dir) / f'{hours}h.{fmt}', fmt, title='Bench'))
+                result[f'{fmt}_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                result[f'{fmt}_peak_bytes'] = peak
+            results[hours] = result
+            print(f"{hours:g} h ({result['segments']} segments): liste {list_bytes / 1e6:.1f} Mo, "
+                  f"colonnes {store_bytes / 1e6:.2f} Mo (x{result['ratio']}), "
+                  f"SRT {result['srt_ms']:.0f} ms (pic {result['srt_peak_bytes'] / 1e3:.0f} ko)", file=sys.stderr)
+            if result['ratio'] < args.min_ratio:
+                errors.append(f'{hours:g} h: stockage seulement {result["ratio"]} fois plus petit que la liste')
+
+    print(json.dumps({'hours': results}, indent=2))
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
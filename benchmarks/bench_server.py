@@ -0,0 +1,172 @@
+"""
+Charge du service HTTP local, entièrement en boucle locale
+
+Lance server.py dans le processus (port libre sur 127.0.0.1) avec un
+téléchargeur factice qui copie une fixture au lieu d'appeler yt-dlp
+(--real-download : yt-dlp télécharge la fixture depuis un serveur local).
+Soumet une rafale de --burst URLs distinctes d'un coup, puis mesure :
+    accepted / rejected     tâches acceptées (202) et refusées (503, file pleine)
+    first_segment_s         délai avant le premier segment diffusé (SSE)
+    wall_s                  temps jusqu'à la fin de toutes les tâches acceptées
+    audio_per_wall          secondes d'audio transcrites par seconde
+    peak_rss_bytes          pic de mémoire du processus
+
+Échoue (code 1) si une tâche acceptée échoue ou si la rafale dépasse la
+capacité (workers + --max-queue) sans qu'aucune soumission soit refusée.
+
+Usage:
+    python benchmarks/bench_server.py -m tiny -d cpu
+    python benchmarks/bench_server.py -m small -w 2 --max-queue 4 --burst 12 --duration 60
+"""
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import FixtureServer, make_fixtures
+
+
+def stub_downloader(fixture, title='Fixture'):
+    """download_audio factice : copie de la fixture dans un fichier temporaire"""
+    from scratch import job_dir
+
+    def download_audio(url, raise_errors=False):
+        path = job_dir() / fixture.name
+        shutil.copyfile(fixture, path)
+        return str(path), f'{title} {url[-4:]}'
+    return download_audio
+
+
+def request(base, path, payload=None):
+    """Requête JSON ; retourne (code HTTP, réponse décodée)"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(base + path, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def first_segment_delay(base, job_id, start, delays):
+    """Suivre le flux SSE d'une tâche et noter le délai du premier segment"""
+    with urllib.request.urlopen(f'{base}/jobs/{job_id}/events') as response:
+        for line in response:
+            if line.startswith(b'event: segment'):
+                delays.append(time.perf_counter() - start)
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-m', '--model', default='tiny', help='Taille du modèle Whisper')
+    parser.add_argument('-d', '--device', default='cpu', help='cuda, mps ou cpu')
+    parser.add_argument('-w', '--workers', type=int, default=2, help='Workers du service')
+    parser.add_argument('--max-queue', type=int, default=4, help='Tâches en attente avant refus')
+    parser.add_argument('--burst', type=int, default=10, help='URLs soumises d\'un coup')
+    parser.add_argument('--duration', type=int, default=30, help='Durée de la fixture (s)')
+    parser.add_argument('--real-download', action='store_true',
+                        help='Télécharger avec yt-dlp depuis un serveur local au lieu du téléchargeur factice')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+
+    from models import peak_rss_bytes
+    from server import TranscriptionService, make_server
+    from transcriber import YouTubeTranscriber
+
+    work_dir = Path(tempfile.mkdtemp(prefix='bench_server_'))
+    try:
+        fixtures = make_fixtures(work_dir / 'fixtures', ['speech'], [args.duration])
+        fixture, duration = next(iter(fixtures.values()))
+        with FixtureServer(fixture.parent) as fixture_server:
+            transcribers = [
+                YouTubeTranscriber(output_dir=str(work_dir / 'out'), model_size=args.model,
+                                   device=args.device, use_cache=False)
+                for _ in range(args.workers)
+            ]
+            for transcriber in transcribers:
+                if not args.real_download:
+                    transcriber.download_audio = stub_downloader(fixture)
+            service = TranscriptionService(transcribers, max_queue=args.max_queue)
+            server = make_server(service, youtube_only=False)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base = 'http://127.0.0.1:%d' % server.server_address[1]
+
+            # URLs distinctes (pas de déduplication) ; le serveur factice ignore la requête
+            urls = [f'{fixture_server.url(fixture.name)}?v={i:04d}' for i in range(args.burst)]
+            start = time.perf_counter()
+            accepted = []
+            rejected = 0
+            for url in urls:
+                status, body = request(base, '/jobs', {'urls': [url]})
+                if status == 202:
+                    accepted.append(body['jobs'][0]['id'])
+                else:
+                    rejected += 1
+
+            delays = []
+            follower = None
+            if accepted:
+                follower = threading.Thread(target=first_segment_delay,
+                                            args=(base, accepted[0], start, delays), daemon=True)
+                follower.start()
+
+            states = {}
+            while True:
+                states = {job_id: request(base, f'/jobs/{job_id}')[1] for job_id in accepted}
+                if all(state['state'] in ('done', 'failed') for state in states.values()):
+                    break
+                time.sleep(0.2)
+            wall = time.perf_counter() - start
+            if follower:
+                follower.join(timeout=5)
+
+            health = request(base, '/health')[1]
+            server.shutdown()
+            server.server_close()
+            service.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    failed = [state for state in states.values() if state['state'] == 'failed']
+    results = {
+        'model': args.model,
+        'device': args.device,
+        'workers': args.workers,
+        'max_queue': args.max_queue,
+        'burst': args.burst,
+        'fixture_seconds': duration,
+        'accepted': len(accepted),
+        'rejected': rejected,
+        'failed': len(failed),
+        'first_segment_s': round(delays[0], 3) if delays else None,
+        'wall_s': round(wall, 3),
+        'audio_per_wall': round(len(accepted) * duration / wall, 2) if wall else None,
+        'model_bytes': health['model_bytes'],
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+
+    errors = []
+    if failed:
+        errors.append(f"{len(failed)} tâche(s) en échec: {failed[0]['error']}")
+    if args.burst > args.workers + args.max_queue and not rejected:
+        errors.append('Rafale au-delà de la capacité sans aucun refus')
+    for error in errors:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Budget de démarrage de l'interface : temps d'import de main.py
+
+Lance `python -X importtime -c "import main"` dans un processus neuf (plusieurs
+fois, on garde le meilleur temps) et échoue (code 1) si :
+    - l'import de main dépasse --budget-ms millisecondes
+    - un module lourd (torch, whisper, yt_dlp, ...) est importé au démarrage
+      au lieu de l'être en arrière-plan après l'affichage de la fenêtre
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget-ms 150 --runs 5
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules qui ne doivent pas être importés avant que la fenêtre ne s'affiche
+HEAVY_MODULES = ('torch', 'whisper', 'yt_dlp', 'numpy', 'transcriber', 'models', 'pipeline')
+
+
+def import_profile(module):
+    """
+    Importer module dans un processus neuf avec -X importtime
+
+    Returns:
+        dict: module importé par module (lui compris) -> temps cumulé d'import (µs)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative)))
+
+    # Les imports de module précèdent sa ligne, plus indentés (ceux du démarrage de Python sont ignorés)
+    index = max(i for i, (_, name, _) in enumerate(entries) if name == module)
+    depth = entries[index][0]
+    modules = {module: entries[index][2]}
+    for indent, name, cumulative in reversed(entries[:index]):
+        if indent <= depth:
+            break
+        modules[name] = cumulative
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='main', help='Module à importer')
+    parser.add_argument('--budget-ms', type=float, default=200, help="Temps d'import maximal (ms)")
+    parser.add_argument('--runs', type=int, default=3, help='Imports mesurés (meilleur temps retenu)')
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    best = min(profiles, key=lambda profile: profile[args.module])
+    import_ms = best[args.module] / 1000
+    heavy = sorted(name for name in best if name.split('.')[0] in HEAVY_MODULES)
+    slowest = sorted((item for item in best.items() if item[0] != args.module),
+                     key=lambda item: item[1], reverse=True)[:5]
+
+    print(json.dumps({
+        'module': args.module,
+        'import_ms': round(import_ms, 1),
+        'budget_ms': args.budget_ms,
+        'heavy_modules': heavy,
+        'slowest': {name: round(us / 1000, 1) for name, us in slowest},
+    }, indent=2))
+
+    failed = False
+    if heavy:
+        print(f"Modules lourds importés au démarrage: {', '.join(heavy[:10])}", file=sys.stderr)
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f'Import de {args.module}: {import_ms:.0f} ms > budget de {args.budget_ms:.0f} ms', file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Fixtures audio et serveur local pour les benchmarks (aucun accès réseau)
+
+Deux familles d'audios reproductibles (graine fixe) :
+    synthetic : ton + bruit, avec des plages de silence
+    speech    : signal de type parole (syllabes voisées, pauses entre mots
+                et phrases), ou un vrai enregistrement répété (--speech-file)
+
+Les fixtures sont servies en HTTP sur 127.0.0.1 : yt-dlp les télécharge avec
+son extracteur générique, comme une vraie vidéo, sans toucher à YouTube.
+"""
+import functools
+import http.server
+import subprocess
+import threading
+from pathlib import Path
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_audio(duration, seed=0):
+    """Ton à 220 Hz + bruit, entrecoupé d'un silence de 3 s toutes les 20 s"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.05 * rng.standard_normal(len(t))
+    audio[(t % 20) >= 17] *= 0.01
+    return audio.astype(np.float32)
+
+
+def speech_like_audio(duration, seed=0):
+    """
+    Signal imitant le rythme de la parole
+
+    Syllabes voisées de 120 à 300 ms (fondamentale 100-220 Hz et harmoniques),
+    mots de 1 à 4 syllabes, pauses courtes entre les mots et de 0,5 à 1,5 s
+    entre les phrases, sur un bruit de fond faible.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(duration * SAMPLE_RATE)
+    audio = 0.003 * rng.standard_normal(total).astype(np.float32)
+    position = int(0.5 * SAMPLE_RATE)
+    words = 0
+    while position < total:
+        for _ in range(rng.integers(1, 5)):
+            length = int(rng.uniform(0.12, 0.3) * SAMPLE_RATE)
+            end = min(total, position + length)
+            t = np.arange(end - position) / SAMPLE_RATE
+            f0 = rng.uniform(100, 220)
+            voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+            envelope = np.sin(np.pi * np.arange(end - position) / length) ** 2
+            audio[position:end] += 0.2 * envelope * voiced
+            position = end
+        words += 1
+        pause = rng.uniform(0.5, 1.5) if words % 8 == 0 else rng.uniform(0.05, 0.2)
+        position += int(pause * SAMPLE_RATE)
+    return np.clip(audio, -1, 1).astype(np.float32)
+
+
+def looped_audio(path, duration):
+    """Enregistrement réel, répété jusqu'à la durée voulue"""
+    from audio import load_audio
+
+    clip = np.asarray(load_audio(path), dtype=np.float32)
+    repeats = int(np.ceil(duration * SAMPLE_RATE / max(1, len(clip))))
+    return np.tile(clip, repeats)[:int(duration * SAMPLE_RATE)]
+
+
+def write_webm(audio, path):
+    """Encoder en opus/webm 48 kHz stéréo, comme une piste audio YouTube"""
+    subprocess.run([
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y',
+        '-f', 'f32le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-i', '-',
+        '-ac', '2', '-ar', '48000', '-c:a', 'libopus', '-b:a', '128k', str(path)
+    ], input=np.asarray(audio, dtype=np.float32).tobytes(), check=True)
+    return Path(path)
+
+
+def make_fixtures(directory, kinds=('synthetic', 'speech'), durations=(30, 120), speech_file=None):
+    """
+    Générer les fixtures manquantes
+
+    Returns:
+        dict: nom ('speech-120s', ...) -> (chemin webm, durée en secondes)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    fixtures = {}
+    for kind in kinds:
+        for duration in durations:
+            name = f'{kind}-{duration}s'
+            path = directory / f'{name}.webm'
+            if not path.exists():
+                if kind == 'synthetic':
+                    audio = synthetic_audio(duration)
+                elif speech_file:
+                    audio = looped_audio(speech_file, duration)
+                else:
+                    audio = speech_like_audio(duration)
+                write_webm(audio, path)
+            fixtures[name] = (path, duration)
+    return fixtures
+
+
+class _AudioHandler(http.server.SimpleHTTPRequestHandler):
+    def guess_type(self, path):
+        # Type audio/* : yt-dlp classe le fichier comme piste audio seule (vcodec 'none'),
+        # comme le format 251 de YouTube
+        return 'audio/webm' if str(path).endswith('.webm') else super().guess_type(path)
+
+    def copyfile(self, source, outputfile):
+        # yt-dlp ferme la connexion après avoir sondé le début du fichier
+        try:
+            super().copyfile(source, outputfile)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    def __init__(self, directory):
+        """
+        Serveur HTTP local (127.0.0.1, port libre) servant un dossier de fixtures
+
+        S'utilise comme contexte : with FixtureServer(dossier) as server: server.url(nom)
+        """
+        handler = functools.partial(_AudioHandler, directory=str(directory))
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, filename):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}/{filename}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
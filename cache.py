@@ -0,0 +1,261 @@
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class TranscriptionCache:
+    def __init__(self, cache_dir, max_size_mb=512):
+        """
+        Cache persistant des transcriptions (SQLite + fichiers blob compressés)
+
+        Une entrée est identifiée par l'empreinte de (video_id, taille du modèle,
+        options de transcription) : changer une option crée une nouvelle entrée.
+
+        Args:
+            cache_dir: Dossier du cache (index SQLite et blobs)
+            max_size_mb: Taille maximale des blobs avant éviction LRU
+        """
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / 'blobs'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / 'cache.db'
+        self.max_size = max_size_mb * 1024 * 1024
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS transcriptions (
+                    key TEXT PRIMARY KEY,
+                    video_id TEXT NOT NULL,
+                    model_size TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_video ON transcriptions (video_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_access ON transcriptions (last_access)')
+
+    @contextmanager
+    def _connect(self):
+        """Ouvrir une connexion SQLite (transaction validée puis connexion fermée)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(video_id, model_size, options):
+        """Calculer la clé d'une transcription à partir de ses paramètres"""
+        payload = json.dumps({'video_id': video_id, 'model_size': model_size, 'options': options},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _blob_path(self, key):
+        return self.blob_dir / key[:2] / f'{key}.json.gz'
+
+    def get(self, video_id, model_size, options):
+        """
+        Récupérer une transcription du cache
+
+        Returns:
+            dict: Résultat de la transcription (avec 'title') ou None si absent
+        """
+        key = self.make_key(video_id, model_size, options)
+        blob_path = self._blob_path(key)
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT key FROM transcriptions WHERE key = ?', (key,)).fetchone()
+            if not row:
+                return None
+            try:
+                with gzip.open(blob_path, 'rt', encoding='utf-8') as f:
+                    result = json.load(f)
+            except (OSError, ValueError):
+                # Blob manquant ou corrompu : l'entrée n'est plus valide
+                conn.execute('DELETE FROM transcriptions WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE transcriptions SET last_access = ? WHERE key = ?', (time.time(), key))
+        return result
+
+    def latest(self, video_id):
+        """
+        Dernière transcription en cache d'une vidéo, quels que soient le
+        modèle et les options (réindexation des fichiers déjà écrits)
+
+        Returns:
+            dict: Résultat de la transcription ou None si absent
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT key FROM transcriptions WHERE video_id = ? ORDER BY created DESC',
+                                (video_id,)).fetchall()
+        for (key,) in rows:
+            try:
+                with gzip.open(self._blob_path(key), 'rt', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def put(self, video_id, model_size, options, result, video_title):
+        """
+        Ajouter une transcription au cache puis appliquer l'éviction LRU
+
+        Les segments (liste de dict ou SegmentStore) sont écrits un par un,
+        sans construire l'entrée complète en mémoire.
+        """
+        from segments import iter_segments
+
+        key = self.make_key(video_id, model_size, options)
+        blob_path = self._blob_path(key)
+        blob_path.parent.mkdir(exist_ok=True)
+
+        entry = {
+            'title': video_title,
+            'text': result.get('text', ''),
+            'language': result.get('language'),
+            'duration': result.get('duration'),
+        }
+        lists = {'segments': result.get('segments')}
+        if result.get('translation'):
+            lists['translation'] = result['translation']
+        tmp_path = blob_path.with_suffix('.tmp')
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=float)[:-1])
+            for name, segments in lists.items():
+                f.write(f', "{name}": [')
+                for index, segment in enumerate(iter_segments(segments)):
+                    f.write((',' if index else '') + json.dumps(segment, ensure_ascii=False, default=float))
+                f.write(']')
+            f.write('}')
+        tmp_path.replace(blob_path)
+
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO transcriptions VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, video_id, model_size, blob_path.stat().st_size, now, now))
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """Supprimer les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcriptions').fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = conn.execute('SELECT key, size FROM transcriptions ORDER BY last_access').fetchall()
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            self._blob_path(key).unlink(missing_ok=True)
+            conn.execute('DELETE FROM transcriptions WHERE key = ?', (key,))
+            total -= size
+
+    def invalidate(self, video_id=None, model_size=None):
+        """
+        Invalider les entrées correspondant aux critères (toutes si aucun critère)
+
+        Returns:
+            int: Nombre d'entrées supprimées
+        """
+        query = 'SELECT key FROM transcriptions WHERE 1 = 1'
+        params = []
+        if video_id is not None:
+            query += ' AND video_id = ?'
+            params.append(video_id)
+        if model_size is not None:
+            query += ' AND model_size = ?'
+            params.append(model_size)
+
+        with self._lock, self._connect() as conn:
+            keys = [row[0] for row in conn.execute(query, params)]
+            for key in keys:
+                self._blob_path(key).unlink(missing_ok=True)
+                conn.execute('DELETE FROM transcriptions WHERE key = ?', (key,))
+        return len(keys)
+
+    def clear(self):
+        """Vider entièrement le cache"""
+        return self.invalidate()
+
+    def total_size(self):
+        """Taille totale des blobs en octets"""
+        with self._connect() as conn:
+            return conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcriptions').fetchone()[0]
+
+
+class MetadataCache:
+    def __init__(self, cache_dir, ttl_hours=24):
+        """
+        Cache sur disque des métadonnées des vidéos, avec durée de validité
+
+        Évite une extraction yt-dlp lorsque seules les métadonnées sont
+        nécessaires (titre, durée, ID, format choisi).
+
+        Args:
+            cache_dir: Dossier du cache
+            ttl_hours: Durée de validité d'une entrée
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.cache_dir / 'metadata.db'
+        self.ttl = ttl_hours * 3600
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metadata (
+                    video_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    duration REAL,
+                    format_id TEXT,
+                    ext TEXT,
+                    fetched REAL NOT NULL
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """Ouvrir une connexion SQLite (transaction validée puis connexion fermée)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, video_id):
+        """
+        Récupérer les métadonnées d'une vidéo
+
+        Returns:
+            dict: Métadonnées ou None si absentes ou expirées
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT video_id, title, duration, format_id, ext FROM metadata '
+                'WHERE video_id = ? AND fetched > ?',
+                (video_id, time.time() - self.ttl)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(('id', 'title', 'duration', 'format_id', 'ext'), row))
+
+    def put(self, info):
+        """Enregistrer les métadonnées issues d'un dictionnaire d'info yt-dlp"""
+        if not info.get('id'):
+            return
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?)',
+                         (info['id'], info.get('title'), info.get('duration'),
+                          info.get('format_id'), info.get('ext'), time.time()))
+
+    def invalidate(self, video_id=None):
+        """Supprimer les métadonnées d'une vidéo (toutes si aucun ID)"""
+        with self._connect() as conn:
+            if video_id is None:
+                return conn.execute('DELETE FROM metadata').rowcount
+            return conn.execute('DELETE FROM metadata WHERE video_id = ?', (video_id,)).rowcount
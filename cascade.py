@@ -0,0 +1,63 @@
+DEFAULT_THRESHOLDS = {
+    'avg_logprob': -0.8,        # Confiance moyenne des tokens en dessous de laquelle on escalade
+    'compression_ratio': 2.2,   # Texte trop compressible : répétitions, boucle probable
+    'no_speech_prob': 0.5,      # Texte produit sur ce qui ressemble à du silence
+}
+
+
+def needs_escalation(segment, thresholds=DEFAULT_THRESHOLDS):
+    """Indique si un segment du petit modèle est trop incertain pour être gardé"""
+    if segment.get('avg_logprob', 0.0) < thresholds['avg_logprob']:
+        return True
+    if segment.get('compression_ratio', 0.0) > thresholds['compression_ratio']:
+        return True
+    return segment.get('no_speech_prob', 0.0) > thresholds['no_speech_prob'] and bool(segment['text'].strip())
+
+
+def escalation_ranges(segments, thresholds=DEFAULT_THRESHOLDS, merge_gap=1.0):
+    """
+    Plages de temps à redécoder avec le grand modèle
+
+    Les segments incertains consécutifs (ou séparés de moins de merge_gap
+    secondes) sont regroupés pour donner un contexte suffisant au grand
+    modèle et limiter le nombre d'appels.
+
+    Returns:
+        list: (début, fin, indices des segments remplacés), en secondes
+    """
+    ranges = []
+    for index, segment in enumerate(segments):
+        if not needs_escalation(segment, thresholds):
+            continue
+        previous = ranges[-1] if ranges else None
+        if previous and previous[2][-1] == index - 1 and segment['start'] - previous[1] < merge_gap:
+            ranges[-1] = (previous[0], max(previous[1], segment['end']), previous[2] + [index])
+        else:
+            ranges.append((segment['start'], segment['end'], [index]))
+    return ranges
+
+
+def cascade_report(segments, model, escalation_model):
+    """
+    Part de la transcription redécodée par le grand modèle
+
+    Calculée sur les segments finaux (marqués 'escalated'), donc exacte aussi
+    après une reprise sur le journal. segments peut être un itérateur (lu une
+    fois, ex. SegmentStore.segments()).
+    """
+    count = escalated = 0
+    total = escalated_seconds = 0.0
+    for segment in segments:
+        count += 1
+        total += segment['end'] - segment['start']
+        if segment.get('escalated'):
+            escalated += 1
+            escalated_seconds += segment['end'] - segment['start']
+    return {
+        'model': model,
+        'escalation_model': escalation_model,
+        'segments': count,
+        'escalated_segments': escalated,
+        'escalated_seconds': round(escalated_seconds, 2),
+        'escalated_fraction': round(escalated_seconds / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,208 @@
+import concurrent.futures
+import multiprocessing
+import re
+
+import numpy as np
+
+from audio import SAMPLE_RATE, load_pcm
+from vad import frame_energy_db
+
+
+def plan_chunks(audio, chunk_seconds=600, overlap_seconds=2.0, search_seconds=30, frame_seconds=0.03,
+                start=0):
+    """
+    Découper un audio en morceaux, en coupant dans les silences
+
+    Chaque coupure est placée au point le plus calme (énergie lissée sur
+    0,3 s) à ±search_seconds de la position visée. Le découpage ne dépend que
+    de l'audio et des paramètres, jamais du nombre de workers.
+
+    Args:
+        start: Premier échantillon à découper (reprise après interruption) ;
+               c'est une jointure, que le premier morceau recouvre comme les autres
+
+    Returns:
+        list: (début, fin, début_jointure, fin_jointure) en échantillons ; chaque
+              morceau déborde de overlap_seconds au-delà de ses jointures
+    """
+    if start:
+        chunks = plan_chunks(audio[start:], chunk_seconds, overlap_seconds, search_seconds, frame_seconds)
+        chunks = [tuple(position + start for position in chunk) for chunk in chunks]
+        _, end, seam_start, seam_end = chunks[0]
+        chunks[0] = (max(0, start - int(overlap_seconds * SAMPLE_RATE)), end, seam_start, seam_end)
+        return chunks
+
+    total = len(audio)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk * 1.5:
+        return [(0, total, 0, total)]
+
+    energy = frame_energy_db(audio, frame_seconds)
+    window = max(1, int(0.3 / frame_seconds))
+    smoothed = np.convolve(energy, np.ones(window) / window, mode='same')
+    frame = int(SAMPLE_RATE * frame_seconds)
+    search = int(search_seconds * SAMPLE_RATE)
+
+    cuts = [0]
+    target = chunk
+    while total - target > chunk // 2:
+        lo = max(cuts[-1] + search, target - search) // frame
+        hi = min(total - search, target + search) // frame
+        if hi <= lo:
+            break
+        cut = (lo + int(np.argmin(smoothed[lo:hi]))) * frame + frame // 2
+        cuts.append(cut)
+        target = cut + chunk
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * SAMPLE_RATE)
+    return [(max(0, a - overlap), min(total, b + overlap), a, b) for a, b in zip(cuts, cuts[1:])]
+
+
+def transcribe_slice(model, audio, offset_samples, options, seed):
+    """
+    Transcrire un morceau et replacer ses timestamps dans l'audio complet
+
+    La graine est fixée par morceau : avec une température non nulle, le
+    résultat ne dépend pas du worker qui traite le morceau.
+    """
+    import torch
+
+    torch.manual_seed(seed)
+    result = model.transcribe(np.ascontiguousarray(audio, dtype=np.float32), verbose=None, **options)
+
+    offset = offset_samples / SAMPLE_RATE
+    segments = []
+    for segment in result['segments']:
+        if not segment['text'].strip():
+            continue  # Segment vidé par Whisper (instantané ou sans texte)
+        segment = dict(segment, start=segment['start'] + offset, end=segment['end'] + offset)
+        for word in segment.get('words', []):
+            word['start'] += offset
+            word['end'] += offset
+        segments.append(segment)
+    return {'segments': segments, 'language': result.get('language')}
+
+
+def _normalize(text):
+    return re.sub(r'[^\w]+', ' ', text.lower()).strip()
+
+
+class Stitcher:
+    def __init__(self, count=0, last_segment=None):
+        """
+        Recollage incrémental des segments des morceaux, dans l'ordre
+
+        Dans chaque zone de recouvrement, un segment est gardé par le morceau dont
+        la jointure contient son milieu (seules les vraies jointures filtrent :
+        le début du premier morceau et la fin du dernier sont ouverts) ; un segment identique à celui qui le
+        précède juste de l'autre côté d'une jointure est supprimé.
+
+        Args:
+            count: Segments déjà retenus (reprise sur le journal)
+            last_segment: Dernier d'entre eux, comparé au premier segment du
+                          morceau suivant
+        """
+        self.last_segment = last_segment
+        self.count = count
+
+    def add(self, result, chunk):
+        """
+        Ajouter le résultat du morceau suivant
+
+        Returns:
+            list: Segments retenus pour ce morceau, numérotés à la suite des précédents
+        """
+        start, end, seam_start, seam_end = chunk
+        # Pas de recouvrement avant le premier morceau ni après le dernier : rien à
+        # départager, un segment qui déborde de la fin de l'audio est gardé
+        lo = seam_start / SAMPLE_RATE if start < seam_start else float('-inf')
+        hi = seam_end / SAMPLE_RATE if end > seam_end else float('inf')
+        kept = [s for s in result['segments'] if lo <= (s['start'] + s['end']) / 2 < hi]
+
+        # Doublon de part et d'autre de la jointure
+        if self.last_segment and kept:
+            previous, first = self.last_segment, kept[0]
+            if _normalize(previous['text']) == _normalize(first['text']) and first['start'] < previous['end'] + 1.0:
+                kept = kept[1:]
+
+        for segment in kept:
+            segment['id'] = self.count
+            self.count += 1
+        if kept:
+            self.last_segment = kept[-1]
+        return kept
+
+
+def stitch(results, chunks):
+    """
+    Recoller les segments de tous les morceaux
+
+    Returns:
+        list: Segments ordonnés et renumérotés
+    """
+    stitcher = Stitcher()
+    stitched = []
+    for result, chunk in zip(results, chunks):
+        stitched.extend(stitcher.add(result, chunk))
+    return stitched
+
+
+# Modèle propre à chaque processus worker
+_worker_model = None
+
+
+def _init_chunk_worker(model_size, device, dtype, threads):
+    global _worker_model
+    import torch
+    from models import registry
+
+    torch.set_num_threads(threads)
+    _worker_model = registry.get(model_size, device, dtype)
+
+
+def _transcribe_chunk(pcm_path, start, end, options, seed):
+    audio = load_pcm(pcm_path)[start:end]
+    return transcribe_slice(_worker_model, audio, start, options, seed)
+
+
+class ChunkPool:
+    def __init__(self, model_size, device, dtype='fp32', workers=2, threads=None):
+        """
+        Pool de processus transcrivant en parallèle les morceaux d'un long audio
+
+        Chaque worker charge son propre modèle au démarrage ; le pool est
+        conservé d'une vidéo à l'autre.
+        """
+        from models import threads_per_worker
+
+        self.workers = workers
+        context = multiprocessing.get_context('spawn')
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_chunk_worker,
+            initargs=(model_size, device, dtype, threads or threads_per_worker(workers))
+        )
+
+    def transcribe(self, pcm_path, chunks, options):
+        """
+        Transcrire tous les morceaux d'un fichier PCM
+
+        Yields:
+            dict: Résultat de chaque morceau, dans l'ordre des morceaux, dès
+                  que lui et ses prédécesseurs sont terminés
+        """
+        futures = [
+            self._executor.submit(_transcribe_chunk, str(pcm_path), start, end, options, start)
+            for start, end, _, _ in chunks
+        ]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
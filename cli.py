@@ -0,0 +1,477 @@
+"""
+Transcription en lot sans interface graphique
+
+Lit les URLs depuis un fichier (une par ligne) ou l'entrée standard et les
+répartit sur N processus, chacun avec son propre modèle Whisper et sa part
+des cœurs CPU. Un résumé JSON (succès/échecs par URL) est écrit sur la sortie
+standard ou dans le fichier --summary ; les logs vont sur la sortie d'erreur.
+
+Usage:
+    python cli.py urls.txt -o transcriptions -m large-v3 -w 4
+    cat urls.txt | python cli.py -m small -d cpu -w 8 --summary resume.json
+    python cli.py urls.txt --metrics-dir metrics --profile cprofile
+    python cli.py urls.txt -m small --escalate-to large-v3 -d cpu
+    python cli.py urls.txt -m large-v3 -d cpu --dtype int8
+    python cli.py urls.txt -m large-v3 -d cpu --dtype int8 --check-quality interview.wav
+    python cli.py urls.txt --formats srt,vtt,json
+
+Le lot est enregistré dans une file persistante (--jobs-db, par défaut
+.jobs.db dans le dossier de sortie) : relancer la commande après une
+interruption reprend les vidéos inachevées, sans refaire celles déjà
+transcrites. Les erreurs temporaires (réseau, limitation de débit) sont
+réessayées avec une attente croissante ; les vidéos privées ou supprimées
+sont abandonnées tout de suite.
+
+Une URL de playlist ou de chaîne est remplacée par ses vidéos (liste lue
+sans ouvrir chaque vidéo) ; celles déjà transcrites d'après la file ne sont
+pas resoumises, ce qui permet de relancer la même liste chaque nuit.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class ConsoleMessages:
+    def __init__(self, verbose=False):
+        """
+        Remplace la queue de l'interface : affiche les logs et garde les erreurs
+
+        Args:
+            verbose: Afficher aussi les messages de progression détaillée
+        """
+        self.verbose = verbose
+        self.errors = []
+
+    def put(self, message):
+        msg_type, content, extra = message
+        if msg_type == 'log':
+            if extra == 'ERROR':
+                self.errors.append(content)
+            timestamp = datetime.now().strftime('%H:%M:%S')
+            print(f"[{timestamp}] [{os.getpid()}] {extra:<7} {content.strip()}", file=sys.stderr, flush=True)
+        elif msg_type == 'detail' and self.verbose:
+            print(f"[{os.getpid()}] {content} ({extra}%)", file=sys.stderr, flush=True)
+
+
+# État propre à chaque processus worker
+_transcriber = None
+_messages = None
+_init_error = None
+
+
+def _init_worker(output_dir, model_size, device, threads, verbose, vad, chunk_workers,
+                 metrics_dir=None, profiler=None, escalation_model=None, dtype='fp32', batch_size=1,
+                 translate=False, output_formats=('srt',)):
+    """Initialiser un worker : threads torch puis modèle"""
+    global _transcriber, _messages, _init_error
+    _messages = ConsoleMessages(verbose)
+    try:
+        import torch
+        from metrics import Metrics
+        from transcriber import YouTubeTranscriber
+
+        torch.set_num_threads(threads)
+        metrics = None
+        if metrics_dir:
+            # Un fichier par worker : pas d'écritures concurrentes entre processus
+            metrics = Metrics(
+                jsonl_path=os.path.join(metrics_dir, f'metrics-{os.getpid()}.jsonl'),
+                prometheus_path=os.path.join(metrics_dir, f'metrics-{os.getpid()}.prom'),
+                profiler=profiler
+            )
+        elif profiler:
+            metrics = Metrics(profiler=profiler, profile_dir=output_dir)
+        _transcriber = YouTubeTranscriber(
+            output_dir=output_dir,
+            model_size=model_size,
+            device=device,
+            message_queue=_messages,
+            vad=vad,
+            chunk_workers=chunk_workers,
+            metrics=metrics,
+            escalation_model=escalation_model,
+            dtype=dtype,
+            batch_size=batch_size,
+            translate=translate,
+            output_formats=output_formats
+        )
+    except Exception as e:
+        # Une exception ici ferait redémarrer le worker en boucle par le pool
+        _init_error = f"Initialisation du worker impossible: {e}"
+
+
+def _process_url(url):
+    """
+    Traiter une URL dans un worker et retourner son résultat
+
+    La transcription seule est chronométrée (transcribe_seconds, avec la
+    durée de l'audio décodé) : le téléchargement et les vidéos trouvées dans
+    le cache ne faussent pas l'estimation du temps par seconde d'audio.
+    """
+    from audio import SAMPLE_RATE, is_pcm
+    from jobs import DownloadFailed
+    from transcriber import extract_video_id
+
+    _messages.errors = []
+    start = time.perf_counter()
+    permanent = False
+    cached = False
+    transcribe_seconds = audio_seconds = None
+    audio_path = None
+    try:
+        if _init_error:
+            raise RuntimeError(_init_error)
+        # Même enchaînement que process_video, étape de transcription chronométrée à part
+        success = _transcriber.process_cached(url)
+        cached = success is not None
+        if not cached:
+            audio_path, title = _transcriber.download_audio(url, raise_errors=True)
+            success = False
+            if audio_path:
+                if is_pcm(audio_path):
+                    audio_seconds = os.path.getsize(audio_path) / 4 / SAMPLE_RATE
+                started = time.perf_counter()
+                success = _transcriber.transcribe_and_save(audio_path, title, extract_video_id(url))
+                transcribe_seconds = round(time.perf_counter() - started, 3)
+    except DownloadFailed as e:
+        _messages.errors.append(str(e))
+        permanent = e.permanent
+        success = False
+    except Exception as e:
+        _messages.errors.append(str(e))
+        success = False
+    finally:
+        if _transcriber is not None:
+            _transcriber.discard_audio(audio_path)
+
+    return {
+        'url': url,
+        'video_id': extract_video_id(url),
+        'success': bool(success),
+        'permanent': permanent,
+        'errors': list(_messages.errors) if not success else [],
+        'seconds': round(time.perf_counter() - start, 2),
+        'cached': cached,
+        'transcribe_seconds': transcribe_seconds,
+        'audio_seconds': audio_seconds,
+        'worker': os.getpid(),
+    }
+
+
+def _lost_result(url, error):
+    """Résultat d'une vidéo dont le worker n'a rien renvoyé (exception, worker arrêté)"""
+    from transcriber import extract_video_id
+
+    return {
+        'url': url,
+        'video_id': extract_video_id(url),
+        'success': False,
+        'permanent': False,
+        'errors': [error],
+        'seconds': 0,
+        'worker': None,
+    }
+
+
+def task_deadline(duration, rtf, minimum=1800.0):
+    """
+    Délai au-delà duquel une vidéo confiée à un worker est tenue pour perdue
+
+    Un worker tué (mémoire, segfault) est remplacé par le pool sans que sa
+    tâche ne renvoie rien : sans délai, le lot attendrait indéfiniment.
+    Large marge : dix fois le temps de transcription estimé, au moins
+    minimum secondes (téléchargement compris).
+    """
+    return max(minimum, 10 * (duration or 3600) * rtf)
+
+
+def read_urls(source):
+    """Lire les URLs (une par ligne, lignes vides et commentaires ignorés)"""
+    if source in (None, '-'):
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    urls = [line.strip() for line in lines]
+    return [url for url in urls if url and not url.startswith('#')]
+
+
+def _stored_result(job):
+    """Résultat d'une vidéo terminée ou abandonnée lors d'un lot précédent"""
+    from transcriber import extract_video_id
+
+    success = job['state'] == 'done'
+    return {
+        'url': job['url'],
+        'video_id': extract_video_id(job['url']),
+        'success': success,
+        'errors': [job['error']] if not success and job['error'] else [],
+        'seconds': 0,
+        'worker': None,
+        'skipped': True,
+    }
+
+
+def run_batch(urls, output_dir='transcriptions', model_size='large-v3', device='auto',
+              workers=1, threads=None, verbose=False, vad=False, chunk_workers=1,
+              metrics_dir=None, profiler=None, escalation_model=None, dtype='fp32',
+              jobs_db=None, max_attempts=5, backoff_seconds=30, batch_size=1, translate=False,
+              output_formats=('srt',)):
+    """
+    Transcrire toutes les URLs sur un pool de processus
+
+    Les vidéos passent par une file persistante (jobs_db) : celles restées
+    inachevées par un lot précédent sont traitées aussi, celles déjà
+    terminées ne sont pas refaites. Les playlists et chaînes sont
+    développées en leurs vidéos pas encore transcrites. Une erreur temporaire remet la vidéo en
+    file (au plus max_attempts essais, attente doublée à chaque échec), de
+    même qu'une vidéo dont le worker lève une exception ou ne répond pas
+    dans les délais (voir task_deadline).
+
+    Returns:
+        dict: Résumé du lot (compteurs et résultat de chaque URL, dans l'ordre
+              d'entrée, puis des vidéos reprises)
+    """
+    from jobs import QUEUED, JobStore, job_key
+    from playlists import expand_urls
+    from models import get_best_device, threads_per_worker
+    from scheduling import BatchProgress, RtfEstimator, format_eta, probe_durations
+    from scratch import sweep
+
+    # Dossiers de travail laissés par un lot interrompu
+    swept = sweep()
+    if swept:
+        print(f"Nettoyage: {swept} dossiers temporaires orphelins supprimés", file=sys.stderr, flush=True)
+
+    store = JobStore(jobs_db or Path(output_dir) / '.jobs.db',
+                     max_attempts=max_attempts, backoff_seconds=backoff_seconds)
+    recovered = store.recover()
+    if recovered:
+        print(f"Reprise de {recovered} vidéo(s) interrompue(s)", file=sys.stderr, flush=True)
+
+    # Playlists et chaînes : seules leurs vidéos pas encore faites sont ajoutées
+    expansion = expand_urls(urls, store.finished)
+    for url, error in expansion['errors']:
+        print(f"Playlist ou chaîne illisible: {url} ({error})", file=sys.stderr, flush=True)
+    if expansion['collections']:
+        print(f"{expansion['collections']} playlist(s) ou chaîne(s): {expansion['found']} vidéo(s), "
+              f"dont {expansion['skipped']} déjà transcrite(s)", file=sys.stderr, flush=True)
+    keys = list(dict.fromkeys(store.submit(expansion['urls'])))
+    store.set_durations({job_key(url): duration for url, duration in expansion['durations'].items()})
+
+    # Durées connues avant de commencer : ordre des vidéos et temps restant
+    unknown = [job['url'] for job in store.active() if job['duration'] is None]
+    if unknown:
+        print(f"Récupération de la durée de {len(unknown)} vidéo(s)...", file=sys.stderr, flush=True)
+        durations = probe_durations(unknown, Path(output_dir) / '.cache', workers=max(4, workers))
+        store.set_durations({job['key']: durations.get(job['url']) for job in store.active()})
+    active = store.active()
+    active_keys = {job['key'] for job in active}
+    total = len(active) + sum(1 for key in keys if key not in active_keys)
+
+    if device == 'auto':
+        device = get_best_device()
+    workers = max(1, min(workers, len(active)))
+    threads = threads or threads_per_worker(workers)
+
+    estimator = RtfEstimator(Path(output_dir) / '.cache' / 'rtf.db')
+    progress = BatchProgress({job['key']: job['duration'] for job in active},
+                             estimator.get(model_size, device, dtype), workers)
+    snapshot = progress.snapshot()
+    print(f"{total} vidéo(s) dont {len(active)} à traiter ({snapshot['total_seconds'] / 3600:.1f} h d'audio), "
+          f"{workers} worker(s) x {threads} thread(s), modèle {model_size} sur {device}, "
+          f"durée estimée {format_eta(snapshot['eta_seconds'])}", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    results = {}
+    if active:
+        finished = queue.Queue()
+        running = 0
+        pending = {}  # Clé -> (essai, échéance) des vidéos confiées aux workers
+        # 'spawn' : chaque worker démarre proprement (torch/CUDA ne supportent pas bien fork)
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(workers, initializer=_init_worker,
+                          initargs=(output_dir, model_size, device, threads, verbose, vad, chunk_workers,
+                                    metrics_dir, profiler, escalation_model, dtype, batch_size,
+                                    translate, output_formats)) as pool:
+            while True:
+                # Occuper chaque worker avec une vidéo prête
+                while running < workers:
+                    # Plusieurs workers : la plus longue vidéo d'abord (durée totale minimale)
+                    job = store.claim(longest_first=workers > 1)
+                    if job is None:
+                        break
+                    progress.start(job['key'])
+                    pending[job['key']] = (job['attempts'], time.time() + task_deadline(job['duration'], progress.rtf))
+                    pool.apply_async(
+                        _process_url, (job['url'],),
+                        callback=lambda result, job=job: finished.put((job, result)),
+                        error_callback=lambda e, job=job: finished.put(
+                            (job, _lost_result(job['url'], f'Erreur du worker: {e}')))
+                    )
+                    running += 1
+
+                # Tâches sans réponse dans les délais (worker arrêté) : échec temporaire
+                now = time.time()
+                for key, (attempts, deadline) in list(pending.items()):
+                    if deadline <= now:
+                        pending[key] = (attempts, float('inf'))
+                        job = dict(store.get(key), attempts=attempts)
+                        finished.put((job, _lost_result(job['url'], 'Pas de réponse du worker dans les délais')))
+
+                if running == 0:
+                    if not store.active():
+                        break
+                    # Seuls des nouveaux essais différés restent : attendre le premier
+                    time.sleep(max(0.05, (store.next_attempt() or 0) - time.time()))
+                    continue
+
+                deadlines = [deadline for _, deadline in pending.values() if deadline != float('inf')]
+                wake = [deadline for deadline in (store.next_attempt(), min(deadlines, default=None))
+                        if deadline is not None]
+                timeout = max(0.05, min(wake) - time.time()) if wake else None
+                try:
+                    job, result = finished.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if pending.get(job['key'], (None,))[0] != job['attempts']:
+                    continue  # Réponse tardive d'une tâche déjà tenue pour perdue
+                del pending[job['key']]
+                running -= 1
+
+                if result['success']:
+                    store.complete(job['key'])
+                    if not result.get('cached') and result.get('transcribe_seconds'):
+                        # Durée de l'audio décodé si connue, sinon celle annoncée par YouTube
+                        progress.rtf = estimator.update(model_size, device, dtype,
+                                                        result.get('audio_seconds') or job['duration'],
+                                                        result['transcribe_seconds'])
+                else:
+                    error = '; '.join(result['errors']) or 'Échec'
+                    if store.fail(job['key'], error, result['permanent']) == QUEUED:
+                        progress.stop(job['key'])
+                        print(f"[essai {job['attempts']}/{store.max_attempts}] ÉCHEC {job['url']}, "
+                              f"nouvel essai prévu: {error}", file=sys.stderr, flush=True)
+                        continue
+
+                progress.finish(job['key'])
+                results[job['key']] = dict(result, attempts=job['attempts'], duration=job['duration'])
+                status = 'OK' if result['success'] else 'ÉCHEC'
+                snapshot = progress.snapshot()
+                print(f"[{len(results)}/{len(active)}] {status} {result['url']} ({result['seconds']} s) - "
+                      f"{100 * snapshot['fraction']:.0f} % de l'audio, "
+                      f"reste environ {format_eta(snapshot['eta_seconds'])}", file=sys.stderr, flush=True)
+
+    ordered = [results.get(key) or _stored_result(store.get(key)) for key in keys]
+    submitted = set(keys)
+    ordered += [result for key, result in results.items() if key not in submitted]
+    succeeded = sum(result['success'] for result in ordered)
+    wall = time.perf_counter() - start
+    # Débit : secondes d'audio transcrites (vidéos de ce lot) par seconde écoulée
+    processed = sum(result['duration'] or 0 for result in results.values() if result['success'])
+    return {
+        'total': len(ordered),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'skipped': sum(1 for result in ordered if result.get('skipped')),
+        'wall_seconds': round(wall, 2),
+        'audio_seconds': round(progress.snapshot()['total_seconds'], 1),
+        'audio_per_second': round(processed / wall, 2) if processed and wall else None,
+        'rtf_estimate': round(progress.rtf, 4),
+        'workers': workers,
+        'threads_per_worker': threads,
+        'batch_size': batch_size,
+        'model_size': model_size,
+        'escalation_model': escalation_model,
+        'dtype': dtype,
+        'device': device,
+        'results': ordered,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('urls', nargs='?', default='-', help="Fichier d'URLs de vidéos, playlists ou chaînes (défaut: entrée standard)")
+    parser.add_argument('-o', '--output-dir', default='transcriptions', help='Dossier de sortie')
+    parser.add_argument('-m', '--model', default='large-v3', help='Taille du modèle Whisper')
+    parser.add_argument('-d', '--device', default='auto', help='cuda, mps, cpu ou auto')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='Nombre de processus workers')
+    parser.add_argument('-t', '--threads', type=int, help='Threads torch par worker (défaut: cœurs / workers)')
+    parser.add_argument('--dtype', choices=['fp32', 'int8'], default='fp32',
+                        help='Précision des poids (int8 : couches linéaires quantifiées, CPU seulement)')
+    parser.add_argument('--check-quality', nargs='+', metavar='AUDIO',
+                        help='Avec --dtype int8 : comparer d\'abord au fp32 sur ces enregistrements (WER)')
+    parser.add_argument('--max-wer', type=float, default=0.05,
+                        help='WER maximal toléré par --check-quality (le lot n\'est pas lancé au-delà)')
+    parser.add_argument('--escalate-to', metavar='MODELE',
+                        help="Grand modèle redécodant les passages incertains du modèle -m (cascade)")
+    parser.add_argument('--vad', action='store_true', help='Ignorer silences et fonds sonores avant Whisper')
+    parser.add_argument('--chunk-workers', type=int, default=1,
+                        help="Processus par vidéo longue, transcrite en morceaux parallèles")
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Fenêtres de 30 s décodées ensemble par worker (morceaux d\'une même vidéo)')
+    parser.add_argument('--translate', action='store_true',
+                        help='Écrire aussi la traduction anglaise (<titre>_<id>.en.txt), même passage de l\'encodeur')
+    parser.add_argument('--formats', default='srt',
+                        help='Formats écrits à côté du texte : srt, vtt, json (séparés par des virgules, vide = aucun)')
+    parser.add_argument('--metrics-dir',
+                        help='Dossier des mesures par étape (JSON lines + texte Prometheus, un fichier par worker)')
+    parser.add_argument('--profile', choices=['cprofile', 'torch'],
+                        help='Profiler chaque appel à model.transcribe (fichiers dans --metrics-dir)')
+    parser.add_argument('--jobs-db', help='File persistante du lot (défaut: .jobs.db dans le dossier de sortie)')
+    parser.add_argument('--max-attempts', type=int, default=5,
+                        help='Essais par vidéo sur erreur temporaire (réseau, limitation de débit)')
+    parser.add_argument('--retry-delay', type=float, default=30,
+                        help='Attente avant le 2e essai en secondes (doublée à chaque échec)')
+    parser.add_argument('--summary', help='Fichier JSON du résumé (défaut: sortie standard)')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Afficher la progression détaillée')
+    args = parser.parse_args(argv)
+    from segments import FORMATS
+
+    output_formats = tuple(fmt.strip() for fmt in args.formats.split(',') if fmt.strip())
+    unknown = [fmt for fmt in output_formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f'format(s) inconnu(s): {", ".join(unknown)}')
+
+    if args.check_quality:
+        if args.dtype == 'fp32':
+            parser.error('--check-quality compare une précision réduite (--dtype int8) au fp32')
+        from models import check_quantization, registry
+
+        report = check_quantization(args.model, args.check_quality, args.dtype, args.max_wer)
+        registry.unload(args.model)  # Les workers chargent leur propre modèle
+        print(f"{args.dtype} / fp32: WER {report['wer_mean']:.2%} (max {args.max_wer:.0%}), "
+              f"temps x{report['seconds'] / max(report['fp32_seconds'], 1e-9):.2f}, "
+              f"poids x{report['bytes'] / report['fp32_bytes']:.2f}", file=sys.stderr)
+        if not report['passed']:
+            print(f'WER au-dessus de {args.max_wer:.0%}: lot non lancé', file=sys.stderr)
+            return 1
+
+    urls = list(dict.fromkeys(read_urls(args.urls)))  # Sans doublons, ordre conservé
+    summary = run_batch(urls, args.output_dir, args.model, args.device,
+                        args.workers, args.threads, args.verbose, args.vad,
+                        args.chunk_workers, args.metrics_dir, args.profile,
+                        args.escalate_to, args.dtype, args.jobs_db,
+                        args.max_attempts, args.retry_delay, args.batch_size,
+                        args.translate, output_formats)
+    if not summary['total']:
+        print('Aucune URL à traiter', file=sys.stderr)
+        return 2
+
+    output = json.dumps(summary, indent=2, ensure_ascii=False)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
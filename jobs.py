@@ -0,0 +1,274 @@
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from urls import extract_video_id
+
+# États d'une vidéo dans la file
+QUEUED = 'queued'
+DOWNLOADING = 'downloading'
+TRANSCRIBING = 'transcribing'
+DONE = 'done'
+FAILED = 'failed'
+ACTIVE_STATES = (QUEUED, DOWNLOADING, TRANSCRIBING)
+
+# Erreurs yt-dlp qu'un nouvel essai ne corrigera pas
+PERMANENT_ERRORS = (
+    'Private video',
+    'Video unavailable',
+    'This video is unavailable',
+    'This video has been removed',
+    'members-only',
+    'Join this channel',
+    'Sign in to confirm your age',
+    'account associated with this video has been terminated',
+    'copyright claim',
+    'Unsupported URL',
+    'is not a valid URL',
+)
+
+
+def is_permanent_error(message):
+    """Indique si une erreur de téléchargement est définitive (sinon : nouvel essai)"""
+    return any(pattern.lower() in message.lower() for pattern in PERMANENT_ERRORS)
+
+
+class DownloadFailed(Exception):
+    def __init__(self, message, permanent=False):
+        """Échec de téléchargement, classé définitif ou temporaire"""
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def job_key(url):
+    """Clé de déduplication : identifiant YouTube, ou l'URL elle-même pour les autres sites"""
+    return extract_video_id(url) or url.strip()
+
+
+class JobStore:
+    def __init__(self, db_path, max_attempts=5, backoff_seconds=30, max_backoff_seconds=3600):
+        """
+        File persistante des vidéos à transcrire (SQLite)
+
+        Chaque vidéo passe par queued -> downloading -> transcribing -> done,
+        ou failed. Une vidéo soumise deux fois (même identifiant YouTube, quelle
+        que soit la forme de l'URL) n'est traitée qu'une fois. Après un arrêt
+        brutal, recover() remet en file les vidéos qui étaient en cours : la
+        transcription reprend alors sur son journal.
+
+        Args:
+            db_path: Fichier de la base
+            max_attempts: Essais avant d'abandonner une vidéo sur erreur temporaire
+            backoff_seconds: Attente avant le 2e essai, doublée à chaque échec
+            max_backoff_seconds: Attente maximale entre deux essais
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._lock = threading.Lock()
+        # Réveille les workers en attente quand une vidéo change d'état
+        self.changed = threading.Condition()
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    title TEXT,
+                    duration REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL DEFAULT 0,
+                    error TEXT,
+                    error_kind TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            ''')
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            if 'duration' not in columns:  # Base créée avant l'ordonnancement par durée
+                conn.execute('ALTER TABLE jobs ADD COLUMN duration REAL')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_state ON jobs (state, next_attempt)')
+
+    @contextmanager
+    def _connect(self):
+        """Ouvrir une connexion SQLite (transaction validée puis connexion fermée)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _notify(self):
+        with self.changed:
+            self.changed.notify_all()
+
+    def submit(self, urls):
+        """
+        Ajouter des URLs à la file
+
+        Une vidéo déjà connue n'est pas dupliquée : terminée, elle n'est pas
+        refaite ; en échec temporaire, elle est remise en file (nouvelle série
+        d'essais) ; en échec définitif, elle reste en échec.
+
+        Returns:
+            list: Clé de chaque URL (dans l'ordre, doublons compris)
+        """
+        keys = [job_key(url) for url in urls]
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            for key, url in zip(keys, urls):
+                conn.execute(
+                    'INSERT OR IGNORE INTO jobs (key, url, state, created, updated) VALUES (?, ?, ?, ?, ?)',
+                    (key, url.strip(), QUEUED, now, now)
+                )
+                conn.execute(
+                    '''UPDATE jobs SET state = ?, attempts = 0, next_attempt = 0, updated = ?
+                       WHERE key = ? AND state = ? AND error_kind = 'transient' ''',
+                    (QUEUED, now, key, FAILED)
+                )
+        self._notify()
+        return keys
+
+    def recover(self):
+        """
+        Remettre en file les vidéos interrompues (downloading/transcribing)
+
+        Returns:
+            int: Nombre de vidéos reprises
+        """
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute('UPDATE jobs SET state = ?, updated = ? WHERE state IN (?, ?)',
+                                  (QUEUED, time.time(), DOWNLOADING, TRANSCRIBING))
+        return cursor.rowcount
+
+    def claim(self, longest_first=False):
+        """
+        Prendre la prochaine vidéo prête (passe en downloading)
+
+        Args:
+            longest_first: La plus longue d'abord (durée totale du lot minimale
+                           avec plusieurs workers), sinon dans l'ordre de
+                           soumission ; une durée inconnue compte comme la moyenne
+
+        Returns:
+            dict: La vidéo, ou None si aucune n'est prête maintenant
+        """
+        now = time.time()
+        order = 'created, rowid'
+        if longest_first:
+            order = ('COALESCE(duration, (SELECT AVG(duration) FROM jobs WHERE duration IS NOT NULL), 0) DESC, '
+                     + order)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                f'SELECT * FROM jobs WHERE state = ? AND next_attempt <= ? ORDER BY {order} LIMIT 1',
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ? WHERE key = ?',
+                         (DOWNLOADING, now, row['key']))
+        return dict(row, state=DOWNLOADING, attempts=row['attempts'] + 1)
+
+    def update(self, key, state, title=None):
+        """Changer l'état d'une vidéo (et mémoriser son titre)"""
+        with self._lock, self._connect() as conn:
+            conn.execute('UPDATE jobs SET state = ?, title = COALESCE(?, title), updated = ? WHERE key = ?',
+                         (state, title, time.time(), key))
+        self._notify()
+
+    def set_durations(self, durations):
+        """Enregistrer la durée (secondes) de vidéos : clé -> durée"""
+        with self._lock, self._connect() as conn:
+            conn.executemany('UPDATE jobs SET duration = ? WHERE key = ?',
+                             [(duration, key) for key, duration in durations.items() if duration])
+
+    def complete(self, key):
+        with self._lock, self._connect() as conn:
+            conn.execute('UPDATE jobs SET state = ?, error = NULL, error_kind = NULL, updated = ? WHERE key = ?',
+                         (DONE, time.time(), key))
+        self._notify()
+
+    def fail(self, key, error, permanent=False):
+        """
+        Enregistrer un échec
+
+        Une erreur temporaire remet la vidéo en file après une attente
+        exponentielle (avec un peu d'aléa), jusqu'à max_attempts essais.
+
+        Returns:
+            str: Nouvel état (QUEUED si un nouvel essai est prévu, FAILED sinon)
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            attempts = conn.execute('SELECT attempts FROM jobs WHERE key = ?', (key,)).fetchone()[0]
+            if permanent or attempts >= self.max_attempts:
+                state, next_attempt = FAILED, 0
+            else:
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempts - 1))
+                state, next_attempt = QUEUED, now + delay * random.uniform(0.8, 1.2)
+            conn.execute(
+                'UPDATE jobs SET state = ?, next_attempt = ?, error = ?, error_kind = ?, updated = ? WHERE key = ?',
+                (state, next_attempt, str(error)[:500], 'permanent' if permanent else 'transient', now, key)
+            )
+        self._notify()
+        return state
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE key = ?', (key,)).fetchone()
+        return dict(row) if row else None
+
+    def finished(self, keys):
+        """
+        Index des vidéos déjà faites : clés terminées ou abandonnées définitivement
+        
+        Une vidéo en échec temporaire n'en fait pas partie (une nouvelle
+        soumission relance ses essais).
+        
+        Returns:
+            set: Clés de keys déjà terminées ou abandonnées
+        """
+        keys = list(dict.fromkeys(keys))
+        found = set()
+        with self._connect() as conn:
+            for first in range(0, len(keys), 500):  # Limite de paramètres SQLite
+                batch = keys[first:first + 500]
+                rows = conn.execute(
+                    f"""SELECT key FROM jobs WHERE key IN ({', '.join('?' * len(batch))})
+                        AND (state = ? OR (state = ? AND error_kind = 'permanent'))""",
+                    batch + [DONE, FAILED]
+                ).fetchall()
+                found.update(row['key'] for row in rows)
+        return found
+
+    def active(self):
+        """Vidéos pas encore terminées ni abandonnées, dans l'ordre de soumission"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE state IN ({', '.join('?' * len(ACTIVE_STATES))}) ORDER BY created, rowid",
+                ACTIVE_STATES
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def next_attempt(self):
+        """Heure du prochain essai prévu (None si aucune vidéo n'attend)"""
+        with self._connect() as conn:
+            return conn.execute('SELECT MIN(next_attempt) FROM jobs WHERE state = ?', (QUEUED,)).fetchone()[0]
+
+    def counts(self):
+        """Nombre de vidéos par état"""
+        with self._connect() as conn:
+            return dict(conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state').fetchall())
+
+    def wait(self, timeout):
+        """Attendre un changement d'état (ou timeout secondes)"""
+        with self.changed:
+            self.changed.wait(timeout)
@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from segments import SegmentStore
+
+
+class TranscriptJournal:
+    def __init__(self, path, header=None):
+        """
+        Journal de transcription sur disque (JSON lines, un enregistrement par ligne)
+
+        Les segments y sont ajoutés au fur et à mesure, morceau par morceau,
+        et synchronisés sur disque : après un arrêt brutal, la transcription
+        reprend après le dernier morceau validé. Le journal peut aussi être lu
+        en cours d'écriture pour suivre une transcription partielle. Les
+        segments validés sont gardés en colonnes (SegmentStore).
+
+        Enregistrements :
+            {"type": "header", ...}  identité de la transcription
+            {"type": "chunk", "end": s, "language": ..., "segments": [...],
+             "translation": [...]}  (traduction anglaise, si demandée)
+            {"type": "done"}
+
+        Args:
+            path: Fichier du journal (repris s'il existe déjà)
+            header: Métadonnées écrites en tête d'un nouveau journal
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.header = {}
+        self.language = None
+        self.committed_until = 0.0
+        self.done = False
+        self._segments = SegmentStore.empty()
+        self._translation = SegmentStore.empty('en')
+
+        if self.path.exists():
+            self._load()
+        if not self.header:
+            self.header = dict(header or {}, type='header', created=time.time())
+            self._append(self.header)
+
+    def _load(self):
+        """Relire le journal et tronquer une éventuelle ligne incomplète"""
+        valid_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+                self._apply(record)
+
+        if valid_size < self.path.stat().st_size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def _apply(self, record):
+        if record['type'] == 'header':
+            self.header = record
+        elif record['type'] == 'chunk':
+            self._segments.extend(record['segments'])
+            self._translation.extend(record.get('translation'))
+            self.committed_until = record['end']
+            self.language = record.get('language') or self.language
+            self._segments.language = self.language
+        elif record['type'] == 'done':
+            self.done = True
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=float) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit_chunk(self, end, segments, language=None, translation=None):
+        """
+        Valider un morceau transcrit
+
+        Args:
+            end: Position (secondes) jusqu'à laquelle l'audio est transcrit
+            segments: Segments retenus pour ce morceau
+            language: Langue détectée
+            translation: Segments de la traduction anglaise du morceau
+        """
+        record = {'type': 'chunk', 'end': end, 'language': language or self.language, 'segments': segments}
+        if translation is not None:
+            record['translation'] = translation
+        self._append(record)
+        self._apply(record)
+
+    def mark_done(self):
+        self._append({'type': 'done'})
+        self.done = True
+
+    @property
+    def segments(self):
+        """SegmentStore des segments validés"""
+        return self._segments
+
+    @property
+    def translation(self):
+        return self._translation
+
+    @property
+    def text(self):
+        return self._segments.join_text()
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+def tail(path, poll_seconds=0.5, timeout=None):
+    """
+    Suivre un journal en cours d'écriture
+
+    Yields:
+        dict: Chaque segment dès qu'il est validé, jusqu'à l'enregistrement 'done'
+              (ou jusqu'à timeout secondes sans nouveau contenu)
+    """
+    path = Path(path)
+    position = 0
+    buffer = b''
+    last_activity = time.monotonic()
+    while True:
+        if path.exists():
+            with open(path, 'rb') as f:
+                f.seek(position)
+                data = f.read()
+            position += len(data)
+            buffer += data
+            if data:
+                last_activity = time.monotonic()
+
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                record = json.loads(line)
+                if record['type'] == 'chunk':
+                    yield from record['segments']
+                elif record['type'] == 'done':
+                    return
+
+        if timeout is not None and time.monotonic() - last_activity > timeout:
+            return
+        time.sleep(poll_seconds)
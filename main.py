@@ -4,18 +4,20 @@ import threading
 from pathlib import Path
 import queue
 import sys
+import logging
+import logging.handlers
 from datetime import datetime
-import torch
-from transcriber import YouTubeTranscriber
 
-def get_best_device():
-    """Détecte automatiquement le meilleur device disponible"""
-    if torch.cuda.is_available():
-        return 'cuda'
-    elif torch.backends.mps.is_available():
-        return 'mps'
-    else:
-        return 'cpu'
+from jobs import JobStore
+from urls import is_youtube_url
+
+# torch, whisper et yt_dlp (via transcriber) sont importés à la première
+# utilisation : la fenêtre s'affiche sans attendre leur chargement
+
+# Lignes gardées dans la zone de logs (le journal complet est dans le fichier de logs)
+MAX_LOG_LINES = 1000
+# Messages traités au plus par passage de check_queue (le reste au passage suivant)
+MAX_MESSAGES_PER_TICK = 2000
 
 class TranscriberGUI:
     def __init__(self, root):
@@ -29,14 +31,78 @@ class TranscriberGUI:
         # Créer le dossier de sortie
         self.output_dir = Path("transcriptions")
         self.output_dir.mkdir(exist_ok=True)
+        self.log_file = self.output_dir / '.logs' / 'transcriber.log'
+        self.file_logger = self.setup_log_file()
+        
+        # File persistante : un lot interrompu (fermeture, plantage) reprend au lancement suivant
+        self.job_store = JobStore(self.output_dir / '.jobs.db')
         
         self.setup_ui()
         self.transcriber = None
         self.is_processing = False
         
+        # Pipeline: téléchargements simultanés et audios préchargés (max 2 Go)
+        self.download_workers = 2
+        self.prefetch = 2
+        self.max_prefetch_mb = 2048
+        
+        # Device et modèle choisis par le thread de préchargement (voir warm_up)
+        self.device = None
+        self.model_size = None
+        self.escalation_model = None
+        self.use_vad = False  # Pré-filtre des silences et fonds sonores
+        self.translate = False  # Traduction anglaise en plus (<titre>_<id>.en.txt)
+        self.output_formats = ('srt',)  # Sous-titres écrits à côté du texte (srt, vtt, json)
+        
+        # Modèle chargé une seule fois par processus, en arrière-plan dès que la fenêtre est affichée
+        self.warmup_thread = threading.Thread(target=self.warm_up, daemon=True)
+        self.root.after_idle(self.warmup_thread.start)
+        
         # Démarrer la vérification de la queue
         self.check_queue()
     
+    def warm_up(self):
+        """Importer les dépendances lourdes, détecter le device et charger le modèle (arrière-plan)"""
+        self.message_queue.put(('model', 'Modèle: chargement...', 'INFO'))
+        try:
+            from models import registry, get_best_device
+            import transcriber  # noqa: F401 - whisper et yt_dlp prêts pour le premier lot
+            
+            self.device = get_best_device()
+            # Sur CPU, cascade : small transcrit tout, large-v3 (chargé à la demande)
+            # ne redécode que les passages où small est peu sûr de lui
+            self.escalation_model = 'large-v3' if self.device == 'cpu' else None
+            self.model_size = 'small' if self.escalation_model else 'large-v3'
+            registry.get(self.model_size, self.device)
+        except Exception as e:
+            self.message_queue.put(('log', f'Erreur lors du chargement du modèle: {str(e)}', 'ERROR'))
+            self.message_queue.put(('model', 'Modèle: erreur de chargement', 'ERROR'))
+            return
+        self.message_queue.put(('model', f'Modèle prêt ({self.model_size} sur {self.device})', 'SUCCESS'))
+        pending = len(self.job_store.active())
+        if pending:
+            self.message_queue.put(('log', f'{pending} vidéo(s) en attente du lot précédent : '
+                                           f'cliquez sur Transcrire pour reprendre', 'WARNING'))
+    
+    def setup_log_file(self):
+        """
+        Journal complet de la session dans un fichier tournant (5 Mo x 3)
+        
+        La zone de logs ne garde que les MAX_LOG_LINES dernières lignes ; le
+        bouton Copier lit ce fichier. Chaque lancement commence un nouveau fichier.
+        """
+        self.log_file.parent.mkdir(exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(self.log_file, maxBytes=5 * 1024**2,
+                                                       backupCount=3, encoding='utf-8', delay=True)
+        if self.log_file.exists() and self.log_file.stat().st_size:
+            handler.doRollover()
+        handler.setFormatter(logging.Formatter('[%(asctime)s] %(message)s', datefmt='%H:%M:%S'))
+        logger = logging.getLogger('youtube_transcriber.gui')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.handlers = [handler]
+        return logger
+    
     def setup_ui(self):
         # Style
         style = ttk.Style()
@@ -61,8 +127,12 @@ class TranscriberGUI:
                              font=('Arial', 10, 'bold'))
         url_label.grid(row=0, column=0, sticky=tk.W)
 
+        # État du modèle (chargé en arrière-plan)
+        self.model_label = ttk.Label(url_frame, text="Modèle: en attente...")
+        self.model_label.grid(row=0, column=1, sticky=tk.E, padx=(10, 0))
+
         clear_btn = ttk.Button(url_frame, text="Effacer", command=self.clear_urls)
-        clear_btn.grid(row=0, column=1, sticky=tk.E, padx=(10, 0))
+        clear_btn.grid(row=0, column=2, sticky=tk.E, padx=(10, 0))
 
         # Zone de texte pour les URLs
         self.url_text = scrolledtext.ScrolledText(main_frame, height=8, width=70)
@@ -135,9 +205,26 @@ class TranscriberGUI:
     
     def log(self, message, level='INFO'):
         """Ajouter un message au log avec timestamp"""
+        self.log_many([(message, level)])
+
+    def log_many(self, messages):
+        """
+        Ajouter plusieurs messages au log en un seul affichage
+        
+        Un seul insert et un seul défilement pour tout le lot ; au-delà de
+        MAX_LOG_LINES, les plus anciennes lignes quittent la zone de logs
+        (elles restent dans le fichier de logs).
+        """
         timestamp = datetime.now().strftime('%H:%M:%S')
-        formatted_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, formatted_message, level)
+        chunks = []
+        for message, level in messages:
+            chunks.extend((f"[{timestamp}] {message}\n", level))
+            self.file_logger.info(message)
+        self.log_text.insert(tk.END, *chunks)
+        
+        lines = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if lines > MAX_LOG_LINES:
+            self.log_text.delete('1.0', f'{lines - MAX_LOG_LINES + 1}.0')
         self.log_text.see(tk.END)
 
     def clear_urls(self):
@@ -145,8 +232,13 @@ class TranscriberGUI:
         self.url_text.delete('1.0', tk.END)
 
     def copy_logs(self):
-        """Copier le contenu des logs dans le presse-papier"""
-        logs_content = self.log_text.get('1.0', tk.END)
+        """Copier les logs de la session (fichier complet) dans le presse-papier"""
+        for handler in self.file_logger.handlers:
+            handler.flush()
+        if self.log_file.exists():
+            logs_content = self.log_file.read_text(encoding='utf-8', errors='replace')
+        else:
+            logs_content = self.log_text.get('1.0', tk.END)
         if logs_content.strip():  # Vérifier qu'il y a du contenu
             self.root.clipboard_clear()
             self.root.clipboard_append(logs_content)
@@ -163,17 +255,18 @@ class TranscriberGUI:
         
         # Récupérer les URLs
         urls_text = self.url_text.get('1.0', tk.END).strip()
-        urls = [url.strip() for url in urls_text.split('\n') if url.strip() and 'youtube.com' in url or 'youtu.be' in url]
+        # Vidéos, playlists et chaînes (développées au lancement du lot)
+        urls = [url.strip() for url in urls_text.split('\n') if is_youtube_url(url)]
         
-        if not urls:
+        if not urls and not self.job_store.active():
             messagebox.showerror("Erreur", "Veuillez entrer au moins une URL YouTube valide!")
             return
         
         self.is_processing = True
         self.transcribe_btn.config(state='disabled')
         
-        # Réinitialiser les barres de progression
-        self.global_progress['maximum'] = len(urls)
+        # Réinitialiser les barres de progression (en %, le lot peut inclure des vidéos reprises)
+        self.global_progress['maximum'] = 100
         self.global_progress['value'] = 0
         
         # Lancer la transcription dans un thread
@@ -186,41 +279,80 @@ class TranscriberGUI:
         try:
             # Initialiser le transcripteur
             self.message_queue.put(('log', 'Initialisation de Whisper...', 'INFO'))
-            self.message_queue.put(('detail', 'Chargement du modèle Whisper large-v3...', 0))
+            self.message_queue.put(('detail', 'Chargement du modèle Whisper...', 0))
+            self.warmup_thread.join()  # Device choisi et modèle chargé (ou en échec)
+            from metrics import Metrics
+            from models import get_best_device, registry
+            from pipeline import BatchPipeline
+            from scheduling import format_eta
+            from transcriber import YouTubeTranscriber
+            if self.device is None:
+                # Le préchargement a échoué avant de choisir le device
+                self.device = get_best_device()
+                self.model_size = self.model_size or 'large-v3'
             
+            # Le modèle vient du registre : il n'est chargé qu'au premier lot
             self.transcriber = YouTubeTranscriber(
                 output_dir=self.output_dir,
-                model_size='large-v3',
-                device=get_best_device(),  # Auto-détection: cuda (NVIDIA) / mps (M1) / cpu
-                message_queue=self.message_queue
+                model_size=self.model_size,
+                device=self.device,  # Auto-détection: cuda (NVIDIA) / mps (M1) / cpu
+                message_queue=self.message_queue,
+                vad=self.use_vad,
+                translate=self.translate,
+                output_formats=self.output_formats,
+                escalation_model=self.escalation_model,
+                metrics=Metrics(
+                    jsonl_path=self.output_dir / '.metrics' / 'metrics.jsonl',
+                    prometheus_path=self.output_dir / '.metrics' / 'metrics.prom'
+                )
             )
             
             self.message_queue.put(('log', f'Modèle chargé avec succès! GPU détecté: {self.transcriber.device}', 'SUCCESS'))
+            memory = registry.memory_usage()
+            self.message_queue.put(('log', f'Mémoire des modèles: {memory["total_model_bytes"] / 1024**2:.0f} Mo', 'INFO'))
             
-            successful = 0
-            failed = 0
-            
-            for i, url in enumerate(urls, 1):
-                self.message_queue.put(('global', f'Traitement vidéo {i}/{len(urls)}', i-1))
-                self.message_queue.put(('log', f'\n--- Vidéo {i}/{len(urls)} ---', 'INFO'))
-                self.message_queue.put(('log', f'URL: {url}', 'INFO'))
-                
-                success = self.transcriber.process_video(url)
-                
+            def on_done(index, url, success):
+                nonlocal done, successful
+                done += 1
+                successful += success
                 if success:
-                    successful += 1
-                    self.message_queue.put(('log', f'✓ Vidéo {i} transcrite avec succès!', 'SUCCESS'))
+                    self.message_queue.put(('log', f'✓ Vidéo {index + 1} transcrite avec succès!', 'SUCCESS'))
                 else:
-                    failed += 1
-                    self.message_queue.put(('log', f'✗ Échec de la vidéo {i}', 'ERROR'))
-                
-                self.message_queue.put(('global', f'Vidéo {i}/{len(urls)} terminée', i))
+                    self.message_queue.put(('log', f'✗ Échec de la vidéo {index + 1} ({url})', 'ERROR'))
+            
+            def on_progress(progress):
+                # Avancement en secondes d'audio (une vidéo d'une heure pèse plus qu'un extrait)
+                text = f"Vidéo {progress['finished']}/{progress['total']} terminée"
+                if progress['finished'] < progress['total']:
+                    text += f" - environ {format_eta(progress['eta_seconds'])} restantes"
+                self.message_queue.put(('global', text, 100 * progress['fraction']))
+            
+            done = successful = 0
+            self.message_queue.put(('global', f'Traitement de {len(urls)} vidéo(s)', 0))
+            
+            # Le téléchargement de la vidéo suivante se fait pendant la transcription ;
+            # la file persistante reprend un lot interrompu au lancement suivant
+            pipeline = BatchPipeline(
+                self.transcriber,
+                download_workers=self.download_workers,
+                prefetch=self.prefetch,
+                max_prefetch_mb=self.max_prefetch_mb,
+                message_queue=self.message_queue,
+                job_store=self.job_store
+            )
+            self.transcriber.cleanup_temp_files()  # Orphelins d'une session interrompue
+            pipeline.run(urls, on_done=on_done, on_progress=on_progress)
+            
+            failed = done - successful
             
             # Résumé final
             self.message_queue.put(('log', f'\n========== RÉSUMÉ ==========', 'INFO'))
-            self.message_queue.put(('log', f'Réussies: {successful}/{len(urls)}', 'SUCCESS'))
+            self.message_queue.put(('log', f'Réussies: {successful}/{done}', 'SUCCESS'))
             if failed > 0:
-                self.message_queue.put(('log', f'Échouées: {failed}/{len(urls)}', 'WARNING'))
+                self.message_queue.put(('log', f'Échouées: {failed}/{done}', 'WARNING'))
+            rtf = self.transcriber.metrics.summary()['real_time_factor']
+            if rtf is not None:
+                self.message_queue.put(('log', f'Vitesse: {rtf:.2f} s de calcul par seconde d\'audio', 'INFO'))
             self.message_queue.put(('log', f'Fichiers sauvegardés dans: {self.output_dir.absolute()}', 'INFO'))
             
             self.message_queue.put(('detail', 'Transcription terminée!', 100))
@@ -231,36 +363,54 @@ class TranscriberGUI:
             self.message_queue.put(('finished', '', ''))
     
     def check_queue(self):
-        """Vérifier la queue pour les messages du thread de transcription"""
+        """
+        Vérifier la queue pour les messages du thread de transcription
+        
+        Les messages reçus depuis le dernier passage sont regroupés : les logs
+        sont affichés en un seul insert, et seule la dernière valeur de chaque
+        barre de progression est appliquée.
+        """
+        logs = []
+        latest = {}
+        finished = False
         try:
-            while True:
+            for _ in range(MAX_MESSAGES_PER_TICK):
                 msg_type, content, extra = self.message_queue.get_nowait()
-                
                 if msg_type == 'log':
-                    self.log(content, extra)
-                elif msg_type == 'global':
-                    self.global_label.config(text=content)
-                    self.global_progress['value'] = extra
-                elif msg_type == 'detail':
-                    self.detail_label.config(text=content)
-                    if extra == 0:
-                        self.detail_progress.start(10)
-                    elif extra == 100:
-                        self.detail_progress.stop()
-                    else:
-                        if self.detail_progress['mode'] == 'indeterminate':
-                            self.detail_progress.stop()
-                            self.detail_progress['mode'] = 'determinate'
-                        self.detail_progress['value'] = extra
+                    logs.append((content, extra))
                 elif msg_type == 'finished':
-                    self.is_processing = False
-                    self.transcribe_btn.config(state='normal')
-                    self.detail_progress.stop()
-                    messagebox.showinfo("Terminé", "Toutes les transcriptions sont terminées!")
-                    
+                    finished = True
+                else:
+                    latest[msg_type] = (content, extra)
         except queue.Empty:
             pass
         
+        if logs:
+            self.log_many(logs)
+        if 'global' in latest:
+            content, extra = latest['global']
+            self.global_label.config(text=content)
+            self.global_progress['value'] = extra
+        if 'detail' in latest:
+            content, extra = latest['detail']
+            self.detail_label.config(text=content)
+            if extra == 0:
+                self.detail_progress.start(10)
+            elif extra == 100:
+                self.detail_progress.stop()
+            else:
+                if self.detail_progress['mode'] == 'indeterminate':
+                    self.detail_progress.stop()
+                    self.detail_progress['mode'] = 'determinate'
+                self.detail_progress['value'] = extra
+        if 'model' in latest:
+            self.model_label.config(text=latest['model'][0])
+        if finished:
+            self.is_processing = False
+            self.transcribe_btn.config(state='normal')
+            self.detail_progress.stop()
+            messagebox.showinfo("Terminé", "Toutes les transcriptions sont terminées!")
+        
         # Revérifier dans 100ms
         self.root.after(100, self.check_queue)
     
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Metrics:
+    def __init__(self, jsonl_path=None, prometheus_path=None, profiler=None, profile_dir=None):
+        """
+        Mesure du temps passé dans chaque étape du traitement
+
+        Chaque étape est enregistrée comme un span (durée, octets, secondes
+        d'audio), écrit en JSON lines et agrégé dans un fichier au format texte
+        Prometheus. Sans fichier de sortie, les agrégats restent en mémoire.
+
+        Args:
+            jsonl_path: Fichier JSON lines recevant chaque span
+            prometheus_path: Fichier texte Prometheus réécrit après chaque span
+            profiler: None, 'cprofile' ou 'torch' - profilage de model.transcribe
+            profile_dir: Dossier des profils (défaut: dossier du fichier JSON lines)
+        """
+        self.jsonl_path = Path(jsonl_path) if jsonl_path else None
+        self.prometheus_path = Path(prometheus_path) if prometheus_path else None
+        self.profiler = profiler
+        self.profile_dir = Path(profile_dir or (self.jsonl_path.parent if self.jsonl_path else '.'))
+        for path in (self.jsonl_path, self.prometheus_path):
+            if path:
+                path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._totals = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Mesurer une étape
+
+        Le dictionnaire produit peut être complété pendant l'étape
+        (span['bytes'], span['audio_seconds'], ...).
+        """
+        record = {'span': name, 'bytes': 0, 'audio_seconds': 0.0}
+        record.update(attrs)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['error'] = True
+            raise
+        finally:
+            record['duration_s'] = time.perf_counter() - start
+            self.record(record)
+
+    def observe(self, name, duration, **attrs):
+        """Enregistrer une durée mesurée ailleurs (ex. attente dans une file)"""
+        record = {'span': name, 'duration_s': duration, 'bytes': 0, 'audio_seconds': 0.0}
+        record.update(attrs)
+        self.record(record)
+
+    def record(self, record):
+        record['ts'] = time.time()
+        with self._lock:
+            totals = self._totals.setdefault(record['span'], {
+                'count': 0, 'seconds': 0.0, 'bytes': 0, 'audio_seconds': 0.0, 'errors': 0
+            })
+            totals['count'] += 1
+            totals['seconds'] += record['duration_s']
+            totals['bytes'] += record.get('bytes') or 0
+            totals['audio_seconds'] += record.get('audio_seconds') or 0.0
+            totals['errors'] += 1 if record.get('error') else 0
+
+            if self.jsonl_path:
+                with open(self.jsonl_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            if self.prometheus_path:
+                self._write_prometheus()
+
+    def summary(self):
+        """
+        Agrégats par étape et métriques dérivées
+
+        Returns:
+            dict: stages (compteurs par étape), real_time_factor (temps de
+                  transcription / durée audio), download_bytes_per_second,
+                  queue_wait_seconds (attente moyenne dans la file)
+        """
+        with self._lock:
+            stages = {name: dict(totals) for name, totals in self._totals.items()}
+
+        def ratio(stage, numerator, denominator):
+            totals = stages.get(stage)
+            if not totals or not totals[denominator]:
+                return None
+            return totals[numerator] / totals[denominator]
+
+        return {
+            'stages': stages,
+            'real_time_factor': ratio('transcription', 'seconds', 'audio_seconds'),
+            'download_bytes_per_second': ratio('download', 'bytes', 'seconds'),
+            'queue_wait_seconds': ratio('queue_wait', 'seconds', 'count'),
+        }
+
+    def _write_prometheus(self):
+        summary = self.summary()
+        lines = []
+        for metric, field, help_text in (
+            ('transcriber_stage_seconds_total', 'seconds', 'Temps cumulé par étape'),
+            ('transcriber_stage_count_total', 'count', "Nombre d'exécutions par étape"),
+            ('transcriber_stage_bytes_total', 'bytes', 'Octets traités par étape'),
+            ('transcriber_stage_audio_seconds_total', 'audio_seconds', "Secondes d'audio traitées par étape"),
+            ('transcriber_stage_errors_total', 'errors', 'Erreurs par étape'),
+        ):
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for stage, totals in sorted(summary['stages'].items()):
+                lines.append(f'{metric}{{stage="{stage}"}} {totals[field]}')
+
+        for metric, key, help_text in (
+            ('transcriber_real_time_factor', 'real_time_factor', 'Temps de transcription / durée audio'),
+            ('transcriber_download_bytes_per_second', 'download_bytes_per_second', 'Débit de téléchargement'),
+            ('transcriber_queue_wait_seconds', 'queue_wait_seconds', "Attente moyenne dans la file de transcription"),
+        ):
+            if summary[key] is not None:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} gauge')
+                lines.append(f'{metric} {summary[key]}')
+
+        # Écriture atomique : un scraper ne lit jamais un fichier à moitié écrit
+        tmp_path = self.prometheus_path.with_name(f'.{self.prometheus_path.name}.{os.getpid()}.tmp')
+        tmp_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        tmp_path.replace(self.prometheus_path)
+
+    @contextmanager
+    def profile(self, name):
+        """Profiler un bloc (model.transcribe) si un profileur est configuré"""
+        if not self.profiler:
+            yield
+            return
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        stem = self.profile_dir / f'{name}-{os.getpid()}-{int(time.time() * 1000)}'
+        if self.profiler == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(f'{stem}.prof')
+        elif self.profiler == 'torch':
+            import torch
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            with torch.profiler.profile(activities=activities, record_shapes=True) as profiler:
+                yield
+            profiler.export_chrome_trace(f'{stem}.json')
+        else:
+            raise ValueError(f'Profileur inconnu: {self.profiler}')
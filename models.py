@@ -0,0 +1,321 @@
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+from pathlib import Path
+
+import torch
+import whisper
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def get_best_device():
+    """Détecte automatiquement le meilleur device disponible"""
+    if torch.cuda.is_available():
+        return 'cuda'
+    elif torch.backends.mps.is_available():
+        return 'mps'
+    else:
+        return 'cpu'
+
+
+def threads_per_worker(workers):
+    """Part des cœurs CPU revenant à chacun des workers"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def _load_fp32(model_size, device):
+    return whisper.load_model(model_size, device=device)
+
+
+def quantized_cache_dir():
+    """Dossier des modèles quantifiés (à côté des modèles téléchargés par Whisper)"""
+    default = os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(os.getenv('XDG_CACHE_HOME', default)) / 'whisper' / 'quantized'
+
+
+def quantize_int8(model):
+    """
+    Quantifier dynamiquement en int8 les couches linéaires d'un modèle fp32
+
+    Les couches Linear de Whisper sont une sous-classe de nn.Linear, que
+    quantize_dynamic ne reconnaît pas : elles sont d'abord ramenées à
+    nn.Linear (leur forward ne fait que convertir les poids au type de
+    l'entrée, inutile en fp32).
+    """
+    for module in model.modules():
+        if isinstance(module, whisper.model.Linear):
+            module.__class__ = torch.nn.Linear
+    with warnings.catch_warnings():
+        # Avertissement de dépréciation des tenseurs quantifiés, sans effet ici
+        warnings.simplefilter('ignore', UserWarning)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_int8(model_size, device):
+    """
+    Modèle aux couches linéaires quantifiées en int8 (CPU seulement)
+
+    La conversion n'est faite qu'une fois : le modèle quantifié est gardé sur
+    disque, par version de torch (le format des poids quantifiés en dépend).
+    """
+    if device != 'cpu':
+        raise ValueError(f"La quantification int8 n'est disponible que sur CPU (device: {device})")
+
+    path = quantized_path(model_size)
+    if path.exists():
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', UserWarning)
+                saved = torch.load(path, map_location='cpu', weights_only=False)
+            model = saved['model']
+            model.quantization = dict(saved['quantization'], from_cache=True,
+                                      quality=read_quality_report(model_size))
+            return model
+        except Exception:
+            path.unlink(missing_ok=True)  # Fichier illisible : reconvertir
+
+    model = LOADERS['fp32'](model_size, 'cpu')
+    fp32_bytes = model_bytes(model)
+    model = quantize_int8(model.eval())
+    quantization = {'dtype': 'int8', 'fp32_bytes': fp32_bytes, 'bytes': model_bytes(model)}
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    torch.save({'model': model, 'quantization': quantization}, tmp_path)
+    tmp_path.replace(path)
+    model.quantization = dict(quantization, from_cache=False, quality=None)
+    return model
+
+
+def quantized_path(model_size, dtype='int8'):
+    """Modèle quantifié gardé sur disque, par version de torch"""
+    return quantized_cache_dir() / f'{model_size}-{dtype}-torch{torch.__version__}.pt'
+
+
+def read_quality_report(model_size, dtype='int8'):
+    """Dernier rapport de check_quantization pour ce modèle quantifié (None si absent)"""
+    try:
+        return json.loads(quantized_path(model_size, dtype).with_suffix('.quality.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def check_quantization(model_size, audio_paths, dtype='int8', max_wer=0.05):
+    """
+    Comparer les transcriptions du modèle quantifié à celles du fp32 (CPU)
+
+    Chaque enregistrement est transcrit par les deux modèles du registre en
+    décodage glouton ; le taux d'erreur par mot (WER) est calculé par
+    rapport au fp32. Le rapport est gardé à côté du modèle quantifié et
+    affiché à chaque chargement (voir YouTubeTranscriber). Le WER n'a de
+    sens que sur de la vraie parole.
+
+    Args:
+        audio_paths: Enregistrements de référence
+        max_wer: WER moyen maximal toléré
+
+    Returns:
+        dict: dtype, wer (par fichier), wer_mean, max_wer, passed,
+              seconds et fp32_seconds (temps de transcription), bytes et
+              fp32_bytes (poids des modèles)
+    """
+    from audio import load_audio
+    from quality import word_error_rate
+
+    models = {name: registry.get(model_size, 'cpu', name) for name in ('fp32', dtype)}
+    seconds = dict.fromkeys(models, 0.0)
+    wers = {}
+    for path in audio_paths:
+        audio = load_audio(path)
+        texts = {}
+        for name, model in models.items():
+            start = time.perf_counter()
+            with registry.inference_lock(model_size, 'cpu', name):
+                texts[name] = model.transcribe(audio, fp16=False, temperature=0.0)['text']
+            seconds[name] += time.perf_counter() - start
+        wers[Path(path).name] = round(word_error_rate(texts['fp32'], texts[dtype]), 4)
+
+    wer_mean = round(sum(wers.values()) / len(wers), 4) if wers else None
+    report = {
+        'dtype': dtype,
+        'wer': wers,
+        'wer_mean': wer_mean,
+        'max_wer': max_wer,
+        'passed': wer_mean is not None and wer_mean <= max_wer,
+        'seconds': round(seconds[dtype], 3),
+        'fp32_seconds': round(seconds['fp32'], 3),
+        'bytes': model_bytes(models[dtype]),
+        'fp32_bytes': model_bytes(models['fp32']),
+        'checked': time.time(),
+    }
+    path = quantized_path(model_size, dtype).with_suffix('.quality.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    if getattr(models[dtype], 'quantization', None) is not None:
+        models[dtype].quantization['quality'] = report
+    return report
+
+
+# Chargeurs par précision des poids
+LOADERS = {
+    'fp32': _load_fp32,
+    'int8': _load_int8,
+}
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Registre des modèles Whisper partagé par tout le processus
+
+        Chaque modèle est identifié par (taille, device, précision), chargé au
+        premier usage puis réutilisé par tous les transcripteurs et tous les lots.
+        """
+        self._models = {}
+        self._stats = {}
+        self._load_locks = {}
+        self._inference_locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key, locks):
+        with self._lock:
+            if key not in locks:
+                locks[key] = threading.Lock()
+            return locks[key]
+
+    def get(self, model_size, device='cpu', dtype='fp32'):
+        """
+        Récupérer un modèle, en le chargeant si nécessaire
+
+        Les appels concurrents pour le même modèle attendent un chargement unique.
+        """
+        if dtype not in LOADERS:
+            raise ValueError(f"Précision non supportée: {dtype} (choix: {', '.join(LOADERS)})")
+
+        key = (model_size, device, dtype)
+        model = self._models.get(key)
+        if model is not None:
+            self._stats.get(key, {})['last_used'] = time.time()
+            return model
+
+        with self._key_lock(key, self._load_locks):
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                model = LOADERS[dtype](model_size, device)
+                self._stats[key] = {
+                    'load_seconds': time.perf_counter() - start,
+                    'bytes': model_bytes(model),
+                    'last_used': time.time(),
+                    'quantization': getattr(model, 'quantization', None),
+                }
+                self._models[key] = model
+        return model
+
+    def inference_lock(self, model_size, device='cpu', dtype='fp32'):
+        """
+        Verrou à tenir pendant model.transcribe
+
+        Whisper installe ses hooks de cache KV sur le modèle lui-même : deux
+        transcriptions simultanées sur la même instance se corrompraient.
+        """
+        return self._key_lock((model_size, device, dtype), self._inference_locks)
+
+    def warmup(self, model_size, device='cpu', dtype='fp32', on_ready=None, on_error=None):
+        """
+        Charger un modèle en arrière-plan
+
+        Returns:
+            threading.Thread: Thread de chargement (déjà démarré)
+        """
+        def load():
+            try:
+                model = self.get(model_size, device, dtype)
+            except Exception as e:
+                if on_error:
+                    on_error(e)
+                return
+            if on_ready:
+                on_ready(model)
+
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+
+    def is_loaded(self, model_size, device='cpu', dtype='fp32'):
+        return (model_size, device, dtype) in self._models
+
+    def unload(self, model_size=None, device=None, dtype=None):
+        """
+        Décharger les modèles correspondant aux critères (tous si aucun critère)
+
+        Returns:
+            int: Nombre de modèles déchargés
+        """
+        with self._lock:
+            keys = [
+                key for key in self._models
+                if (model_size is None or key[0] == model_size)
+                and (device is None or key[1] == device)
+                and (dtype is None or key[2] == dtype)
+            ]
+            for key in keys:
+                del self._models[key]
+                del self._stats[key]
+
+        if keys:
+            # Libérer la mémoire tout de suite au lieu d'attendre le GC
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        return len(keys)
+
+    def memory_usage(self):
+        """
+        Mémoire occupée par les modèles chargés et pic de mémoire du processus
+
+        Returns:
+            dict: models (octets et temps de chargement par modèle),
+                  total_model_bytes, peak_rss_bytes
+        """
+        models = {
+            '/'.join(key): dict(stats)
+            for key, stats in list(self._stats.items())
+        }
+        return {
+            'models': models,
+            'total_model_bytes': sum(stats['bytes'] for stats in models.values()),
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+
+
+def model_bytes(model):
+    """Taille des poids et buffers d'un modèle en octets (poids quantifiés compris)"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        # Les poids des couches quantifiées ne sont ni des paramètres ni des buffers
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module._packed_params._weight_bias()
+            tensors.extend(t for t in (weight, bias) if t is not None)
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def peak_rss_bytes():
+    """Pic de mémoire résidente du processus (None si non mesurable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS, en kilo-octets sur Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Registre par défaut du processus
+registry = ModelRegistry()
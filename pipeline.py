@@ -0,0 +1,325 @@
+import queue
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from audio import SAMPLE_RATE, is_pcm
+from jobs import DONE, QUEUED, TRANSCRIBING, DownloadFailed, JobStore, job_key
+from playlists import expand_urls
+from scheduling import BatchProgress, RtfEstimator, probe_durations
+from transcriber import extract_video_id
+from urls import is_collection_url
+
+
+class BatchPipeline:
+    def __init__(self, transcribers, download_workers=2, prefetch=2,
+                 max_prefetch_mb=2048, message_queue=None, job_store=None, rtf_estimator=None,
+                 progress_interval=2.0):
+        """
+        Pipeline producteur/consommateur pour le traitement par lots
+
+        Les workers de téléchargement alimentent une file bornée consommée par
+        l'étape de transcription : la vidéo suivante est téléchargée pendant
+        que Whisper transcrit la vidéo courante.
+
+        Args:
+            transcribers: YouTubeTranscriber (ou liste) - un thread de transcription
+                          par instance (les instances partageant un même modèle
+                          du registre transcrivent à tour de rôle)
+            download_workers: Nombre de téléchargements simultanés
+            prefetch: Nombre maximal d'audios téléchargés en attente de transcription
+            max_prefetch_mb: Espace disque maximal occupé par les audios en attente
+            message_queue: Queue pour envoyer des messages à l'interface
+            job_store: JobStore persistant (file reprise au lancement suivant après
+                       une interruption) ; par défaut une file temporaire
+            rtf_estimator: RtfEstimator (temps de traitement par seconde d'audio,
+                           mesuré et conservé) ; par défaut dans le cache du
+                           dossier de sortie
+            progress_interval: Secondes entre deux appels de on_progress
+        """
+        if not isinstance(transcribers, (list, tuple)):
+            transcribers = [transcribers]
+        self.transcribers = list(transcribers)
+        self.download_workers = max(1, download_workers)
+        self.prefetch = max(1, prefetch)
+        self.max_prefetch_bytes = max_prefetch_mb * 1024 * 1024
+        if message_queue is None:
+            message_queue = self.transcribers[0].message_queue
+        self.message_queue = message_queue
+        self.job_store = job_store
+        self.rtf_estimator = rtf_estimator or RtfEstimator(self.transcribers[0].output_dir / '.cache' / 'rtf.db')
+        self.progress_interval = progress_interval
+        self.total = 0
+        self.progress = None
+        
+        # Transcriptions réellement simultanées : une par modèle distinct (verrou d'inférence partagé),
+        # sauf avec le décodage par lots où les vidéos d'un même modèle avancent ensemble
+        self.parallel = len({(t.model_size, t.device, t.dtype) if t.batch_size == 1 else id(t)
+                             for t in self.transcribers})
+
+        # Comptabilité de l'espace disque occupé par les audios préchargés
+        self._prefetched_bytes = 0
+        self._disk_cond = threading.Condition()
+        self._done_lock = threading.Lock()
+
+    def send_message(self, msg_type, content, extra=''):
+        """Envoyer un message à l'interface via la queue"""
+        if self.message_queue:
+            self.message_queue.put((msg_type, content, extra))
+
+    def run(self, urls, on_done=None, on_progress=None):
+        """
+        Traiter toutes les URLs à travers le pipeline
+        
+        Les vidéos restées en file (lot précédent interrompu, nouvel essai
+        prévu) sont traitées avec les nouvelles URLs ; une URL déjà terminée
+        n'est pas refaite. Une playlist ou une chaîne est remplacée par ses
+        vidéos pas encore transcrites. Une erreur temporaire remet la vidéo en file avec
+        une attente croissante ; run() ne rend la main qu'une fois chaque
+        vidéo terminée ou abandonnée.
+        
+        Args:
+            urls: Liste des URLs à traiter (vidéos, playlists, chaînes)
+            on_done: Callback appelé avec (index, url, succès) quand une vidéo
+                     est terminée ou abandonnée (index dans l'ordre de la file,
+                     sur self.total vidéos)
+            on_progress: Callback appelé régulièrement avec la progression
+                         pondérée par la durée audio et le temps restant
+                         (voir BatchProgress.snapshot)
+        
+        Returns:
+            list: Succès (bool) de chaque vidéo, dans l'ordre d'entrée (playlists développées)
+        """
+        if self.job_store is not None:
+            return self._run(self.job_store, urls, on_done, on_progress)
+        with tempfile.TemporaryDirectory(prefix='whisper_jobs_') as temp_dir:
+            return self._run(JobStore(Path(temp_dir) / 'jobs.db'), urls, on_done, on_progress)
+    
+    def _run(self, store, urls, on_done, on_progress):
+        recovered = store.recover()
+        if recovered:
+            self.send_message('log', f'Reprise de {recovered} vidéo(s) interrompue(s)', 'INFO')
+        urls, known_durations = self._expand(store, urls)
+        keys = store.submit(urls)
+        store.set_durations({job_key(url): duration for url, duration in known_durations.items()})
+        
+        # Durées connues avant de commencer : ordre des vidéos, progression et temps restant
+        unknown = [job['url'] for job in store.active() if job['duration'] is None]
+        if unknown:
+            self.send_message('log', f'Récupération de la durée de {len(unknown)} vidéo(s)...', 'INFO')
+            durations = probe_durations(unknown, self.transcribers[0].output_dir / '.cache',
+                                        workers=max(4, 2 * self.download_workers))
+            store.set_durations({job['key']: durations.get(job['url']) for job in store.active()})
+        
+        # Vidéos à traiter (reprises comprises), puis celles déjà terminées ou abandonnées
+        jobs = store.active()
+        self._index = {job['key']: index for index, job in enumerate(jobs)}
+        finished = [key for key in dict.fromkeys(keys) if key not in self._index]
+        for key in finished:
+            self._index[key] = len(self._index)
+        self.total = len(self._index)
+        self._store = store
+        self._on_done = on_done
+        self._on_progress = on_progress
+        # Plusieurs transcriptions simultanées : la plus longue d'abord
+        self._longest_first = self.parallel > 1
+        
+        first = self.transcribers[0]
+        durations = {job['key']: job['duration'] for job in jobs}
+        durations.update({key: (store.get(key) or {}).get('duration') for key in finished})
+        self.progress = BatchProgress(durations, self.rtf_estimator.get(first.model_size, first.device, first.dtype),
+                                      self.parallel)
+        total_seconds = sum(job['duration'] or 0 for job in jobs)
+        if total_seconds:
+            self.send_message('log', f'{len(jobs)} vidéo(s) à traiter, {total_seconds / 3600:.1f} h d\'audio', 'INFO')
+        
+        for key in finished:
+            job = store.get(key)
+            if job['state'] != DONE:
+                self.send_message('log', f"Vidéo déjà abandonnée: {job['url']} ({job['error']})", 'WARNING')
+            self._report(job, job['state'] == DONE)
+        
+        # File bornée entre les deux étapes
+        ready_queue = queue.Queue(maxsize=self.prefetch)
+        
+        downloaders = [
+            threading.Thread(target=self._download_worker, args=(ready_queue,), daemon=True)
+            for _ in range(self.download_workers)
+        ]
+        workers = [
+            threading.Thread(target=self._transcribe_worker, args=(transcriber, ready_queue), daemon=True)
+            for transcriber in self.transcribers
+        ]
+        for thread in downloaders + workers:
+            thread.start()
+        
+        self._join(downloaders)
+        for _ in workers:
+            ready_queue.put(None)
+        self._join(workers)
+        self._send_progress()
+        
+        return [store.get(key)['state'] == DONE for key in keys]
+    
+    def _expand(self, store, urls):
+        """
+        Remplacer playlists et chaînes par leurs vidéos absentes de l'index des vidéos faites
+        
+        Returns:
+            tuple: (URLs des vidéos, durées données par les playlists)
+        """
+        if not any(is_collection_url(url) for url in urls):
+            return urls, {}
+        self.send_message('log', 'Lecture des playlists et chaînes...', 'INFO')
+        expansion = expand_urls(urls, store.finished)
+        for url, error in expansion['errors']:
+            self.send_message('log', f'Playlist ou chaîne illisible: {url} ({error})', 'ERROR')
+        if expansion['collections']:
+            self.send_message('log', f"{expansion['collections']} playlist(s) ou chaîne(s): {expansion['found']} vidéo(s), "
+                                     f"dont {expansion['skipped']} déjà transcrite(s)", 'INFO')
+        return expansion['urls'], expansion['durations']
+    
+    def _join(self, threads):
+        """Attendre la fin des threads en publiant la progression à intervalles réguliers"""
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(self.progress_interval)
+                self._send_progress()
+    
+    def _send_progress(self):
+        if self._on_progress:
+            self._on_progress(self.progress.snapshot())
+    
+    def _wait_for_disk(self):
+        """Attendre que l'espace occupé par les audios préchargés repasse sous la limite"""
+        with self._disk_cond:
+            while self._prefetched_bytes >= self.max_prefetch_bytes:
+                self._disk_cond.wait()
+
+    def _release_disk(self, size):
+        """Libérer l'espace d'un audio transcrit"""
+        with self._disk_cond:
+            self._prefetched_bytes -= size
+            self._disk_cond.notify_all()
+
+    def _report(self, job, success):
+        """Signaler une vidéo terminée ou abandonnée"""
+        self.progress.finish(job['key'])
+        with self._done_lock:
+            index = self._index.setdefault(job['key'], len(self._index))
+            if self._on_done:
+                self._on_done(index, job['url'], success)
+    
+    def _finish(self, job, success, error=None, permanent=False):
+        """Enregistrer le résultat d'une vidéo (nouvel essai prévu si l'erreur est temporaire)"""
+        if success:
+            self._store.complete(job['key'])
+            self._report(job, True)
+            return
+        
+        state = self._store.fail(job['key'], error or 'Échec', permanent)
+        if state == QUEUED:
+            self.progress.stop(job['key'])
+            self.send_message('log', f"Nouvel essai prévu pour {job['url']} "
+                                     f"(essai {job['attempts']}/{self._store.max_attempts} échoué)", 'WARNING')
+        else:
+            reason = 'erreur définitive' if permanent else f"{job['attempts']} essais"
+            self.send_message('log', f"Abandon de {job['url']} ({reason})", 'ERROR')
+            self._report(job, False)
+    
+    def _next_job(self):
+        """
+        Prochaine vidéo à télécharger
+        
+        Attend qu'une vidéo soit prête (nouvel essai différé, vidéo en cours
+        qui pourrait échouer et revenir en file).
+        
+        Returns:
+            dict: La vidéo, ou None quand il ne reste plus rien à traiter
+        """
+        store = self._store
+        while True:
+            job = store.claim(self._longest_first)
+            if job is not None:
+                return job
+            if not store.active():
+                return None
+            next_attempt = store.next_attempt()
+            timeout = 5.0 if next_attempt is None else max(0.05, min(5.0, next_attempt - time.time()))
+            store.wait(timeout)
+    
+    def _download_worker(self, ready_queue):
+        """Étape 1 : télécharger les audios et les placer dans la file"""
+        downloader = self.transcribers[0]
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            url = job['url']
+            index = self._index.get(job['key'], 0)
+            
+            # Vidéo déjà transcrite : rien à télécharger
+            try:
+                cached = downloader.process_cached(url)
+            except Exception as e:
+                self.send_message('log', f'Erreur de lecture du cache: {str(e)}', 'WARNING')
+                cached = None
+            if cached is not None:
+                self._finish(job, cached, 'Sauvegarde depuis le cache impossible')
+                continue
+            
+            # La limite peut être dépassée d'au plus un fichier par worker
+            self._wait_for_disk()
+            self.send_message('log', f'Téléchargement {index + 1}/{self.total}: {url}', 'INFO')
+            
+            try:
+                audio_path, video_title = downloader.download_audio(url, raise_errors=True)
+            except DownloadFailed as e:
+                self._finish(job, False, str(e), e.permanent)
+                continue
+            except Exception as e:
+                self.send_message('log', f'Erreur inattendue: {str(e)}', 'ERROR')
+                self._finish(job, False, str(e))
+                continue
+            
+            self._store.update(job['key'], TRANSCRIBING, video_title)
+            size = Path(audio_path).stat().st_size
+            with self._disk_cond:
+                self._prefetched_bytes += size
+            ready_queue.put((job, audio_path, video_title, size, time.perf_counter()))
+    
+    def _transcribe_worker(self, transcriber, ready_queue):
+        """Étape 2 : transcrire les audios préchargés"""
+        while True:
+            item = ready_queue.get()
+            if item is None:
+                break
+            job, audio_path, video_title, size, queued_at = item
+            url = job['url']
+            # Temps passé prêt à être transcrit (pipeline bien équilibré : proche de 0 côté
+            # transcription, élevé si le modèle est le goulot d'étranglement)
+            transcriber.metrics.observe('queue_wait', time.perf_counter() - queued_at, url=url)
+            index = self._index.get(job['key'], 0)
+            self.send_message('log', f'Transcription {index + 1}/{self.total}: {video_title}', 'INFO')
+            
+            success = False
+            error = 'Échec de la transcription'
+            self.progress.start(job['key'])
+            started = time.perf_counter()
+            try:
+                success = transcriber.transcribe_and_save(audio_path, video_title, extract_video_id(url))
+                if success:
+                    # Estimation glissante du temps de traitement par seconde d'audio
+                    audio_seconds = size / 4 / SAMPLE_RATE if is_pcm(audio_path) else job['duration']
+                    self.progress.rtf = self.rtf_estimator.update(
+                        transcriber.model_size, transcriber.device, transcriber.dtype,
+                        audio_seconds, time.perf_counter() - started)
+            except Exception as e:
+                error = str(e)
+                self.send_message('log', f'Erreur inattendue: {error}', 'ERROR')
+            finally:
+                transcriber.discard_audio(audio_path)
+                self._release_disk(size)
+            
+            self._finish(job, success, error)
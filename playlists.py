@@ -0,0 +1,90 @@
+from urls import extract_video_id, is_collection_url
+
+# Onglets d'une chaîne (vidéos, shorts, directs) : playlists imbriquées, développées à leur tour
+MAX_DEPTH = 3
+
+
+def _flat_ydl():
+    import yt_dlp
+
+    return yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True, 'extract_flat': True, 'socket_timeout': 30})
+
+
+def expand_collection(url, ydl=None):
+    """
+    Vidéos d'une playlist ou d'une chaîne, sans ouvrir la page de chaque vidéo
+
+    yt-dlp ne lit que les pages de la liste (extract_flat) : une requête par
+    page de la playlist, et non une par vidéo.
+
+    Returns:
+        list: (URL de la vidéo, identifiant, durée en secondes ou None), dans
+              l'ordre de la playlist, sans doublons
+    """
+    ydl = ydl or _flat_ydl()
+    videos = {}
+
+    def collect(info, depth):
+        for entry in info.get('entries') or []:
+            if not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url') or ''
+            video_id = extract_video_id(entry_url) or (entry.get('id') if entry.get('ie_key') == 'Youtube' else None)
+            if video_id:
+                videos.setdefault(video_id, (f'https://www.youtube.com/watch?v={video_id}', video_id,
+                                             entry.get('duration')))
+            elif depth < MAX_DEPTH and entry.get('entries') is not None:
+                collect(entry, depth + 1)
+            elif depth < MAX_DEPTH and entry_url and (entry.get('_type') == 'playlist' or is_collection_url(entry_url)):
+                collect(ydl.extract_info(entry_url, download=False), depth + 1)
+
+    collect(ydl.extract_info(url, download=False), 1)
+    return list(videos.values())
+
+
+def expand_urls(urls, finished=None):
+    """
+    Remplacer les playlists et chaînes par leurs vidéos, sauf celles déjà faites
+
+    Args:
+        urls: URLs soumises (vidéos, playlists, chaînes)
+        finished: Fonction recevant une liste d'identifiants et retournant
+                  ceux déjà transcrits (ex. JobStore.finished) ; seules les
+                  vidéos des playlists sont filtrées, une URL de vidéo soumise
+                  directement est toujours gardée
+
+    Returns:
+        dict: urls (vidéos à traiter, dans l'ordre, sans doublons),
+              durations (URL -> durée donnée par la playlist),
+              collections (playlists développées), found (vidéos trouvées),
+              skipped (vidéos déjà faites), errors ((URL, message) des
+              playlists illisibles)
+    """
+    expanded = {}
+    durations = {}
+    report = {'collections': 0, 'found': 0, 'skipped': 0, 'errors': []}
+    ydl = None
+    for url in urls:
+        url = url.strip()
+        if not is_collection_url(url):
+            expanded.setdefault(extract_video_id(url) or url, url)
+            continue
+
+        ydl = ydl or _flat_ydl()
+        try:
+            videos = expand_collection(url, ydl)
+        except Exception as e:
+            report['errors'].append((url, str(e)[:200]))
+            continue
+        report['collections'] += 1
+        report['found'] += len(videos)
+
+        done = finished([video_id for _, video_id, _ in videos]) if finished and videos else set()
+        for video_url, video_id, duration in videos:
+            if video_id in done:
+                report['skipped'] += 1
+            elif video_id not in expanded:
+                expanded[video_id] = video_url
+                if duration:
+                    durations[video_url] = duration
+    return dict(report, urls=list(expanded.values()), durations=durations)
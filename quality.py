@@ -0,0 +1,39 @@
+import re
+
+import numpy as np
+
+
+def normalize_words(text):
+    """Mots en minuscules, sans ponctuation"""
+    return re.sub(r'[^\w\s]', ' ', text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """
+    Taux d'erreur par mot (WER) de hypothesis par rapport à reference
+
+    Distance d'édition sur les mots normalisés, divisée par le nombre de mots
+    de la référence. Chaque ligne de la programmation dynamique est calculée
+    d'un bloc avec numpy (les insertions via un minimum cumulé).
+
+    Returns:
+        float: 0.0 si identiques ; peut dépasser 1.0 si l'hypothèse est bien plus longue
+    """
+    ref, hyp = normalize_words(reference), normalize_words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    vocabulary = {}
+    ref_ids = np.array([vocabulary.setdefault(w, len(vocabulary)) for w in ref])
+    hyp_ids = np.array([vocabulary.setdefault(w, len(vocabulary)) for w in hyp], dtype=np.int64)
+    positions = np.arange(len(hyp) + 1)
+
+    row = positions.copy()
+    for i, word in enumerate(ref_ids, 1):
+        current = np.empty_like(row)
+        current[0] = i
+        # Substitution (ou correspondance) et suppression
+        current[1:] = np.minimum(row[:-1] + (hyp_ids != word), row[1:] + 1)
+        # Insertion : current[j] = min sur k <= j de current[k] + (j - k)
+        row = np.minimum.accumulate(current - positions) + positions
+    return float(row[-1]) / len(ref)
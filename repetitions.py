@@ -0,0 +1,141 @@
+import numpy as np
+
+
+def _normalize(word):
+    return word.lower().strip('.,!?;:')
+
+
+def repetition_mask(words, max_ngram=16, max_repeats=3, max_phrase_repeats=2):
+    """
+    Repérer les boucles de répétition (hallucinations Whisper) dans une suite de mots
+
+    Une boucle est une suite de 1 à max_ngram mots répétée à l'identique
+    ("merci d'avoir regardé. merci d'avoir regardé. ..."). Les mots sont
+    normalisés (minuscules, sans ponctuation finale) et remplacés par des
+    entiers ; pour chaque longueur n, la comparaison mot[i] == mot[i + n] est
+    vectorisée sur tout le texte. Coût O(max_ngram * mots), linéaire en la
+    longueur de la transcription.
+
+    Args:
+        words: Liste de mots
+        max_ngram: Longueur maximale (en mots) d'une phrase répétée
+        max_repeats: Occurrences consécutives gardées pour un mot seul
+        max_phrase_repeats: Occurrences consécutives gardées pour une phrase
+
+    Returns:
+        np.ndarray: Masque booléen des mots à garder
+    """
+    n = len(words)
+    keep = np.ones(n, dtype=bool)
+    if n < 2:
+        return keep
+
+    vocabulary = {}
+    ids = np.fromiter((vocabulary.setdefault(_normalize(word), len(vocabulary)) for word in words),
+                      dtype=np.int64, count=n)
+
+    for period in range(1, min(max_ngram, n // 2) + 1):
+        copies = max_repeats if period == 1 else max_phrase_repeats
+        # same[j] : le mot j + period répète le mot j
+        same = ids[period:] == ids[:-period]
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], same.astype(np.int8), [0]))))
+        starts, ends = edges[::2], edges[1::2]
+        # Une suite de L égalités couvre L + period mots : seules les copies complètes
+        # comptent ("step by step by step" n'a que 2 copies de "step by")
+        whole = (ends - starts + period) // period
+        too_long = whole > copies
+        for start, count in zip(starts[too_long], whole[too_long]):
+            # Supprimer les copies complètes en trop ; une copie partielle finale est gardée
+            keep[start + copies * period:start + count * period] = False
+    return keep
+
+
+def clean_text(text, **thresholds):
+    """
+    Supprimer les boucles de répétition d'un texte (voir repetition_mask)
+
+    Returns:
+        str: Texte nettoyé (mots séparés par un espace), ou le texte d'origine
+             s'il ne contient aucune boucle
+    """
+    if not text:
+        return text
+    words = text.split()
+    if len(words) < 4:
+        return text
+    keep = repetition_mask(words, **thresholds)
+    if keep.all():
+        return text
+    return ' '.join(word for word, kept in zip(words, keep) if kept)
+
+
+def clean_segments(segments, **thresholds):
+    """
+    Supprimer les boucles de répétition d'une liste de segments Whisper
+
+    Les boucles sont cherchées sur le texte de tous les segments mis bout à
+    bout : Whisper répète souvent un segment entier plusieurs fois de suite.
+    Les segments non touchés sont gardés tels quels, les autres gardent leurs
+    timestamps avec le texte raccourci ; un segment entièrement répété est
+    supprimé. Les segments restants sont renumérotés.
+
+    Returns:
+        tuple: (segments nettoyés, nombre de mots supprimés)
+    """
+    tokens = [segment['text'].split() for segment in segments]
+    words = [word for segment_words in tokens for word in segment_words]
+    keep = repetition_mask(words, **thresholds)
+    if keep.all():
+        return list(segments), 0
+
+    cleaned = []
+    position = 0
+    for segment, segment_words in zip(segments, tokens):
+        segment_keep = keep[position:position + len(segment_words)]
+        position += len(segment_words)
+        if segment_keep.all():
+            cleaned.append(dict(segment))
+        elif segment_keep.any():
+            text = segment['text']
+            prefix = text[:len(text) - len(text.lstrip())]
+            segment = dict(segment, text=prefix + ' '.join(w for w, kept in zip(segment_words, segment_keep) if kept))
+            # Horodatage par mot : aligné sur les mots du texte quand les nombres concordent
+            if len(segment.get('words', ())) == len(segment_words):
+                segment['words'] = [w for w, kept in zip(segment['words'], segment_keep) if kept]
+            cleaned.append(segment)
+
+    for index, segment in enumerate(cleaned):
+        segment['id'] = index
+    return cleaned, int(len(keep) - keep.sum())
+
+
+def clean_texts(texts, **thresholds):
+    """
+    Supprimer les boucles de répétition des textes d'une suite de segments
+
+    Même nettoyage que clean_segments, sur les textes seuls (segments gardés
+    en colonnes, voir segments.SegmentStore.replace_texts).
+
+    Returns:
+        tuple: (texte nettoyé de chaque segment, None si entièrement répété ;
+                nombre de mots supprimés)
+    """
+    texts = list(texts)
+    tokens = [text.split() for text in texts]
+    keep = repetition_mask([word for segment_words in tokens for word in segment_words], **thresholds)
+    if keep.all():
+        return texts, 0
+
+    cleaned = []
+    position = 0
+    for text, segment_words in zip(texts, tokens):
+        segment_keep = keep[position:position + len(segment_words)]
+        position += len(segment_words)
+        if segment_keep.all():
+            cleaned.append(text)
+        elif segment_keep.any():
+            prefix = text[:len(text) - len(text.lstrip())]
+            cleaned.append(prefix + ' '.join(w for w, kept in zip(segment_words, segment_keep) if kept))
+        else:
+            cleaned.append(None)
+    return cleaned, int(len(keep) - keep.sum())
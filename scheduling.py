@@ -0,0 +1,212 @@
+import heapq
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from cache import MetadataCache
+from urls import extract_video_id
+
+# Temps de traitement par seconde d'audio avant toute mesure (ordre de grandeur de large-v3)
+DEFAULT_RTF = {'cuda': 0.1, 'mps': 0.3, 'cpu': 1.5}
+
+
+def probe_durations(urls, cache_dir, workers=4):
+    """
+    Durée de chaque vidéo avant le traitement du lot
+
+    Le cache des métadonnées sert en premier ; sinon yt-dlp extrait les
+    informations sans choisir de format ni télécharger (une requête par
+    vidéo, en parallèle). Le résultat est mis en cache pour le
+    téléchargement qui suit.
+
+    Returns:
+        dict: URL -> durée en secondes (None si inconnue)
+    """
+    import yt_dlp
+
+    cache = MetadataCache(cache_dir)
+    local = threading.local()
+    options = {'quiet': True, 'no_warnings': True, 'noplaylist': True, 'socket_timeout': 30}
+
+    def probe(url):
+        video_id = extract_video_id(url)
+        metadata = cache.get(video_id) if video_id else None
+        if metadata and metadata['duration']:
+            return metadata['duration']
+        if getattr(local, 'ydl', None) is None:
+            local.ydl = yt_dlp.YoutubeDL(options)
+        try:
+            info = local.ydl.extract_info(url, download=False, process=False)
+        except Exception:
+            return None  # L'erreur sera signalée au téléchargement
+        cache.put(info)
+        return info.get('duration')
+
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max(1, min(workers, len(urls)))) as executor:
+        return dict(zip(urls, executor.map(probe, urls)))
+
+
+def simulate_makespan(durations, workers, rtf=1.0):
+    """
+    Durée totale d'un lot traité dans l'ordre donné par workers workers
+
+    Chaque vidéo part sur le premier worker libre (comme la file du
+    pipeline), et occupe duration * rtf secondes.
+
+    Returns:
+        float: Fin de la dernière vidéo (secondes)
+    """
+    finish_times = [0.0] * max(1, workers)
+    for duration in durations:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, start + duration * rtf)
+    return max(finish_times)
+
+
+def format_eta(seconds):
+    """Durée restante lisible : 1:02:03, 12:34"""
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes}:{seconds:02d}'
+
+
+class RtfEstimator:
+    def __init__(self, db_path, alpha=0.3):
+        """
+        Estimation glissante du temps de traitement par seconde d'audio
+
+        Une valeur par (modèle, device, précision), moyenne exponentielle des
+        vidéos terminées (poids alpha pour la dernière), conservée d'un
+        lancement à l'autre.
+
+        Args:
+            db_path: Fichier SQLite des estimations
+            alpha: Poids de la dernière mesure
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.alpha = alpha
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rtf (
+                    model_size TEXT NOT NULL,
+                    device TEXT NOT NULL,
+                    dtype TEXT NOT NULL,
+                    rtf REAL NOT NULL,
+                    samples INTEGER NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (model_size, device, dtype)
+                )
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """Ouvrir une connexion SQLite (transaction validée puis connexion fermée)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, model_size, device, dtype='fp32'):
+        """
+        Returns:
+            float: Estimation mesurée, sinon valeur par défaut du device
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT rtf FROM rtf WHERE model_size = ? AND device = ? AND dtype = ?',
+                               (model_size, device, dtype)).fetchone()
+        return row[0] if row else DEFAULT_RTF.get(device, DEFAULT_RTF['cpu'])
+
+    def update(self, model_size, device, dtype, audio_seconds, wall_seconds):
+        """
+        Intégrer la mesure d'une vidéo terminée
+
+        Returns:
+            float: Nouvelle estimation
+        """
+        if not audio_seconds or audio_seconds <= 0:
+            return self.get(model_size, device, dtype)
+        measured = wall_seconds / audio_seconds
+        key = (model_size, device, dtype)
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT rtf, samples FROM rtf WHERE model_size = ? AND device = ? AND dtype = ?',
+                               key).fetchone()
+            rtf, samples = (measured, 1) if row is None else (
+                self.alpha * measured + (1 - self.alpha) * row[0], row[1] + 1)
+            conn.execute('INSERT OR REPLACE INTO rtf VALUES (?, ?, ?, ?, ?, ?)',
+                         key + (rtf, samples, time.time()))
+        return rtf
+
+
+class BatchProgress:
+    def __init__(self, durations, rtf, workers=1):
+        """
+        Progression d'un lot pondérée par la durée audio, et temps restant
+
+        Une vidéo de durée inconnue compte pour la durée moyenne des autres.
+        La vidéo en cours avance au rythme estimé (rtf) jusqu'à sa fin réelle.
+
+        Args:
+            durations: Clé de la vidéo -> durée en secondes (ou None)
+            rtf: Temps de traitement par seconde d'audio
+            workers: Vidéos traitées en parallèle
+        """
+        known = [d for d in durations.values() if d]
+        default = sum(known) / len(known) if known else 600.0
+        self.durations = {key: duration or default for key, duration in durations.items()}
+        self.rtf = rtf
+        self.workers = max(1, workers)
+        self._started = {}
+        self._finished = set()
+        self._lock = threading.Lock()
+
+    def start(self, key):
+        with self._lock:
+            self._started[key] = time.monotonic()
+
+    def stop(self, key):
+        """Vidéo remise en file (nouvel essai plus tard)"""
+        with self._lock:
+            self._started.pop(key, None)
+
+    def finish(self, key):
+        with self._lock:
+            self._started.pop(key, None)
+            self._finished.add(key)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: done_seconds / total_seconds (audio), fraction, eta_seconds,
+                  finished / total (vidéos)
+        """
+        now = time.monotonic()
+        with self._lock:
+            remaining = {key: duration for key, duration in self.durations.items() if key not in self._finished}
+            for key, started in self._started.items():
+                if key in remaining:
+                    remaining[key] = max(0.0, remaining[key] - (now - started) / self.rtf)
+            finished = len(self._finished)
+        total = sum(self.durations.values())
+        left = sum(remaining.values())
+        # Le lot ne finit pas avant sa plus longue vidéo restante
+        eta = max(left / self.workers, max(remaining.values(), default=0.0)) * self.rtf
+        return {
+            'done_seconds': total - left,
+            'total_seconds': total,
+            'fraction': (total - left) / total if total else 1.0,
+            'eta_seconds': eta,
+            'finished': finished,
+            'total': len(self.durations),
+        }
@@ -0,0 +1,99 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Dossiers de travail des tâches : <racine>/job-<pid>-<aléa>
+ROOT_NAME = 'youtube_transcriber'
+JOB_PREFIX = 'job-'
+
+# Mémoire partagée (tmpfs) pour les petits audios : lecture/écriture sans disque
+SHM_DIR = Path('/dev/shm')
+
+
+def scratch_roots():
+    """Racines possibles des dossiers de travail (disque, puis tmpfs s'il existe)"""
+    roots = [Path(tempfile.gettempdir()) / ROOT_NAME]
+    if SHM_DIR.is_dir() and os.access(SHM_DIR, os.W_OK):
+        roots.append(SHM_DIR / ROOT_NAME)
+    return roots
+
+
+def job_dir(expected_bytes=None, shm_max_bytes=0):
+    """
+    Créer le dossier de travail d'une tâche
+
+    Le dossier est placé sur tmpfs (/dev/shm) si le contenu attendu tient
+    sous shm_max_bytes et laisse au moins autant d'espace libre, sur le
+    disque sinon. Le nom contient le PID du processus : sweep() ne touche
+    pas aux dossiers d'un processus encore en vie.
+
+    Returns:
+        Path: Dossier créé (à supprimer avec remove_job_dir)
+    """
+    roots = scratch_roots()
+    root = roots[0]
+    if expected_bytes and shm_max_bytes and len(roots) > 1 and expected_bytes <= shm_max_bytes:
+        try:
+            if shutil.disk_usage(SHM_DIR).free > 2 * expected_bytes:
+                root = roots[1]
+        except OSError:
+            pass
+    root.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=f'{JOB_PREFIX}{os.getpid()}-', dir=root))
+
+
+def is_job_dir(path):
+    path = Path(path)
+    return path.name.startswith(JOB_PREFIX) and path.parent.name == ROOT_NAME
+
+
+def remove_job_dir(path):
+    """Supprimer un dossier de travail et son contenu (sans erreur s'il n'existe plus)"""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    if sys.platform == 'win32':
+        return False  # os.kill(pid, 0) n'est pas un simple test sous Windows : l'âge suffit
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # Processus d'un autre utilisateur
+    return True
+
+
+def sweep(max_age_seconds=3600):
+    """
+    Supprimer les dossiers de travail orphelins (processus arrêté brutalement)
+
+    Seuls les dossiers de plus de max_age_seconds dont le processus n'existe
+    plus sont supprimés : le coût ne dépend que des dossiers de ce programme,
+    pas du contenu du dossier temporaire du système.
+
+    Returns:
+        int: Nombre de dossiers supprimés
+    """
+    now = time.time()
+    removed = 0
+    for root in scratch_roots():
+        if not root.is_dir():
+            continue
+        for path in root.iterdir():
+            if not path.name.startswith(JOB_PREFIX):
+                continue
+            try:
+                pid = int(path.name[len(JOB_PREFIX):].split('-')[0])
+                if now - path.stat().st_mtime < max_age_seconds or _pid_alive(pid):
+                    continue
+            except (ValueError, OSError):
+                continue
+            remove_job_dir(path)
+            removed += 1
+    return removed
@@ -0,0 +1,370 @@
+"""
+Recherche plein texte dans les transcriptions
+
+Index SQLite FTS5 tenu à jour par YouTubeTranscriber.save_transcription
+(.search.db dans le dossier de sortie) : chaque segment est indexé avec sa
+vidéo (ID, titre, langue, durée) et ses timestamps, une recherche renvoie
+donc le moment exact de la vidéo où le passage est prononcé.
+
+Usage:
+    python search.py "changement climatique"
+    python search.py 'transi*' -o transcriptions -n 50 --language fr
+    python search.py '"prix de l énergie"' --json
+    python search.py --rebuild          # réindexer les fichiers existants
+
+Sans guillemets, chaque mot doit apparaître dans le segment (accents et
+majuscules ignorés) ; un mot terminé par * est un préfixe. Avec --raw, la
+requête est passée telle quelle à FTS5 (OR, NEAR, colonnes...).
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Nom des fichiers écrits par save_transcription : <titre>_<id>.txt, <titre>_<id>.en.txt
+SAVED_FILE_PATTERN = re.compile(r'_([A-Za-z0-9_-]{11})(\.en)?\.txt$')
+TITLE_PREFIX = 'Titre: '
+
+
+def fts_query(text):
+    """
+    Requête FTS5 à partir d'un texte libre : chaque mot entre guillemets
+    (pas d'erreur de syntaxe sur la ponctuation), * final gardé comme préfixe
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return ' '.join(terms)
+
+
+def video_link(video_id, start):
+    """Lien vers le moment du segment dans la vidéo"""
+    if not video_id:
+        return None
+    return f'https://youtu.be/{video_id}?t={int(start or 0)}'
+
+
+def read_saved_file(path):
+    """
+    Titre et texte d'un fichier de transcription (format de save_transcription)
+
+    Returns:
+        tuple: (titre, texte)
+    """
+    content = Path(path).read_text(encoding='utf-8')
+    header, _, body = content.partition('\n')
+    if not header.startswith(TITLE_PREFIX):
+        return Path(path).stem, content.strip()
+    return header[len(TITLE_PREFIX):].strip(), body.lstrip('=\n').strip()
+
+
+class SearchIndex:
+    def __init__(self, db_path):
+        """
+        Index plein texte des transcriptions (SQLite FTS5)
+
+        Les segments sont dans une table ordinaire ; la table FTS5 n'en
+        garde que l'index (content externe, tenu à jour par triggers). Une
+        vidéo réindexée remplace ses anciens segments.
+
+        Args:
+            db_path: Fichier SQLite de l'index
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        with self._connect() as conn:
+            # Lectures pendant les écritures des workers
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS videos (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    video_id TEXT,
+                    title TEXT,
+                    language TEXT,
+                    duration REAL,
+                    indexed REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_video_id ON videos (video_id);
+                CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY,
+                    video INTEGER NOT NULL,
+                    start REAL,
+                    end REAL,
+                    text TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_segments_video ON segments (video);
+                CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+                    text, content='segments', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2', prefix='3 4 5 6'
+                );
+                CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+                    INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+                    INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                END;
+            ''')
+
+    @contextmanager
+    def _connect(self):
+        """Ouvrir une connexion SQLite (transaction validée puis connexion fermée)"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, path, title, transcription, video_id=None, segments=None):
+        """
+        Indexer (ou réindexer) un fichier de transcription
+
+        Args:
+            path: Fichier sauvegardé (seul son nom est gardé : l'index est
+                  dans le dossier de sortie)
+            title: Titre de la vidéo
+            transcription: Résultat (language, duration, segments, text)
+            video_id: ID YouTube, si connu
+            segments: Segments à indexer à la place de transcription['segments']
+                      (ex. la traduction anglaise) ; liste de dict ou SegmentStore
+
+        Returns:
+            int: Segments indexés
+        """
+        with self._lock, self._connect() as conn:
+            return self._add(conn, path, title, transcription, video_id, segments)
+
+    def _add(self, conn, path, title, transcription, video_id=None, segments=None):
+        from segments import iter_segments
+
+        segments = transcription.get('segments') if segments is None else segments
+        if segments:
+            rows = [(segment.get('start'), segment.get('end'), segment['text'].strip())
+                    for segment in iter_segments(segments)]
+        else:
+            # Fichier sans segments (indexation depuis le texte seul) : un passage sans timestamps
+            rows = [(None, None, (transcription.get('text') or '').strip())]
+        rows = [row for row in rows if row[2]]
+        duration = transcription.get('duration') or max((row[1] or 0 for row in rows), default=None) or None
+
+        self._remove(conn, Path(path).name)
+        video = conn.execute(
+            'INSERT INTO videos (path, video_id, title, language, duration, indexed) VALUES (?, ?, ?, ?, ?, ?)',
+            (Path(path).name, video_id, title, transcription.get('language'), duration, time.time())
+        ).lastrowid
+        conn.executemany('INSERT INTO segments (video, start, end, text) VALUES (?, ?, ?, ?)',
+                         [(video,) + row for row in rows])
+        return len(rows)
+
+    def remove(self, path):
+        """
+        Retirer un fichier de l'index
+
+        Returns:
+            bool: True si le fichier était indexé
+        """
+        with self._lock, self._connect() as conn:
+            return self._remove(conn, Path(path).name)
+
+    def _remove(self, conn, name):
+        row = conn.execute('SELECT id FROM videos WHERE path = ?', (name,)).fetchone()
+        if row is None:
+            return False
+        conn.execute('DELETE FROM segments WHERE video = ?', (row['id'],))
+        conn.execute('DELETE FROM videos WHERE id = ?', (row['id'],))
+        return True
+
+    def search(self, query, limit=20, language=None, video_id=None, raw=False):
+        """
+        Chercher les segments contenant la requête, les plus pertinents d'abord (BM25)
+
+        Le classement porte sur tous les segments trouvés (ORDER BY rank de
+        FTS5, qui ne garde que les limit meilleurs pendant le parcours).
+
+        Args:
+            query: Texte cherché (voir fts_query), ou requête FTS5 si raw
+            limit: Nombre maximal de résultats
+            language: Ne garder que les vidéos de cette langue
+            video_id: Ne chercher que dans cette vidéo
+
+        Returns:
+            list: dict par segment : video_id, title, language, duration, path,
+                  start, end, text, snippet (termes trouvés entre [ ]), url
+                  (lien vers le moment du segment)
+
+        Raises:
+            ValueError: Requête FTS5 invalide (avec raw)
+        """
+        match = query if raw else fts_query(query)
+        if not match:
+            return []
+        filters, params = '', [match]
+        if language:
+            filters += ' AND v.language = ?'
+            params.append(language)
+        if video_id:
+            filters += ' AND v.video_id = ?'
+            params.append(video_id)
+        params.append(max(1, limit))
+        sql = f'''
+            SELECT s.id, v.video_id, v.title, v.language, v.duration, v.path, s.start, s.end, s.text
+            FROM segments_fts
+            JOIN segments s ON s.id = segments_fts.rowid
+            JOIN videos v ON v.id = s.video
+            WHERE segments_fts MATCH ?{filters}
+            ORDER BY rank LIMIT ?
+        '''
+
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(sql, params).fetchall()
+                # Extraits calculés seulement pour les résultats gardés
+                ids = [row['id'] for row in rows]
+                snippets = dict(conn.execute(
+                    f"""SELECT rowid, snippet(segments_fts, 0, '[', ']', '…', 16) FROM segments_fts
+                        WHERE segments_fts MATCH ? AND rowid IN ({', '.join('?' * len(ids))})""",
+                    [match] + ids
+                ).fetchall()) if ids else {}
+        except sqlite3.OperationalError as e:
+            if 'fts5' in str(e) or 'syntax' in str(e):
+                raise ValueError(f'Requête invalide: {e}') from e
+            raise
+        return [
+            dict({key: row[key] for key in row.keys() if key != 'id'},
+                 snippet=snippets.get(row['id'], row['text']), url=video_link(row['video_id'], row['start']))
+            for row in rows
+        ]
+
+    def rebuild(self, output_dir, cache=None):
+        """
+        Réindexer tous les fichiers de transcription d'un dossier
+
+        Les segments (timestamps) viennent du fichier .segments.npz écrit à
+        côté du texte, sinon du cache des transcriptions quand la vidéo y est
+        encore ; à défaut, le texte du fichier est indexé comme un seul
+        passage, sans timestamps. Les fichiers disparus sont retirés.
+
+        Args:
+            output_dir: Dossier des transcriptions
+            cache: TranscriptionCache où chercher les segments
+
+        Returns:
+            dict: files (fichiers indexés), segments, without_timestamps
+                  (fichiers indexés sans segments), removed (fichiers disparus)
+        """
+        from segments import SegmentStore, store_path
+
+        report = {'files': 0, 'segments': 0, 'without_timestamps': 0, 'removed': 0}
+        paths = sorted(path for path in Path(output_dir).glob('*.txt') if path.is_file())
+        with self._lock, self._connect() as conn:
+            names = {path.name for path in paths}
+            for row in conn.execute('SELECT path FROM videos').fetchall():
+                if row['path'] not in names:
+                    report['removed'] += self._remove(conn, row['path'])
+
+            for path in paths:
+                title, text = read_saved_file(path)
+                match = SAVED_FILE_PATTERN.search(path.name)
+                video_id, translation = (match.group(1), bool(match.group(2))) if match else (None, False)
+                segments = None
+                transcription = {'text': text, 'language': 'en' if translation else None}
+                cached = None
+                if store_path(path).exists():
+                    segments = SegmentStore.load(store_path(path))
+                    transcription['language'] = segments.language
+                elif cache is not None and video_id:
+                    cached = cache.latest(video_id)
+                if cached:
+                    segments = cached.get('translation') if translation else cached.get('segments')
+                    if not translation:
+                        transcription['language'] = cached.get('language')
+                    transcription['duration'] = cached.get('duration')
+                if not segments:
+                    report['without_timestamps'] += 1
+                report['segments'] += self._add(conn, path, title, transcription, video_id, segments or [])
+                report['files'] += 1
+            conn.execute("INSERT INTO segments_fts (segments_fts) VALUES ('optimize')")
+        return report
+
+    def stats(self):
+        """
+        Returns:
+            dict: videos, segments, hours (durée totale indexée)
+        """
+        with self._connect() as conn:
+            row = conn.execute('''
+                SELECT (SELECT COUNT(*) FROM videos) AS videos,
+                       (SELECT COUNT(*) FROM segments) AS segments,
+                       (SELECT COALESCE(SUM(duration), 0) FROM videos) AS seconds
+            ''').fetchone()
+        return {'videos': row['videos'], 'segments': row['segments'], 'hours': round(row['seconds'] / 3600, 2)}
+
+
+def format_position(seconds):
+    """Moment d'un segment : 1:02:03, 12:34 (-- si inconnu)"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f'{hours}:{minutes:02d}:{seconds:02d}' if hours else f'{minutes:02d}:{seconds:02d}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('query', nargs='?', help='Texte cherché')
+    parser.add_argument('-o', '--output-dir', default='transcriptions', help='Dossier des transcriptions')
+    parser.add_argument('-n', '--limit', type=int, default=20, help='Nombre maximal de résultats')
+    parser.add_argument('--language', help='Ne chercher que dans cette langue (fr, en...)')
+    parser.add_argument('--video', metavar='ID', help='Ne chercher que dans cette vidéo')
+    parser.add_argument('--raw', action='store_true', help='Requête FTS5 passée telle quelle')
+    parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Réindexer les fichiers existants (segments repris du cache si possible)')
+    args = parser.parse_args(argv)
+
+    output_dir = Path(args.output_dir)
+    index = SearchIndex(output_dir / '.search.db')
+    if args.rebuild:
+        from cache import TranscriptionCache
+
+        cache_dir = output_dir / '.cache'
+        cache = TranscriptionCache(cache_dir) if (cache_dir / 'cache.db').exists() else None
+        start = time.perf_counter()
+        report = index.rebuild(output_dir, cache)
+        print(f"{report['files']} fichier(s) indexé(s), {report['segments']} segment(s) "
+              f"({report['without_timestamps']} sans timestamps, {report['removed']} retiré(s)) "
+              f"en {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        if not args.query:
+            return 0
+    if not args.query:
+        parser.error('requête manquante (ou --rebuild)')
+
+    try:
+        results = index.search(args.query, args.limit, args.language, args.video, args.raw)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for result in results:
+            print(f"{format_position(result['start'])}  {result['title']}  {result['url'] or result['path']}")
+            print(f"    {result['snippet']}")
+    return 0 if results else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
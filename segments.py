@@ -0,0 +1,256 @@
+"""
+Segments horodatés d'une transcription, en colonnes, et formats de sortie
+
+transcribe_chunks (et le journal) ajoutent les segments de chaque morceau à
+un SegmentStore au lieu d'une liste de dictionnaires : la mémoire ne suit
+pas le nombre de segments d'une transcription de plusieurs heures.
+save_transcription garde les segments de chaque vidéo à côté du texte
+(<titre>_<id>.segments.npz) : tableaux numpy pour start / end / avg_logprob
+/ no_speech_prob et textes concaténés dans un seul buffer UTF-8, au lieu
+d'une liste de dictionnaires. Les sous-titres (SRT, VTT) et le JSON en sont
+écrits segment par segment, sans construire le fichier en mémoire ; un
+format demandé plus tard s'obtient sans retranscrire.
+
+Usage:
+    python segments.py "transcriptions/Titre_dQw4w9WgXcQ.segments.npz" -f srt
+    python segments.py transcriptions/*.segments.npz -f vtt,json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+FORMATS = ('srt', 'vtt', 'json')
+STORE_SUFFIX = '.segments.npz'
+# Colonnes numériques gardées pour chaque segment (NaN si absente)
+COLUMNS = ('start', 'end', 'avg_logprob', 'no_speech_prob')
+# Colonnes booléennes (False si absente)
+FLAGS = ('escalated',)
+# Segments convertis ensemble en objets Python lors de l'écriture des formats
+BLOCK = 1024
+
+
+def format_timestamp(seconds, separator=','):
+    """Horodatage de sous-titre : 01:02:03,456 (SRT) ou 01:02:03.456 (VTT)"""
+    milliseconds = max(0, int(round(seconds * 1000)))
+    hours, rest = divmod(milliseconds, 3600000)
+    minutes, rest = divmod(rest, 60000)
+    seconds, milliseconds = divmod(rest, 1000)
+    return f'{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{milliseconds:03d}'
+
+
+class SegmentStore:
+    def __init__(self, columns, text_buffer, offsets, language=None):
+        """
+        Segments d'une transcription en colonnes
+
+        Args:
+            columns: Nom de colonne (COLUMNS, FLAGS) -> tableau numpy (un élément par segment)
+            text_buffer: Textes des segments concaténés tels que Whisper les
+                         donne, espace initial compris (bytes UTF-8)
+            offsets: Début de chaque texte dans text_buffer (n + 1 positions)
+            language: Langue de la transcription
+        """
+        self.columns = columns
+        self.text_buffer = text_buffer
+        self.offsets = offsets
+        self.language = language
+
+    @classmethod
+    def from_segments(cls, segments, language=None):
+        """Construire le stockage depuis les segments de Whisper (liste de dict)"""
+        encoded = [segment['text'].encode('utf-8') for segment in segments]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        columns = {
+            # float64 pour les timestamps (précision à la ms sur des heures), float32 pour les scores
+            name: np.array([segment.get(name, np.nan) for segment in segments],
+                           dtype=np.float64 if name in ('start', 'end') else np.float32)
+            for name in COLUMNS
+        }
+        columns.update({name: np.array([bool(segment.get(name)) for segment in segments], dtype=bool)
+                        for name in FLAGS})
+        return cls(columns, b''.join(encoded), offsets, language)
+
+    @classmethod
+    def empty(cls, language=None):
+        return cls.from_segments([], language)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in COLUMNS}
+            columns.update({name: data[name] if name in data.files else np.zeros(len(data['offsets']) - 1, dtype=bool)
+                            for name in FLAGS})
+            language = str(data['language']) or None
+            return cls(columns, data['text'].tobytes(), data['offsets'], language)
+
+    def save(self, path):
+        """Écrire le stockage (.segments.npz, non compressé : relu sans décompression)"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, text=np.frombuffer(self.text_buffer, dtype=np.uint8), offsets=self.offsets,
+                     language=np.array(self.language or ''), **self.columns)
+        tmp_path.replace(path)
+
+    def extend(self, segments):
+        """Ajouter à la fin les segments d'un morceau (liste de dict)"""
+        if not segments:
+            return
+        added = SegmentStore.from_segments(segments)
+        self.columns = {name: np.concatenate([column, added.columns[name]]) for name, column in self.columns.items()}
+        self.offsets = np.concatenate([self.offsets, added.offsets[1:] + self.offsets[-1]])
+        self.text_buffer += added.text_buffer
+
+    def replace_texts(self, texts):
+        """
+        Copie du stockage avec d'autres textes (ex. après nettoyage des répétitions)
+
+        Args:
+            texts: Nouveau texte de chaque segment, None pour le supprimer
+        """
+        texts = list(texts)
+        keep = np.array([text is not None for text in texts], dtype=bool)
+        encoded = [text.encode('utf-8') for text in texts if text is not None]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        columns = {name: column[keep] for name, column in self.columns.items()}
+        return SegmentStore(columns, b''.join(encoded), offsets, self.language)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def text(self, index):
+        return self.text_buffer[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def texts(self):
+        """Texte de chaque segment, tel que Whisper l'a donné"""
+        for index in range(len(self)):
+            yield self.text(index)
+
+    def last(self):
+        """Dernier segment (start, end, text), ou None si le stockage est vide"""
+        if not len(self):
+            return None
+        index = len(self) - 1
+        return {'id': index, 'start': float(self.columns['start'][index]), 'end': float(self.columns['end'][index]),
+                'text': self.text(index)}
+
+    def join_text(self):
+        """Texte complet : les textes des segments mis bout à bout"""
+        return self.text_buffer.decode('utf-8')
+
+    def __iter__(self):
+        """(start, end, texte sans espaces autour) de chaque segment, lus par blocs (mémoire constante)"""
+        for first in range(0, len(self), BLOCK):
+            last = min(first + BLOCK, len(self))
+            starts = self.columns['start'][first:last].tolist()
+            ends = self.columns['end'][first:last].tolist()
+            offsets = self.offsets[first:last + 1].tolist()
+            for index in range(last - first):
+                yield starts[index], ends[index], self.text_buffer[offsets[index]:offsets[index + 1]].decode('utf-8').strip()
+
+    def segments(self):
+        """Segments sous forme de dict (id, start, end, text, scores connus, marques), un à la fois"""
+        scores = [(name, self.columns[name]) for name in COLUMNS[2:]]
+        flags = [(name, self.columns[name]) for name in FLAGS]
+        for index, (start, end, _) in enumerate(self):
+            segment = {'id': index, 'start': start, 'end': end, 'text': self.text(index)}
+            for name, values in scores:
+                value = float(values[index])
+                if value == value:  # NaN : score inconnu
+                    segment[name] = round(value, 4)
+            for name, values in flags:
+                if values[index]:
+                    segment[name] = True
+            yield segment
+
+    @property
+    def nbytes(self):
+        """Mémoire occupée par les colonnes et les textes"""
+        return len(self.text_buffer) + self.offsets.nbytes + sum(column.nbytes for column in self.columns.values())
+
+    def write_srt(self, f):
+        number = 0
+        for start, end, text in self:
+            if text:
+                number += 1
+                f.write(f'{number}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}\n\n')
+
+    def write_vtt(self, f):
+        f.write('WEBVTT\n\n')
+        for start, end, text in self:
+            if text:
+                f.write(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text}\n\n")
+
+    def write_json(self, f, **header):
+        """JSON : en-tête (titre, ID...) puis segments écrits un par un"""
+        header = dict(header, language=self.language)
+        f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "segments": [')
+        for index, segment in enumerate(self.segments()):
+            segment['text'] = segment['text'].strip()
+            f.write(('\n  ' if index == 0 else ',\n  ') + json.dumps(segment, ensure_ascii=False))
+        f.write('\n]}\n')
+
+    def export(self, path, fmt, **header):
+        """
+        Écrire un format de sortie (srt, vtt, json) dans path
+
+        Returns:
+            Path: Fichier écrit
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Format inconnu: {fmt} (attendu: {", ".join(FORMATS)})')
+        path = Path(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            if fmt == 'json':
+                self.write_json(f, **header)
+            else:
+                getattr(self, f'write_{fmt}')(f)
+        return path
+
+
+def as_store(segments, language=None):
+    """SegmentStore des segments (liste de dict, ex. relue du cache, ou déjà un SegmentStore)"""
+    if isinstance(segments, SegmentStore):
+        return segments
+    return SegmentStore.from_segments(segments or [], language)
+
+
+def iter_segments(segments):
+    """Segments sous forme de dict, un à la fois, depuis une liste ou un SegmentStore"""
+    if isinstance(segments, SegmentStore):
+        return segments.segments()
+    return iter(segments or [])
+
+
+def store_path(text_path):
+    """Stockage des segments d'un fichier de transcription : <nom>.segments.npz"""
+    text_path = Path(text_path)
+    return text_path.with_name(text_path.stem + STORE_SUFFIX)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('stores', nargs='+', help='Fichiers .segments.npz')
+    parser.add_argument('-f', '--formats', default='srt', help='Formats écrits à côté : srt, vtt, json')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown:
+        parser.error(f'format(s) inconnu(s): {", ".join(unknown)}')
+    for path in map(Path, args.stores):
+        store = SegmentStore.load(path)
+        base = path.name[:-len(STORE_SUFFIX)] if path.name.endswith(STORE_SUFFIX) else path.stem
+        for fmt in formats:
+            written = store.export(path.with_name(f'{base}.{fmt}'), fmt)
+            print(written, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,623 @@
+"""
+Service HTTP local de transcription
+
+Expose YouTubeTranscriber à d'autres services : soumission d'URLs ou d'un
+fichier audio, suivi de l'état, segments diffusés au fil de la transcription
+(Server-Sent Events) et résultat final en texte ou JSON.
+
+Un nombre fixe de workers (un transcripteur chacun, modèles partagés par le
+registre du processus) consomme une file bornée : quand elle est pleine, les
+nouvelles soumissions sont refusées (503 + Retry-After) au lieu d'accumuler
+des téléchargements et de la mémoire.
+
+Routes :
+    POST /jobs                      {"urls": [...]} (JSON, vidéos YouTube ; une playlist ou
+                                    une chaîne donne une tâche par vidéo), ou un fichier audio
+                                    brut (Content-Type audio/*, ?title=...&filename=...)
+    GET  /jobs                      état de toutes les tâches connues
+    GET  /jobs/<id>                 état d'une tâche
+    GET  /jobs/<id>/events          flux SSE : segment, status (dernier : état final)
+    GET  /jobs/<id>/result          résultat JSON (?format=txt pour le texte seul,
+                                    ?format=en.txt pour la traduction avec --translate,
+                                    ?format=srt ou vtt pour les sous-titres)
+    GET  /search?q=...              segments des transcriptions contenant le texte
+                                    (&limit=20&language=fr&video=<id>), avec leur moment
+    GET  /health                    workers, file, mémoire des modèles
+
+Usage:
+    python server.py -m small -d cpu -w 2 --port 8765
+    curl -X POST localhost:8765/jobs -d '{"urls": ["https://youtu.be/dQw4w9WgXcQ"]}'
+    curl --data-binary @interview.mp3 -H 'Content-Type: audio/mpeg' 'localhost:8765/jobs?title=Interview'
+    curl -N localhost:8765/jobs/<id>/events
+    curl 'localhost:8765/jobs/<id>/result?format=txt'
+    curl 'localhost:8765/search?q=transition+énergétique&limit=5'
+"""
+import argparse
+import io
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from jobs import DONE, DOWNLOADING, FAILED, QUEUED, TRANSCRIBING, DownloadFailed
+from playlists import expand_urls
+from scratch import job_dir, remove_job_dir, sweep
+from urls import extract_video_id, is_collection_url, is_youtube_url
+
+logger = logging.getLogger('youtube_transcriber.server')
+
+# Types de contenu acceptés pour un fichier audio envoyé tel quel
+UPLOAD_TYPES = ('audio/', 'video/', 'application/octet-stream')
+
+
+class ServiceFull(Exception):
+    """La file du service est pleine : soumission refusée"""
+
+
+class ServiceJob:
+    def __init__(self, url=None, audio_path=None, title=None):
+        """
+        Tâche du service : une URL ou un fichier audio envoyé
+
+        Les segments s'accumulent au fil de la transcription (provisoires : le
+        résultat final est nettoyé des répétitions) ; chaque changement
+        réveille les clients qui suivent la tâche.
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.url = url
+        self.audio_path = audio_path
+        self.title = title
+        self.state = QUEUED
+        self.detail = ''
+        self.progress = 0
+        self.error = None
+        self.permanent = False
+        self.language = None
+        self.segments = []
+        self.result = None
+        self.created = self.updated = time.time()
+        self.version = 0
+        self.changed = threading.Condition()
+
+    def set(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.updated = time.time()
+            self.version += 1
+            self.changed.notify_all()
+
+    def add_segments(self, segments, language=None):
+        with self.changed:
+            self.segments.extend(segments)
+            self.language = language or self.language
+            self.version += 1
+            self.changed.notify_all()
+
+    @property
+    def finished(self):
+        return self.state in (DONE, FAILED)
+
+    def status(self):
+        """État de la tâche (sans les segments)"""
+        with self.changed:
+            return {
+                'id': self.id,
+                'url': self.url,
+                'title': self.title,
+                'state': self.state,
+                'detail': self.detail,
+                'progress': self.progress,
+                'error': self.error,
+                'permanent': self.permanent,
+                'language': self.language,
+                'segments': len(self.segments),
+                'created': self.created,
+                'updated': self.updated,
+            }
+
+    def follow(self, keepalive=15.0):
+        """
+        Suivre la tâche jusqu'à sa fin
+
+        Yields:
+            tuple: ('segment', segment) pour chaque nouveau segment, ('status', état)
+                   à chaque changement, (None, None) après keepalive secondes
+                   sans changement ; le dernier événement est l'état final
+        """
+        sent = 0
+        version = -1
+        while True:
+            with self.changed:
+                if self.version == version:
+                    self.changed.wait(keepalive)
+                segments = self.segments[sent:]
+                sent += len(segments)
+                changed = self.version != version
+                version = self.version
+            for segment in segments:
+                yield 'segment', segment
+            if changed:
+                status = self.status()
+                yield 'status', status
+                if status['state'] in (DONE, FAILED):
+                    return
+            else:
+                yield None, None
+
+
+class JobMessages:
+    def __init__(self):
+        """
+        Remplace la queue de l'interface pour un worker du service
+
+        Les messages du transcripteur sont rattachés à la tâche en cours du
+        worker : progression, segments et dernière erreur.
+        """
+        self.job = None
+        self.last_error = None
+
+    def put(self, message):
+        msg_type, content, extra = message
+        job = self.job
+        if msg_type == 'log':
+            if extra == 'ERROR':
+                self.last_error = content.strip()
+            level = {'ERROR': logging.ERROR, 'WARNING': logging.WARNING}.get(extra, logging.INFO)
+            logger.log(level, '[%s] %s', job.id if job else '-', content.strip())
+        elif job is None:
+            return
+        elif msg_type == 'detail':
+            job.set(detail=content, progress=extra)
+        elif msg_type == 'segments':
+            job.add_segments(content, extra)
+
+
+class TranscriptionService:
+    def __init__(self, transcribers, max_queue=16, max_finished=1000):
+        """
+        Pool fixe de workers de transcription derrière une file bornée
+
+        Args:
+            transcribers: YouTubeTranscriber (un worker par instance ; les
+                          instances de même modèle partagent le modèle du registre)
+            max_queue: Tâches en attente au-delà desquelles les soumissions sont refusées
+            max_finished: Tâches terminées gardées en mémoire (les plus anciennes sont oubliées)
+        """
+        if not isinstance(transcribers, (list, tuple)):
+            transcribers = [transcribers]
+        self.transcribers = list(transcribers)
+        # Même dossier de sortie pour tous les workers : un seul index
+        self.search_index = self.transcribers[0].search_index
+        self.max_queue = max(1, max_queue)
+        self.max_finished = max_finished
+        self.queue = queue.Queue()
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = 0
+
+        self.workers = []
+        for transcriber in self.transcribers:
+            transcriber.message_queue = JobMessages()
+            thread = threading.Thread(target=self._worker, args=(transcriber,), daemon=True)
+            thread.start()
+            self.workers.append(thread)
+
+    def submit(self, jobs):
+        """
+        Mettre des tâches en file (toutes ou aucune)
+
+        Raises:
+            ServiceFull: La file n'a pas la place pour toutes les tâches
+        """
+        with self._lock:
+            if self.queue.qsize() + len(jobs) > self.max_queue:
+                raise ServiceFull(f'File pleine ({self.queue.qsize()}/{self.max_queue} tâches en attente)')
+            for job in jobs:
+                self.jobs[job.id] = job
+                self.queue.put(job)
+            self._forget_finished()
+        return jobs
+
+    def has_capacity(self, count=1):
+        return self.queue.qsize() + count <= self.max_queue
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        """Workers, file et mémoire des modèles"""
+        from models import registry
+
+        states = {}
+        for job in list(self.jobs.values()):
+            states[job.state] = states.get(job.state, 0) + 1
+        memory = registry.memory_usage()
+        engine = self.transcribers[0].batch_engine
+        return {
+            'workers': len(self.workers),
+            'running': self._running,
+            'queued': self.queue.qsize(),
+            'max_queue': self.max_queue,
+            'jobs': states,
+            'model_bytes': memory['total_model_bytes'],
+            'peak_rss_bytes': memory['peak_rss_bytes'],
+            'batching': engine.stats() if engine else None,
+        }
+
+    def _worker(self, transcriber):
+        messages = transcriber.message_queue
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            messages.job = job
+            messages.last_error = None
+            with self._lock:
+                self._running += 1
+            try:
+                self._process(transcriber, job)
+            except DownloadFailed as e:
+                job.set(state=FAILED, error=str(e), permanent=e.permanent)
+            except Exception as e:
+                logger.exception('[%s] Erreur inattendue', job.id)
+                job.set(state=FAILED, error=str(e))
+            finally:
+                messages.job = None
+                with self._lock:
+                    self._running -= 1
+
+    def _process(self, transcriber, job):
+        """Télécharger (URL) puis transcrire une tâche"""
+        video_id = None
+        if job.url:
+            video_id = extract_video_id(job.url)
+            cached = transcriber.cached_transcription(job.url)
+            if cached:
+                job.add_segments(cached['segments'], cached['language'])
+                job.set(state=DONE, title=cached['title'], progress=100,
+                        result=dict(cached, cached=True))
+                return
+            job.set(state=DOWNLOADING)
+            audio_path, title = transcriber.download_audio(job.url, raise_errors=True)
+        else:
+            audio_path, title = job.audio_path, job.title or 'audio'
+
+        try:
+            job.set(state=TRANSCRIBING, title=title)
+            result = transcriber.transcribe_file(audio_path, title, video_id)
+        finally:
+            transcriber.discard_audio(audio_path)
+
+        if result is None:
+            raise RuntimeError(transcriber.message_queue.last_error or 'Échec de la transcription')
+        result = dict(result, title=title, path=str(result['path']), cached=False)
+        job.set(state=DONE, progress=100, result=result)
+
+    def close(self):
+        """Arrêter les workers (après les tâches en cours) et leurs transcripteurs"""
+        for _ in self.workers:
+            self.queue.put(None)
+        for thread in self.workers:
+            thread.join()
+        for transcriber in self.transcribers:
+            transcriber.close()
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = 'YoutubeTranscriber/1.0'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message, headers=None):
+        self.send_json(status, {'error': message}, headers)
+
+    def send_full(self, message):
+        self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, message,
+                             {'Retry-After': str(self.server.retry_after)})
+
+    def route(self):
+        """Découper le chemin : (segments, paramètres de requête)"""
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        params = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+        return parts, params
+
+    def do_GET(self):
+        parts, params = self.route()
+        if parts == ['health']:
+            return self.send_json(HTTPStatus.OK, self.service.stats())
+        if parts == ['jobs']:
+            return self.send_json(HTTPStatus.OK, {'jobs': [job.status() for job in list(self.service.jobs.values())]})
+        if parts == ['search']:
+            return self.send_search(params)
+        if len(parts) < 2 or parts[0] != 'jobs' or len(parts) > 3:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Route inconnue')
+
+        job = self.service.get(parts[1])
+        if job is None:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, f'Tâche inconnue: {parts[1]}')
+        if len(parts) == 2:
+            return self.send_json(HTTPStatus.OK, job.status())
+        if parts[2] == 'events':
+            return self.stream_events(job)
+        if parts[2] == 'result':
+            return self.send_result(job, params.get('format', 'json'))
+        return self.send_error_json(HTTPStatus.NOT_FOUND, 'Route inconnue')
+
+    def send_result(self, job, fmt):
+        if job.state == FAILED:
+            return self.send_error_json(HTTPStatus.CONFLICT, f'Tâche en échec: {job.error}')
+        if job.state != DONE:
+            return self.send_error_json(HTTPStatus.CONFLICT, f'Tâche pas encore terminée ({job.state})')
+        from segments import as_store, iter_segments
+
+        # Segments en colonnes (SegmentStore) pour une transcription, liste de dict depuis le cache
+        result = job.result
+        if fmt == 'en.txt':
+            if result.get('translation') is None:
+                return self.send_error_json(HTTPStatus.NOT_FOUND, 'Pas de traduction pour cette tâche')
+            text = as_store(result['translation']).join_text()
+        else:
+            text = result['text']
+        if fmt in ('srt', 'vtt'):
+            subtitles = io.StringIO()
+            getattr(as_store(result['segments']), f'write_{fmt}')(subtitles)
+            text = subtitles.getvalue()
+        if fmt in ('txt', 'en.txt', 'srt', 'vtt'):
+            body = text.strip().encode('utf-8')
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', 'text/vtt; charset=utf-8' if fmt == 'vtt' else 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        result = dict(result, id=job.id, url=job.url, segments=list(iter_segments(result['segments'])))
+        if result.get('translation') is not None:
+            result['translation'] = list(iter_segments(result['translation']))
+        self.send_json(HTTPStatus.OK, result)
+
+    def send_search(self, params):
+        """Recherche plein texte dans les transcriptions du dossier de sortie"""
+        if not params.get('q'):
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, 'Paramètre q manquant')
+        try:
+            limit = min(int(params.get('limit', 20)), 1000)
+            results = self.service.search_index.search(params['q'], limit, params.get('language'),
+                                                       params.get('video'), raw=params.get('raw') == '1')
+        except ValueError as e:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+        self.send_json(HTTPStatus.OK, {'query': params['q'], 'results': results})
+
+    def stream_events(self, job):
+        """Diffuser les segments et changements d'état (Server-Sent Events)"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            for event, data in job.follow(self.server.keepalive):
+                if event is None:
+                    self.wfile.write(b': keepalive\n\n')
+                else:
+                    payload = json.dumps(data, ensure_ascii=False, default=float)
+                    self.wfile.write(f'event: {event}\ndata: {payload}\n\n'.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client parti : la tâche continue
+
+    def do_POST(self):
+        parts, params = self.route()
+        if parts != ['jobs']:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Route inconnue')
+
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        length = self.headers.get('Content-Length')
+        if length is None:
+            return self.send_error_json(HTTPStatus.LENGTH_REQUIRED, 'Content-Length requis')
+        try:
+            length = int(length)
+            if length < 0:
+                raise ValueError(length)
+        except ValueError:
+            # Corps illisible : la connexion ne peut pas être réutilisée
+            self.close_connection = True
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, f'Content-Length invalide: {length}')
+
+        if content_type.startswith(UPLOAD_TYPES):
+            jobs = self.receive_upload(length, params)
+        elif content_type in ('application/json', ''):
+            jobs = self.receive_urls(length)
+        else:
+            return self.send_error_json(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f'Type non supporté: {content_type}')
+        if jobs is None:
+            return
+
+        try:
+            self.service.submit(jobs)
+        except ServiceFull as e:
+            for job in jobs:
+                if job.audio_path:
+                    remove_job_dir(Path(job.audio_path).parent)
+            return self.send_full(str(e))
+        self.send_json(HTTPStatus.ACCEPTED, {'jobs': [job.status() for job in jobs]})
+
+    def receive_urls(self, length):
+        if length > 1024 * 1024:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Requête trop volumineuse')
+            return None
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            urls = payload['urls'] if 'urls' in payload else [payload['url']]
+            # Une chaîne seule serait parcourue caractère par caractère
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise TypeError(urls)
+        except (ValueError, KeyError, TypeError):
+            self.send_error_json(HTTPStatus.BAD_REQUEST, 'JSON attendu: {"urls": [...]} ou {"url": "..."}')
+            return None
+        urls = [url.strip() for url in urls if url.strip()]
+        if not urls:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, 'Aucune URL')
+            return None
+        invalid = [url for url in urls if not is_youtube_url(url)] if self.server.youtube_only else []
+        if invalid:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, f'URL(s) YouTube invalide(s): {", ".join(invalid[:5])}')
+            return None
+
+        # Playlists et chaînes : une tâche par vidéo (sinon yt-dlp téléchargerait tout dans une seule)
+        if any(is_collection_url(url) for url in urls):
+            expansion = expand_urls(urls)
+            if expansion['errors']:
+                url, error = expansion['errors'][0]
+                self.send_error_json(HTTPStatus.BAD_REQUEST, f'Playlist ou chaîne illisible: {url} ({error})')
+                return None
+            urls = expansion['urls']
+            if not urls:
+                self.send_error_json(HTTPStatus.BAD_REQUEST, 'Aucune vidéo dans les playlists ou chaînes')
+                return None
+        if not self.service.has_capacity(len(urls)):
+            self.send_full(f'File pleine: {len(urls)} URL(s) refusée(s)')
+            return None
+        return [ServiceJob(url=url) for url in urls]
+
+    def receive_upload(self, length, params):
+        # Refuser avant de recevoir le fichier : ni disque ni mémoire consommés
+        if length > self.server.max_upload_bytes:
+            self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                 f'Fichier trop volumineux (max {self.server.max_upload_bytes // 1024**2} Mo)')
+            return None
+        if not self.service.has_capacity(1):
+            self.send_full('File pleine')
+            return None
+
+        filename = Path(params.get('filename', 'audio')).name
+        # Dossier de travail de la tâche, supprimé après la transcription (discard_audio)
+        path = job_dir(length) / f'upload{Path(filename).suffix}'
+        try:
+            with open(path, 'wb') as f:
+                remaining = length
+                while remaining:
+                    data = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not data:
+                        raise ConnectionError('Envoi interrompu')
+                    f.write(data)
+                    remaining -= len(data)
+        except Exception as e:
+            remove_job_dir(path.parent)
+            self.send_error_json(HTTPStatus.BAD_REQUEST, f'Fichier incomplet: {e}')
+            return None
+        return [ServiceJob(audio_path=str(path), title=params.get('title') or Path(filename).stem)]
+
+
+def make_server(service, host='127.0.0.1', port=0, max_upload_mb=512, retry_after=30, keepalive=15.0,
+                youtube_only=True):
+    """
+    Serveur HTTP du service (port 0 : port libre choisi par le système)
+
+    Args:
+        youtube_only: Refuser (400) les URLs qui ne sont pas sur YouTube ; False
+                      pour des fixtures servies en local (benchmarks)
+
+    Returns:
+        ThreadingHTTPServer: À lancer avec serve_forever() ; adresse dans server_address
+    """
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.max_upload_bytes = max_upload_mb * 1024 * 1024
+    server.retry_after = retry_after
+    server.keepalive = keepalive
+    server.youtube_only = youtube_only
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse d'écoute (défaut: boucle locale)")
+    parser.add_argument('--port', type=int, default=8765, help="Port d'écoute")
+    parser.add_argument('-o', '--output-dir', default='transcriptions', help='Dossier de sortie')
+    parser.add_argument('-m', '--model', default='large-v3', help='Taille du modèle Whisper')
+    parser.add_argument('-d', '--device', default='auto', help='cuda, mps, cpu ou auto')
+    parser.add_argument('-w', '--workers', type=int, default=2,
+                        help='Workers (un modèle partagé : les téléchargements chevauchent les transcriptions)')
+    parser.add_argument('--dtype', choices=['fp32', 'int8'], default='fp32', help='Précision des poids')
+    parser.add_argument('--escalate-to', metavar='MODELE', help='Grand modèle de la cascade')
+    parser.add_argument('--vad', action='store_true', help='Ignorer silences et fonds sonores avant Whisper')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Fenêtres de 30 s décodées ensemble, toutes tâches en cours confondues')
+    parser.add_argument('--translate', action='store_true',
+                        help='Traduction anglaise en plus de la transcription (même passage de l\'encodeur)')
+    parser.add_argument('--formats', default='srt',
+                        help='Formats écrits à côté du texte : srt, vtt, json (séparés par des virgules)')
+    parser.add_argument('--max-queue', type=int, default=16, help='Tâches en attente avant de refuser (503)')
+    parser.add_argument('--max-upload-mb', type=int, default=512, help="Taille maximale d'un fichier envoyé")
+    parser.add_argument('-v', '--verbose', action='store_true', help='Journaliser chaque requête')
+    args = parser.parse_args(argv)
+    from segments import FORMATS
+
+    output_formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    if any(fmt not in FORMATS for fmt in output_formats):
+        parser.error(f'--formats: formats possibles {", ".join(FORMATS)}')
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format='[%(asctime)s] %(levelname)-7s %(message)s', datefmt='%H:%M:%S')
+
+    from models import get_best_device
+    from transcriber import YouTubeTranscriber
+
+    device = get_best_device() if args.device == 'auto' else args.device
+    swept = sweep()
+    if swept:
+        logger.info('Nettoyage: %s dossiers temporaires orphelins supprimés', swept)
+    transcribers = [
+        YouTubeTranscriber(output_dir=args.output_dir, model_size=args.model, device=device, dtype=args.dtype,
+                           vad=args.vad, escalation_model=args.escalate_to, batch_size=args.batch_size,
+                           translate=args.translate,
+                           output_formats=output_formats)
+        for _ in range(max(1, args.workers))
+    ]
+    service = TranscriptionService(transcribers, max_queue=args.max_queue)
+    server = make_server(service, args.host, args.port, args.max_upload_mb)
+    host, port = server.server_address[:2]
+    logger.info('Service prêt sur http://%s:%s (%s workers, modèle %s sur %s)',
+                host, port, len(transcribers), args.model, device)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
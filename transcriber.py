@@ -1,16 +1,37 @@
-import os
 import re
-import tempfile
+import threading
+import time
 from pathlib import Path
 import yt_dlp
-import whisper
 import torch
 import warnings
+import numpy as np
+import whisper
+from cache import TranscriptionCache, MetadataCache
+from search import SearchIndex
+from segments import FORMATS, SegmentStore, as_store, store_path
+from audio import PCM_SUFFIX, SAMPLE_RATE, decode_to_pcm, load_audio, is_pcm
+from vad import detect_speech
+from chunking import ChunkPool, Stitcher, plan_chunks, transcribe_slice
+from batching import shared_engine
+from journal import TranscriptJournal
+from metrics import Metrics
+from repetitions import clean_text, clean_texts
+from cascade import DEFAULT_THRESHOLDS, cascade_report, escalation_ranges
+from models import registry
+from jobs import DownloadFailed, is_permanent_error
+from urls import VIDEO_ID_PATTERN, extract_video_id  # noqa: F401 - réexportés
+from scratch import is_job_dir, job_dir, remove_job_dir, sweep
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
 
 class YouTubeTranscriber:
     def __init__(self, output_dir='transcriptions', model_size='large-v3', 
-                 device='cuda', message_queue=None):
+                 device='cuda', message_queue=None, use_cache=True, cache_size_mb=512,
+                 audio_mode='pcm', dtype='fp32', vad=False,
+                 chunk_workers=1, long_audio_minutes=30, chunk_minutes=10, checkpoint_minutes=5,
+                 metrics=None, repetition_thresholds=None, escalation_model=None,
+                 escalation_thresholds=None, shm_max_mb=256, batch_size=1, translate=False,
+                 output_formats=('srt',)):
         """
         Initialise le transcripteur YouTube
         
@@ -19,10 +40,71 @@ class YouTubeTranscriber:
             model_size: Taille du modèle Whisper (tiny, base, small, medium, large, large-v3)
             device: 'cuda' pour GPU ou 'cpu'
             message_queue: Queue pour envoyer des messages à l'interface
+            use_cache: Réutiliser les transcriptions déjà effectuées
+            cache_size_mb: Taille maximale du cache de transcriptions
+            audio_mode: 'pcm' pour décoder une seule fois l'audio natif en float32 16 kHz,
+                        'mp3' pour l'ancienne conversion MP3 via yt-dlp
+            dtype: Précision des poids du modèle : 'fp32', ou 'int8' sur CPU (couches
+                   linéaires quantifiées, voir models.LOADERS)
+            vad: Ne transcrire que les régions de parole (silences et fonds sonores ignorés)
+            chunk_workers: Processus transcrivant en parallèle les morceaux d'un long audio
+                           (1 = transcription séquentielle habituelle)
+            long_audio_minutes: Durée à partir de laquelle un audio est découpé
+            chunk_minutes: Durée visée de chaque morceau
+            checkpoint_minutes: Durée des morceaux transcrits séquentiellement, chacun
+                                validé dans le journal dès qu'il est terminé
+            metrics: Metrics recevant la durée de chaque étape (agrégats en mémoire par défaut)
+            repetition_thresholds: Seuils de suppression des boucles de répétition
+                                   (max_ngram, max_repeats, max_phrase_repeats, voir repetitions.py)
+            escalation_model: Grand modèle (ex. 'large-v3') redécodant les passages où
+                              model_size est peu sûr de lui ; None = un seul modèle
+            escalation_thresholds: Seuils avg_logprob, compression_ratio et
+                                   no_speech_prob déclenchant l'escalade (voir cascade.py)
+            shm_max_mb: Taille maximale d'un audio décodé placé en mémoire partagée
+                        (/dev/shm) plutôt que sur disque ; 0 = toujours sur disque
+            batch_size: Fenêtres de 30 s décodées ensemble (morceaux de cette vidéo et
+                        vidéos des autres transcripteurs du même modèle, voir
+                        batching.py) ; 1 = model.transcribe, une fenêtre à la fois
+            translate: Écrire aussi la traduction anglaise des vidéos dans une autre
+                       langue (fichier .en.txt) ; chaque fenêtre passe une seule fois
+                       dans l'encodeur pour les deux textes
+            output_formats: Formats écrits à côté du texte ('srt', 'vtt', 'json'),
+                            depuis les segments gardés (voir segments.py)
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.message_queue = message_queue
+        self.model_size = model_size
+        self.audio_mode = audio_mode
+        self.vad = vad
+        self.chunk_workers = chunk_workers
+        self.long_audio_seconds = long_audio_minutes * 60
+        self.chunk_seconds = chunk_minutes * 60
+        self.checkpoint_seconds = checkpoint_minutes * 60
+        self.journal_dir = self.output_dir / '.journal'
+        self._chunk_pool = None
+        self.metrics = metrics or Metrics()
+        self.repetition_thresholds = dict(max_ngram=16, max_repeats=3, max_phrase_repeats=2)
+        self.repetition_thresholds.update(repetition_thresholds or {})
+        self.escalation_model = escalation_model
+        self.escalation_thresholds = dict(DEFAULT_THRESHOLDS, **(escalation_thresholds or {}))
+        self.shm_max_bytes = shm_max_mb * 1024 * 1024
+        self.batch_size = max(1, batch_size)
+        self.translate = translate
+        self.output_formats = tuple(output_formats or ())
+        unknown = [fmt for fmt in self.output_formats if fmt not in FORMATS]
+        if unknown:
+            raise ValueError(f'Format(s) de sortie inconnu(s): {", ".join(unknown)}')
+        
+        # Cache des transcriptions (dans le dossier de sortie)
+        self.cache = TranscriptionCache(self.output_dir / '.cache', cache_size_mb) if use_cache else None
+        self.metadata_cache = MetadataCache(self.output_dir / '.cache')
+        
+        # Index de recherche plein texte (mis à jour à chaque sauvegarde)
+        self.search_index = SearchIndex(self.output_dir / '.search.db')
+        
+        # Sessions YoutubeDL, une par thread
+        self._local = threading.local()
         
         # Vérifier si CUDA est disponible
         if device == 'cuda' and not torch.cuda.is_available():
@@ -34,11 +116,34 @@ class YouTubeTranscriber:
                 gpu_name = torch.cuda.get_device_name(0)
                 self.send_message('log', f'GPU détecté: {gpu_name}', 'SUCCESS')
         
-        # Charger le modèle Whisper
-        self.send_message('log', f'Chargement du modèle Whisper {model_size}...', 'INFO')
+        # Charger le modèle Whisper (partagé via le registre du processus)
+        self.dtype = dtype
+        if registry.is_loaded(model_size, self.device, dtype):
+            self.send_message('log', f'Modèle Whisper {model_size} déjà en mémoire', 'INFO')
+        else:
+            self.send_message('log', f'Chargement du modèle Whisper {model_size}...', 'INFO')
         try:
-            self.model = whisper.load_model(model_size, device=self.device)
+            with self.metrics.span('model_load', model_size=model_size, device=self.device):
+                self.model = registry.get(model_size, self.device, dtype)
+            self.model_lock = registry.inference_lock(model_size, self.device, dtype)
+            self.batch_engine = None
+            if self.batch_size > 1 or self.translate:
+                self.batch_engine = shared_engine(self.model, self.model_lock, self.batch_size)
             self.send_message('log', 'Modèle chargé avec succès!', 'SUCCESS')
+            quantization = getattr(self.model, 'quantization', None)
+            if quantization:
+                saved = 1 - quantization['bytes'] / quantization['fp32_bytes']
+                self.send_message('log', f"Modèle {quantization['dtype']}: {quantization['bytes'] / 1024**2:.0f} Mo "
+                                         f"au lieu de {quantization['fp32_bytes'] / 1024**2:.0f} Mo (-{100 * saved:.0f}%)",
+                                  'INFO')
+                quality = quantization.get('quality')
+                if quality:
+                    self.send_message('log', f"Modèle {quantization['dtype']}: WER {quality['wer_mean']:.2%} par rapport "
+                                             f"au fp32 sur {len(quality['wer'])} enregistrement(s)",
+                                      'INFO' if quality['passed'] else 'WARNING')
+                else:
+                    self.send_message('log', f"Modèle {quantization['dtype']}: précision non vérifiée "
+                                             f"(cli.py --check-quality)", 'INFO')
         except Exception as e:
             self.send_message('log', f'Erreur lors du chargement du modèle: {str(e)}', 'ERROR')
             raise
@@ -48,12 +153,11 @@ class YouTubeTranscriber:
         # 251 (webm, 138k) et 250 (webm, 70k) ou 140 (m4a, 129k) et 139 (m4a, 49k)
         self.ydl_opts = {
             'format': '251/250/140/139/bestaudio',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
+            'outtmpl': '%(id)s.%(ext)s',
+            'keepvideo': False,  # Ne pas garder la vidéo
+            'noplaylist': True,  # Une URL de vidéo dans une playlist = cette vidéo seulement
             'quiet': True,
+            'noprogress': True,  # quiet seul laisse la barre de progression sur la sortie standard
             'no_warnings': True,
             'extract_flat': False,
             'socket_timeout': 30,
@@ -61,6 +165,12 @@ class YouTubeTranscriber:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
         }
+        if self.audio_mode == 'mp3':
+            self.ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }]
     
     def send_message(self, msg_type, content, extra=''):
         """Envoyer un message à l'interface via la queue"""
@@ -80,94 +190,115 @@ class YouTubeTranscriber:
     def clean_repetitions(self, text):
         """
         Nettoyer les répétitions excessives dans le texte (hallucinations Whisper)
-        Par exemple: "word word word word..." répété plus de 3 fois
+        Mots seuls répétés plus de 3 fois et phrases répétées en boucle
+        ("merci d'avoir regardé. merci d'avoir regardé. ...")
         """
-        if not text:
-            return text
-
-        words = text.split()
-        if len(words) < 4:
-            return text
-
-        cleaned_words = []
-        repetition_count = 0
-        last_word = None
-
-        for word in words:
-            # Comparer le mot normalisé (minuscules)
-            word_lower = word.lower().strip('.,!?;:')
-            last_word_lower = last_word.lower().strip('.,!?;:') if last_word else None
-
-            if word_lower == last_word_lower:
-                repetition_count += 1
-                # Si plus de 2 répétitions du même mot, sauter
-                if repetition_count > 2:
-                    continue
-            else:
-                repetition_count = 0
-                last_word = word
-
-            cleaned_words.append(word)
-
-        return ' '.join(cleaned_words)
+        return clean_text(text, **self.repetition_thresholds)
+    
+    def _get_ydl(self):
+        """
+        Instance YoutubeDL réutilisée par le thread courant
+        
+        Chaque worker garde sa propre session (cookies, cache des players,
+        connexions) au lieu d'en recréer une par vidéo.
+        """
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+            self._local.ydl = ydl
+        return ydl
+    
+    def log_video_info(self, video_title, duration):
+        """Informer du titre et de la durée de la vidéo"""
+        self.send_message('log', f'Titre: {video_title}', 'INFO')
+        self.send_message('log', f'Durée: {int(duration) // 60}:{int(duration) % 60:02d}', 'INFO')
     
-    def download_audio(self, url):
+    def download_audio(self, url, raise_errors=False):
         """
         Télécharger l'audio d'une vidéo YouTube
         
+        Une seule extraction par URL : le dictionnaire d'info obtenu est
+        réutilisé pour le téléchargement. Le titre et la durée déjà connus
+        (cache des métadonnées) sont affichés sans attendre l'extraction, et
+        complètent un dictionnaire d'info qui n'en donne pas. Chaque appel travaille dans son
+        propre dossier (voir scratch.py) : l'audio retourné y reste jusqu'à
+        discard_audio, qui supprime le dossier entier.
+        
+        Args:
+            raise_errors: Lever DownloadFailed (erreur classée définitive ou
+                          temporaire) au lieu de retourner (None, None)
+        
         Returns:
             tuple: (chemin_audio, titre_video) ou (None, None) si échec
         """
-        temp_audio_path = None
+        temp_dir = job_dir()
+        audio_dir = None
+        kept_dir = None  # Dossier de l'audio retourné, gardé jusqu'à discard_audio
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                self.send_message('detail', 'Récupération des informations de la vidéo...', 10)
-                
-                # Récupérer les infos de la vidéo
-                with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
-                    info = ydl.extract_info(url, download=False)
-                    video_title = info.get('title', 'Unknown')
-                    duration = info.get('duration', 0)
-                    video_id = info.get('id', 'unknown')
-                    
-                    # Informer de la durée
-                    duration_min = duration // 60
-                    duration_sec = duration % 60
-                    self.send_message('log', f'Titre: {video_title}', 'INFO')
-                    self.send_message('log', f'Durée: {duration_min}:{duration_sec:02d}', 'INFO')
-                
-                self.send_message('detail', 'Téléchargement de l\'audio...', 20)
-                
-                # Configurer le téléchargement avec un nom de fichier simple
-                ydl_opts = self.ydl_opts.copy()
-                # Utiliser l'ID de la vidéo pour éviter les problèmes de caractères spéciaux
-                ydl_opts['outtmpl'] = os.path.join(temp_dir, f'{video_id}.%(ext)s')
-                ydl_opts['keepvideo'] = False  # Ne pas garder la vidéo
-                ydl_opts['no_write_info_json'] = True  # Pas de fichier .info.json
-                
-                # Télécharger l'audio
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
+            self.send_message('detail', 'Récupération des informations de la vidéo...', 10)
+            
+            ydl = self._get_ydl()
+            video_id = extract_video_id(url)
+            metadata = (self.metadata_cache.get(video_id) if video_id else None) or {}
+            if metadata:
+                self.log_video_info(metadata.get('title') or 'Unknown', metadata.get('duration') or 0)
+            
+            # Extraction sans traitement des formats (fait lors du téléchargement)
+            with self.metrics.span('metadata', url=url, cached=bool(metadata)):
+                info = ydl.extract_info(url, download=False, process=False)
+            video_title = info.get('title') or metadata.get('title') or 'Unknown'
+            duration = info.get('duration') or metadata.get('duration') or 0
+            if not metadata:
+                self.log_video_info(video_title, duration)
+            
+            self.send_message('detail', 'Téléchargement de l\'audio...', 20)
+            
+            # Télécharger l'audio dans le dossier de cette tâche (fichiers partiels compris)
+            # Le nom de fichier utilise l'ID de la vidéo pour éviter les problèmes de caractères spéciaux
+            ydl.params['paths'] = {'home': str(temp_dir)}
+            with self.metrics.span('download', url=url, audio_seconds=duration) as span:
+                info = ydl.process_ie_result(info, download=True)
+                video_id = info.get('id', 'unknown')
+                video_title = info.get('title', video_title)
                 
                 # Trouver le fichier audio téléchargé
-                audio_files = list(Path(temp_dir).glob(f'{video_id}.*'))
+                audio_files = list(temp_dir.glob(f'{video_id}.*'))
                 # Filtrer pour ne garder que les fichiers audio
                 audio_extensions = ['.mp3', '.m4a', '.opus', '.webm', '.wav']
                 audio_files = [f for f in audio_files if f.suffix.lower() in audio_extensions]
+                span['video_id'] = video_id
+                span['bytes'] = sum(f.stat().st_size for f in audio_files)
+            self.metadata_cache.put(dict(info, duration=info.get('duration') or duration or None))
+            
+            if audio_files:
+                audio_path = audio_files[0]
                 
-                if audio_files:
-                    audio_path = audio_files[0]
-                    
-                    # Créer un fichier temporaire unique avec un nom propre
-                    temp_audio_path = Path(tempfile.gettempdir()) / f"whisper_temp_{video_id}.mp3"
-                    temp_audio_path.write_bytes(audio_path.read_bytes())
-                    
-                    self.send_message('detail', 'Audio téléchargé avec succès!', 40)
-                    return str(temp_audio_path), video_title
+                if self.audio_mode == 'pcm':
+                    # Décodage unique du flux natif vers le PCM attendu par Whisper,
+                    # en mémoire partagée si l'audio est assez court
+                    self.send_message('detail', 'Décodage de l\'audio...', 35)
+                    audio_dir = job_dir(int(duration * SAMPLE_RATE * 4), self.shm_max_bytes)
+                    temp_audio_path = audio_dir / f"{video_id}{PCM_SUFFIX}"
+                    with self.metrics.span('decode', video_id=video_id) as span:
+                        decode_to_pcm(audio_path, temp_audio_path)
+                        span['bytes'] = temp_audio_path.stat().st_size
+                        span['audio_seconds'] = span['bytes'] / 4 / SAMPLE_RATE
                 else:
-                    self.send_message('log', 'Aucun fichier audio trouvé après téléchargement', 'ERROR')
-                    return None, None
-                    
+                    # Le MP3 reste dans le dossier de téléchargement
+                    audio_dir = temp_dir
+                    temp_audio_path = audio_path
+                
+                self.send_message('detail', 'Audio téléchargé avec succès!', 40)
+                kept_dir = audio_dir
+                return str(temp_audio_path), video_title
+            else:
+                self.send_message('log', 'Aucun fichier audio trouvé après téléchargement', 'ERROR')
+                if raise_errors:
+                    raise DownloadFailed('Aucun fichier audio trouvé après téléchargement')
+                return None, None
+                
+        except DownloadFailed:
+            raise
         except yt_dlp.utils.DownloadError as e:
             error_msg = str(e)
             if 'Private video' in error_msg:
@@ -176,22 +307,256 @@ class YouTubeTranscriber:
                 self.send_message('log', 'Vidéo non disponible', 'ERROR')
             else:
                 self.send_message('log', f'Erreur de téléchargement: {error_msg[:100]}', 'ERROR')
+            if raise_errors:
+                raise DownloadFailed(error_msg, permanent=is_permanent_error(error_msg)) from e
             return None, None
         except Exception as e:
             self.send_message('log', f'Erreur inattendue lors du téléchargement: {str(e)}', 'ERROR')
+            if raise_errors:
+                raise DownloadFailed(str(e)) from e
             return None, None
         finally:
-            # Nettoyer le fichier temporaire si une erreur s'est produite
-            if temp_audio_path and Path(temp_audio_path).exists() and not audio_files:
-                try:
-                    Path(temp_audio_path).unlink()
-                except:
-                    pass
+            # Le flux téléchargé n'est plus utile une fois décodé ; en cas d'échec, rien n'est gardé
+            for directory in (temp_dir, audio_dir):
+                if directory is not None and directory != kept_dir:
+                    remove_job_dir(directory)
+    
+    def transcribe_options(self):
+        """Options de transcription passées à model.transcribe"""
+        return {
+            'language': None,  # Détection automatique de la langue
+            'task': 'transcribe',  # 'transcribe' ou 'translate' (vers anglais)
+            'temperature': 0.1,  # Un peu de variation pour éviter les hallucinations
+            'no_speech_threshold': 0.8,  # Plus agressif pour détecter le silence
+            'logprob_threshold': -1.0,
+            'compression_ratio_threshold': 2.4,
+            'condition_on_previous_text': False,  # Désactiver pour éviter les boucles de répétition
+            'fp16': self.device == 'cuda',  # FP16 seulement sur GPU
+        }
+    
+    def cache_options(self):
+        """Tout ce qui influence le résultat d'une transcription (clé du cache)"""
+        chunk_seconds = self.chunk_seconds if self.chunk_workers > 1 else None
+        return dict(self.transcribe_options(), dtype=self.dtype, vad=self.vad, chunk_seconds=chunk_seconds,
+                    checkpoint_seconds=self.checkpoint_seconds, batched=self.batch_size > 1,
+                    translate=self.translate, repetitions=self.repetition_thresholds,
+                    escalation_model=self.escalation_model,
+                    escalation=self.escalation_thresholds if self.escalation_model else None)
+    
+    def detect_language(self, audio):
+        """Détecter la langue sur les 30 premières secondes de l'audio"""
+        with self.metrics.span('language_detection', audio_seconds=min(len(audio), whisper.audio.N_SAMPLES) / SAMPLE_RATE):
+            clip = whisper.pad_or_trim(np.asarray(audio[:whisper.audio.N_SAMPLES], dtype=np.float32))
+            mel = whisper.log_mel_spectrogram(clip, self.model.dims.n_mels).to(self.model.device)
+            with self.model_lock:
+                _, probs = self.model.detect_language(mel)
+        return max(probs, key=probs.get)
+    
+    def open_journal(self, video_id, video_title):
+        """Ouvrir (ou reprendre) le journal de transcription d'une vidéo"""
+        key = TranscriptionCache.make_key(video_id, self.model_size, self.cache_options())
+        path = self.journal_dir / f'{video_id}-{key[:16]}.jsonl'
+        return TranscriptJournal(path, {'video_id': video_id, 'title': video_title, 'key': key})
+    
+    def _transcribe_sequential(self, audio, chunks, options):
+        """Transcrire les morceaux un par un avec le modèle de ce transcripteur"""
+        for start, end, _, _ in chunks:
+            with self.model_lock, self.metrics.profile('transcribe'):
+                result = transcribe_slice(self.model, audio[start:end], start, options, start)
+            yield result
+    
+    def _transcribe_batched(self, audio, chunks, options, translate=False):
+        """
+        Transcrire les morceaux par groupes de batch_size, leurs fenêtres décodées ensemble
+        
+        Les fenêtres des autres vidéos transcrites au même moment avec ce
+        modèle complètent les lots (voir BatchEngine).
+        """
+        for first in range(0, len(chunks), self.batch_size):
+            group = chunks[first:first + self.batch_size]
+            seconds = sum(end - start for start, end, _, _ in group) / SAMPLE_RATE
+            started = time.perf_counter()
+            with self.metrics.span('batch_decode', audio_seconds=seconds, chunks=len(group)) as span, \
+                    self.metrics.profile('transcribe'):
+                results = self.batch_engine.transcribe([(audio[start:end], start) for start, end, _, _ in group],
+                                                       options, translate)
+                span['batch_size'] = self.batch_engine.batch_size
+            wall = time.perf_counter() - started
+            self.send_message('log', f'Décodage par lots: {seconds / max(wall, 1e-9):.1f} s d\'audio par seconde '
+                                     f'(lots de {self.batch_engine.batch_size} fenêtres)', 'INFO')
+            for result in results:
+                yield dict(result, language=options['language'] or result['language'])
+    
+    def escalate(self, audio, segments, options):
+        """
+        Redécoder avec le grand modèle les segments peu fiables du petit modèle
+        
+        Chaque plage de segments incertains est retranscrite par
+        escalation_model ; ses segments remplacent ceux du petit modèle et sont
+        marqués 'escalated'. Le grand modèle n'est chargé qu'à la première
+        escalade.
+        
+        Returns:
+            list: Segments, dans l'ordre chronologique
+        """
+        ranges = escalation_ranges(segments, self.escalation_thresholds)
+        if not ranges:
+            return segments
+        
+        model = registry.get(self.escalation_model, self.device, self.dtype)
+        lock = registry.inference_lock(self.escalation_model, self.device, self.dtype)
+        replaced = {}
+        seconds = sum(end - start for start, end, _ in ranges)
+        with self.metrics.span('escalation', audio_seconds=seconds, model_size=self.escalation_model,
+                               ranges=len(ranges)):
+            for start, end, indices in ranges:
+                first, last = int(start * SAMPLE_RATE), int(end * SAMPLE_RATE)
+                if last <= first:
+                    continue
+                with lock:
+                    result = transcribe_slice(model, audio[first:last], first, options, first)
+                for segment in result['segments']:
+                    segment['escalated'] = True
+                    # Le grand modèle ne déborde pas de la plage qu'il remplace
+                    segment['start'] = max(start, min(segment['start'], end))
+                    segment['end'] = max(segment['start'], min(segment['end'], end))
+                replaced[indices[0]] = result['segments']
+                replaced.update({index: [] for index in indices[1:]})
+        
+        escalated = []
+        for index, segment in enumerate(segments):
+            escalated.extend(replaced.get(index, [segment]))
+        return escalated
+    
+    def transcribe_chunks(self, audio, pcm_path=None, speech_map=None, journal=None):
+        """
+        Transcrire un audio morceau par morceau, avec reprise sur le journal
+        
+        Les morceaux sont transcrits en parallèle par le pool de workers pour
+        un audio long (chunk_workers > 1), séquentiellement sinon. Chaque
+        morceau terminé est validé dans le journal ; une transcription
+        interrompue reprend après le dernier morceau validé.
+        
+        Args:
+            audio: Tableau float32 16 kHz
+            pcm_path: Fichier PCM correspondant à audio, s'il existe déjà
+            speech_map: Régions de parole si audio a été compacté par le pré-filtre
+            journal: TranscriptJournal de la vidéo
+        
+        Returns:
+            dict: Résultat au format de model.transcribe, segments (et
+                  'translation' : traduction anglaise, si demandée) gardés
+                  en colonnes (SegmentStore)
+        """
+        options = self.transcribe_options()
+        resume_from = 0
+        if journal and journal.committed_until:
+            resume_from = int(journal.committed_until * SAMPLE_RATE)
+            position = int(journal.committed_until)
+            self.send_message('log', f'Reprise de la transcription à {position // 60}:{position % 60:02d}', 'INFO')
+            self.send_message('segments', list(journal.segments.segments()), journal.language)
+            if options['language'] is None:
+                options['language'] = journal.language
+        pending = not (journal and journal.done) and resume_from < len(audio)
+        
+        # Langue détectée une fois pour tous les morceaux
+        if pending and options['language'] is None:
+            options['language'] = self.detect_language(audio[resume_from:])
+        
+        # Traduction anglaise décodée sur la même sortie de l'encodeur (inutile pour une vidéo en anglais)
+        translate = self.translate and options['language'] != 'en'
+        if self.translate and not translate:
+            self.send_message('log', 'Vidéo en anglais: pas de traduction', 'INFO')
+        batched = self.batch_engine is not None and (self.batch_size > 1 or translate)
+        
+        parallel = self.chunk_workers > 1 and not translate and len(audio) >= self.long_audio_seconds * SAMPLE_RATE
+        chunks = []
+        if pending:
+            chunk_seconds = self.chunk_seconds if parallel else self.checkpoint_seconds
+            if batched and not parallel:
+                # Assez de morceaux pour remplir un lot, même pour une vidéo courte
+                remaining = (len(audio) - resume_from) / SAMPLE_RATE
+                chunk_seconds = max(60, min(chunk_seconds, remaining / self.batch_size))
+            chunks = plan_chunks(audio, chunk_seconds, start=resume_from)
+        
+        temp_pcm = None
+        if chunks and parallel:
+            self.send_message('log', f'Audio long: {len(chunks)} morceaux sur {self.chunk_workers} workers', 'INFO')
+            if self._chunk_pool is None:
+                self._chunk_pool = ChunkPool(self.model_size, self.device, self.dtype, self.chunk_workers)
+            # Les workers lisent l'audio depuis un fichier PCM projeté en mémoire
+            if pcm_path is None:
+                temp_pcm = job_dir(len(audio) * 4, self.shm_max_bytes)
+                pcm_path = temp_pcm / f'audio{PCM_SUFFIX}'
+                np.asarray(audio, dtype=np.float32).tofile(pcm_path)
+            results = self._chunk_pool.transcribe(pcm_path, chunks, options)
+        elif batched:
+            results = self._transcribe_batched(audio, chunks, options, translate)
+        else:
+            results = self._transcribe_sequential(audio, chunks, options)
+        
+        # Segments de chaque morceau ajoutés en colonnes : pas de liste de dict sur toute la vidéo
+        segments = journal.segments if journal else SegmentStore.empty()
+        translation = journal.translation if journal else SegmentStore.empty('en')
+        language = None
+        # Après une reprise, le premier morceau recouvre la jointure avec les segments du journal
+        stitcher = Stitcher(len(segments), segments.last())
+        translation_stitcher = Stitcher(len(translation), translation.last())
+        audio_seconds = (len(audio) - resume_from) / SAMPLE_RATE if chunks else 0.0
+        try:
+            with self.metrics.span('transcription', audio_seconds=audio_seconds, chunks=len(chunks),
+                                   parallel=parallel, model_size=self.model_size, device=self.device,
+                                   dtype=self.dtype, translate=translate):
+                for index, (chunk, result) in enumerate(zip(chunks, results), 1):
+                    if self.escalation_model:
+                        result = dict(result, segments=self.escalate(audio, result['segments'], options))
+                    kept = stitcher.add(result, chunk)
+                    kept_translation = None
+                    if translate:
+                        kept_translation = translation_stitcher.add({'segments': result['translation']}, chunk)
+                    if speech_map:
+                        speech_map.remap_segments(kept)
+                        if kept_translation:
+                            speech_map.remap_segments(kept_translation)
+                    language = options['language'] or result['language']
+                    if journal:
+                        journal.commit_chunk(chunk[3] / SAMPLE_RATE, kept, language, kept_translation)
+                    else:
+                        segments.extend(kept)
+                        translation.extend(kept_translation or [])
+                    # Segments provisoires (avant nettoyage des répétitions), pour un suivi en direct
+                    self.send_message('segments', kept, language)
+                    self.send_message('detail', f'Morceau {index}/{len(chunks)} transcrit', 50 + int(30 * index / len(chunks)))
+        finally:
+            if temp_pcm:
+                remove_job_dir(temp_pcm)
+        
+        if journal:
+            language = journal.language
+        segments.language = language or options['language']
+        result = {
+            'text': segments.join_text(),
+            'segments': segments,
+            'language': language or options['language'] or 'unknown',
+        }
+        if translate:
+            result['translation'] = translation
+        return result
     
-    def transcribe_audio(self, audio_path):
+    def close(self):
+        """Arrêter les workers de transcription parallèle"""
+        if self._chunk_pool:
+            self._chunk_pool.close()
+            self._chunk_pool = None
+    
+    def transcribe_audio(self, audio_path, journal=None):
         """
         Transcrire un fichier audio avec Whisper
         
+        Args:
+            audio_path: Fichier audio (PCM brut ou format lu par ffmpeg)
+            journal: TranscriptJournal où valider les segments au fil de l'eau
+        
         Returns:
             dict: Résultat de la transcription ou None si échec
         """
@@ -199,28 +564,54 @@ class YouTubeTranscriber:
             self.send_message('detail', 'Début de la transcription avec Whisper...', 50)
             self.send_message('log', 'Transcription en cours (cela peut prendre quelques minutes)...', 'INFO')
             
-            # Options de transcription
-            options = {
-                'language': None,  # Détection automatique de la langue
-                'task': 'transcribe',  # 'transcribe' ou 'translate' (vers anglais)
-                'temperature': 0.1,  # Un peu de variation pour éviter les hallucinations
-                'no_speech_threshold': 0.8,  # Plus agressif pour détecter le silence
-                'logprob_threshold': -1.0,
-                'compression_ratio_threshold': 2.4,
-                'condition_on_previous_text': False,  # Désactiver pour éviter les boucles de répétition
-                'fp16': self.device == 'cuda',  # FP16 seulement sur GPU
-                'verbose': False
-            }
-
+            # Le PCM est projeté en mémoire, sans second décodage ffmpeg
+            audio = load_audio(audio_path)
+            pcm_path = audio_path if is_pcm(audio_path) else None
+            duration = len(audio) / SAMPLE_RATE
+            
+            # Pré-filtre : ne garder que les régions de parole
+            speech_map = None
+            if self.vad:
+                with self.metrics.span('vad', audio_seconds=len(audio) / SAMPLE_RATE):
+                    speech_map = detect_speech(audio)
+                skipped = speech_map.skipped_seconds
+                total = speech_map.total_seconds
+                self.send_message('log', f'Pré-filtre VAD: {skipped:.0f} s ignorées sur {total:.0f} s '
+                                         f'({100 * skipped / max(total, 1e-9):.0f}%)', 'INFO')
+                audio = speech_map.compact(audio)
+                pcm_path = None
+            
             # Transcrire
-            result = self.model.transcribe(audio_path, **options)
+            if speech_map and not speech_map.regions:
+                result = {'text': '', 'segments': SegmentStore.empty(), 'language': 'unknown'}
+            else:
+                result = self.transcribe_chunks(audio, pcm_path, speech_map, journal)
+            
+            result['duration'] = duration
+            if speech_map:
+                result['vad'] = speech_map.report()
+            if self.escalation_model:
+                result['cascade'] = cascade_report(result['segments'].segments(), self.model_size,
+                                                   self.escalation_model)
+                escalated = result['cascade']['escalated_fraction']
+                self.send_message('log', f'Cascade: {100 * escalated:.0f}% de l\'audio redécodé par '
+                                         f'{self.escalation_model}', 'INFO')
 
             # Informer de la langue détectée
             detected_language = result.get('language', 'unknown')
             self.send_message('log', f'Langue détectée: {detected_language}', 'INFO')
 
-            # Post-traitement: nettoyer les répétitions excessives
-            result['text'] = self.clean_repetitions(result['text'])
+            # Post-traitement: supprimer les boucles de répétition, segment par segment
+            with self.metrics.span('clean_repetitions', bytes=len(result['text'])):
+                removed = 0
+                for name in ('segments', 'translation'):
+                    if name in result:
+                        texts, count = clean_texts(result[name].texts(), **self.repetition_thresholds)
+                        result[name] = result[name].replace_texts(texts)
+                        removed += count
+                result['text'] = result['segments'].join_text()
+            if removed:
+                self.send_message('log', f'Répétitions supprimées: {removed} mots', 'INFO')
 
             self.send_message('detail', 'Transcription terminée!', 80)
 
@@ -230,10 +621,18 @@ class YouTubeTranscriber:
             self.send_message('log', f'Erreur lors de la transcription: {str(e)}', 'ERROR')
             return None
     
-    def save_transcription(self, transcription, video_title):
+    def save_transcription(self, transcription, video_title, video_id=None):
         """
         Sauvegarder la transcription dans un fichier texte
         
+        Le nom du fichier contient l'ID de la vidéo s'il est connu : une vidéo
+        retraitée écrase son fichier au lieu de créer un doublon. La traduction
+        anglaise, si la transcription en contient une, est écrite à côté
+        (même nom, suffixe .en.txt). Les segments horodatés de chacun sont
+        gardés à côté (.segments.npz) et les formats output_formats en sont
+        écrits (.srt, .vtt, .json). Les deux textes sont ajoutés à l'index de
+        recherche, segment par segment avec leurs timestamps.
+        
         Returns:
             Path: Chemin du fichier sauvegardé ou None si échec
         """
@@ -241,10 +640,13 @@ class YouTubeTranscriber:
             # Nettoyer le titre pour le nom de fichier
             clean_title = self.clean_filename(video_title)
             
-            # Créer le nom de fichier avec timestamp pour éviter les doublons
-            from datetime import datetime
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{clean_title}_{timestamp}.txt"
+            if video_id:
+                filename = f"{clean_title}_{video_id}.txt"
+            else:
+                # Sans ID, utiliser un timestamp pour éviter les doublons
+                from datetime import datetime
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                filename = f"{clean_title}_{timestamp}.txt"
             filepath = self.output_dir / filename
             
             # Écrire la transcription (titre + texte uniquement)
@@ -252,93 +654,193 @@ class YouTubeTranscriber:
                 f.write(f"Titre: {video_title}\n")
                 f.write("="*80 + "\n\n")
                 f.write(transcription['text'].strip())
-            
             self.send_message('log', f'Transcription sauvegardée: {filename}', 'SUCCESS')
+            self.save_segments(filepath, transcription['segments'], transcription.get('language'),
+                               video_title, video_id)
+            
+            # Traduction anglaise, à côté : <titre>_<id>.en.txt
+            if transcription.get('translation') is not None:
+                translation = as_store(transcription['translation'], 'en')
+                translation_path = filepath.with_name(f'{filepath.stem}.en.txt')
+                with open(translation_path, 'w', encoding='utf-8') as f:
+                    f.write(f"Titre: {video_title}\n")
+                    f.write("="*80 + "\n\n")
+                    f.write(translation.join_text().strip())
+                self.send_message('log', f'Traduction sauvegardée: {translation_path.name}', 'SUCCESS')
+                self.save_segments(translation_path, translation, 'en', video_title, video_id)
+            
+            self.index_transcription(filepath, transcription, video_title, video_id)
             return filepath
             
         except Exception as e:
             self.send_message('log', f'Erreur lors de la sauvegarde: {str(e)}', 'ERROR')
             return None
     
-    def process_video(self, url):
+    def save_segments(self, filepath, segments, language, video_title, video_id=None):
+        """
+        Garder les segments d'un fichier de transcription (.segments.npz) et
+        en écrire les formats demandés (même nom, extension du format)
+
+        Args:
+            segments: SegmentStore, ou liste de dict (transcription relue du cache)
+        """
+        store = as_store(segments, language)
+        store.save(store_path(filepath))
+        for fmt in self.output_formats:
+            path = store.export(filepath.with_suffix(f'.{fmt}'), fmt, title=video_title, video_id=video_id)
+            self.send_message('log', f'{fmt.upper()} sauvegardé: {path.name}', 'INFO')
+    
+    def index_transcription(self, filepath, transcription, video_title, video_id=None):
+        """Ajouter une transcription sauvegardée (et sa traduction) à l'index de recherche"""
+        try:
+            with self.metrics.span('index', video_id=video_id):
+                self.search_index.add(filepath, video_title, transcription, video_id)
+                if transcription.get('translation') is not None:
+                    self.search_index.add(filepath.with_name(f'{filepath.stem}.en.txt'), video_title,
+                                          dict(transcription, language='en'), video_id,
+                                          transcription['translation'])
+        except Exception as e:
+            # Le fichier est écrit : l'index se rattrape avec python search.py --rebuild
+            self.send_message('log', f"Impossible d'indexer la transcription: {e}", 'WARNING')
+    
+    def cached_transcription(self, url):
+        """
+        Transcription en cache d'une vidéo (sans téléchargement ni modèle)
+        
+        Returns:
+            dict: Transcription (text, segments, language, title), ou None si absente
+        """
+        video_id = extract_video_id(url)
+        if not self.cache or not video_id:
+            return None
+        return self.cache.get(video_id, self.model_size, self.cache_options())
+    
+    def process_cached(self, url):
+        """
+        Sauvegarder la transcription depuis le cache, sans téléchargement ni modèle
+        
+        Returns:
+            bool: Succès de la sauvegarde, ou None si la vidéo n'est pas en cache
+        """
+        cached = self.cached_transcription(url)
+        if not cached:
+            return None
+        
+        self.send_message('log', f'Transcription trouvée dans le cache: {cached["title"]}', 'SUCCESS')
+        saved_path = self.save_transcription(cached, cached['title'], extract_video_id(url))
+        if saved_path:
+            self.send_message('detail', 'Terminé!', 100)
+        return bool(saved_path)
+    
+    def transcribe_and_save(self, audio_path, video_title, video_id=None):
+        """
+        Transcrire un fichier audio déjà téléchargé et sauvegarder le résultat
+        
+        Returns:
+            bool: True si succès, False sinon
+        """
+        return self.transcribe_file(audio_path, video_title, video_id) is not None
+    
+    def transcribe_file(self, audio_path, video_title, video_id=None):
+        """
+        Transcrire un fichier audio, sauvegarder et mettre en cache le résultat
+        
+        Returns:
+            dict: Transcription (text, segments, language, path du fichier
+                  sauvegardé), ou None si échec
+        """
+        # Transcrire (les segments sont validés dans le journal au fil de l'eau)
+        journal = self.open_journal(video_id, video_title) if video_id else None
+        transcription = self.transcribe_audio(audio_path, journal)
+        if not transcription:
+            return None
+        
+        if self.cache and video_id:
+            try:
+                self.cache.put(video_id, self.model_size, self.cache_options(),
+                               transcription, video_title)
+            except Exception as e:
+                self.send_message('log', f'Impossible de mettre en cache la transcription: {e}', 'WARNING')
+        
+        # Sauvegarder
+        self.send_message('detail', 'Sauvegarde de la transcription...', 90)
+        with self.metrics.span('save', video_id=video_id) as span:
+            saved_path = self.save_transcription(transcription, video_title, video_id)
+            span['bytes'] = saved_path.stat().st_size if saved_path else 0
+        
+        if saved_path:
+            # Le résultat est sauvegardé (et en cache) : le journal n'est plus utile
+            if journal:
+                journal.mark_done()
+                journal.remove()
+            self.send_message('detail', 'Terminé!', 100)
+            return dict(transcription, path=saved_path)
+        else:
+            return None
+    
+    def discard_audio(self, audio_path):
+        """Supprimer le fichier audio temporaire d'une vidéo (et son dossier de travail)"""
+        if not audio_path:
+            return
+        audio_path = Path(audio_path)
+        if is_job_dir(audio_path.parent):
+            remove_job_dir(audio_path.parent)
+            self.send_message('log', 'Fichier audio temporaire supprimé', 'INFO')
+        elif audio_path.exists():
+            try:
+                audio_path.unlink()
+                self.send_message('log', 'Fichier audio temporaire supprimé', 'INFO')
+            except Exception as e:
+                self.send_message('log', f'Impossible de supprimer {audio_path.name}: {e}', 'WARNING')
+    
+    def process_video(self, url, raise_errors=False):
         """
         Traiter une vidéo complète : télécharger, transcrire, sauvegarder
         
+        Args:
+            raise_errors: Lever DownloadFailed si le téléchargement échoue
+                          (pour distinguer erreurs définitives et temporaires)
+        
         Returns:
             bool: True si succès, False sinon
         """
         audio_path = None
         try:
-            # Nettoyer les anciens fichiers temporaires au début
-            self.cleanup_temp_files()
+            # Transcription déjà effectuée : pas de téléchargement ni de modèle
+            cached = self.process_cached(url)
+            if cached is not None:
+                return cached
             
             # Télécharger l'audio
-            audio_path, video_title = self.download_audio(url)
+            audio_path, video_title = self.download_audio(url, raise_errors)
             if not audio_path:
                 return False
             
-            # Transcrire
-            transcription = self.transcribe_audio(audio_path)
-            if not transcription:
-                return False
-            
-            # Sauvegarder
-            self.send_message('detail', 'Sauvegarde de la transcription...', 90)
-            saved_path = self.save_transcription(transcription, video_title)
-            
-            if saved_path:
-                self.send_message('detail', 'Terminé!', 100)
-                return True
-            else:
-                return False
-                
+            return self.transcribe_and_save(audio_path, video_title, extract_video_id(url))
+        
+        except DownloadFailed:
+            raise
         except Exception as e:
             self.send_message('log', f'Erreur inattendue: {str(e)}', 'ERROR')
             return False
             
         finally:
-            # Nettoyer le fichier audio temporaire
-            if audio_path and Path(audio_path).exists():
-                try:
-                    Path(audio_path).unlink()
-                    self.send_message('log', 'Fichier audio temporaire supprimé', 'INFO')
-                except Exception as e:
-                    self.send_message('log', f'Impossible de supprimer {Path(audio_path).name}: {e}', 'WARNING')
-            
-            # Nettoyer tous les fichiers temporaires Whisper
-            self.cleanup_temp_files()
+            # Supprimer le dossier de travail de la vidéo
+            self.discard_audio(audio_path)
     
-    def cleanup_temp_files(self):
-        """Nettoyer les fichiers temporaires de yt-dlp et Whisper"""
+    def cleanup_temp_files(self, max_age_hours=1):
+        """
+        Supprimer les dossiers de travail laissés par un arrêt brutal
+        
+        À appeler au démarrage : chaque vidéo supprime son propre dossier en
+        fin de traitement, seuls les orphelins de plus de max_age_hours (et
+        dont le processus n'existe plus) sont concernés.
+        """
         try:
-            temp_dir = Path(tempfile.gettempdir())
-            
-            # Patterns de fichiers à nettoyer
-            patterns = [
-                'whisper_temp_*.mp3',  # Nos fichiers temporaires
-                '*.part',               # Fichiers partiels yt-dlp
-                '*.ytdl',               # Fichiers de verrouillage yt-dlp
-                '*.info.json',          # Métadonnées yt-dlp
-                'tmp*.mp3',             # Autres fichiers temporaires
-                'tmp*.m4a',
-                'tmp*.webm'
-            ]
-            
-            cleaned_count = 0
-            for pattern in patterns:
-                for file in temp_dir.glob(pattern):
-                    try:
-                        # Ne supprimer que les fichiers de plus de 1 heure
-                        if (Path(file).stat().st_mtime < (Path(file).stat().st_mtime - 3600)):
-                            file.unlink()
-                            cleaned_count += 1
-                    except:
-                        pass
-            
+            cleaned_count = sweep(max_age_hours * 3600)
             if cleaned_count > 0:
-                self.send_message('log', f'Nettoyage: {cleaned_count} fichiers temporaires supprimés', 'INFO')
-                
-        except Exception as e:
+                self.send_message('log', f'Nettoyage: {cleaned_count} dossiers temporaires orphelins supprimés', 'INFO')
+        except Exception:
             # Ne pas faire échouer le processus si le nettoyage échoue
             pass
 
@@ -0,0 +1,28 @@
+import re
+
+# Identifiant YouTube (11 caractères) dans les formes d'URL courantes
+VIDEO_ID_PATTERN = re.compile(
+    r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/|embed/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})'
+)
+
+# Playlist (sans vidéo précise) ou chaîne : @nom, /channel/UC..., /c/nom, /user/nom
+COLLECTION_PATTERN = re.compile(
+    r'youtube\.com/(?:playlist\?(?:.*&)?list=|@[^/?#\s]+|channel/[^/?#\s]+|c/[^/?#\s]+|user/[^/?#\s]+)'
+)
+
+
+def is_youtube_url(url):
+    """Ligne à garder : URL YouTube non vide (vidéo, playlist ou chaîne)"""
+    url = url.strip()
+    return bool(url) and ('youtube.com' in url or 'youtu.be' in url)
+
+
+def is_collection_url(url):
+    """Playlist ou chaîne à développer en vidéos (une vidéo lue dans une playlist reste une vidéo)"""
+    return extract_video_id(url) is None and COLLECTION_PATTERN.search(url) is not None
+
+
+def extract_video_id(url):
+    """Extraire l'identifiant de la vidéo depuis l'URL, sans requête réseau"""
+    match = VIDEO_ID_PATTERN.search(url)
+    return match.group(1) if match else None
@@ -0,0 +1,147 @@
+import bisect
+
+import numpy as np
+
+from audio import SAMPLE_RATE
+
+
+class SpeechMap:
+    def __init__(self, regions, total_samples):
+        """
+        Régions de parole d'un audio et correspondance des timestamps
+
+        Args:
+            regions: Liste triée de (début, fin) en échantillons dans l'audio original
+            total_samples: Nombre d'échantillons de l'audio original
+        """
+        self.regions = regions
+        self.total_samples = total_samples
+
+        # Début de chaque région dans l'audio compacté (en secondes)
+        self._compact_starts = []
+        position = 0
+        for start, end in regions:
+            self._compact_starts.append(position / SAMPLE_RATE)
+            position += end - start
+
+    @property
+    def total_seconds(self):
+        return self.total_samples / SAMPLE_RATE
+
+    @property
+    def speech_seconds(self):
+        return sum(end - start for start, end in self.regions) / SAMPLE_RATE
+
+    @property
+    def skipped_seconds(self):
+        return self.total_seconds - self.speech_seconds
+
+    def compact(self, audio):
+        """Audio ne contenant que les régions de parole, mises bout à bout"""
+        if not self.regions:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate([audio[start:end] for start, end in self.regions]).astype(np.float32, copy=False)
+
+    def to_original(self, t, is_end=False):
+        """
+        Convertir un timestamp de l'audio compacté vers l'audio original
+
+        Une fin de segment tombant pile à la jonction de deux régions est
+        rattachée à la région précédente (is_end=True).
+        """
+        if not self.regions:
+            return t
+        search = bisect.bisect_left if is_end else bisect.bisect_right
+        index = max(0, search(self._compact_starts, t) - 1)
+        start, end = self.regions[index]
+        original = start / SAMPLE_RATE + (t - self._compact_starts[index])
+        return min(original, end / SAMPLE_RATE)
+
+    def remap_segments(self, segments):
+        """Replacer les segments Whisper sur la chronologie originale (en place)"""
+        for segment in segments:
+            segment['start'] = self.to_original(segment['start'])
+            segment['end'] = max(segment['start'], self.to_original(segment['end'], is_end=True))
+            for word in segment.get('words', []):
+                word['start'] = self.to_original(word['start'])
+                word['end'] = self.to_original(word['end'], is_end=True)
+        return segments
+
+    def report(self):
+        """Résumé du pré-filtre (ajouté au résultat de la transcription)"""
+        return {
+            'total_seconds': round(self.total_seconds, 2),
+            'speech_seconds': round(float(self.speech_seconds), 2),
+            'skipped_seconds': round(float(self.skipped_seconds), 2),
+            'regions': len(self.regions),
+        }
+
+
+def frame_energy_db(audio, frame_seconds=0.03, block_seconds=60):
+    """
+    Énergie (dB) de chaque trame de l'audio
+
+    Calculée par blocs pour garder une mémoire constante sur les longs audios.
+    """
+    frame = int(SAMPLE_RATE * frame_seconds)
+    n_frames = len(audio) // frame
+    energy = np.empty(n_frames, dtype=np.float32)
+    frames_per_block = max(1, int(block_seconds / frame_seconds))
+
+    for first in range(0, n_frames, frames_per_block):
+        last = min(n_frames, first + frames_per_block)
+        block = np.asarray(audio[first * frame:last * frame], dtype=np.float32).reshape(last - first, frame)
+        energy[first:last] = 10 * np.log10(np.mean(block * block, axis=1) + 1e-10)
+    return energy
+
+
+def detect_speech(audio, frame_seconds=0.03, margin_db=12.0, floor_db=-50.0,
+                  min_speech=0.25, min_silence=0.6, padding=0.25):
+    """
+    Détecter les régions de parole par seuil d'énergie adaptatif
+
+    Le seuil est placé à margin_db au-dessus du bruit de fond estimé (10e
+    percentile de l'énergie), sans dépasser le niveau de la parole (90e
+    percentile) moins 20 dB ni descendre sous floor_db. Les pauses plus
+    courtes que min_silence sont comblées, les régions plus courtes que
+    min_speech ignorées, et chaque région est élargie de padding.
+
+    Returns:
+        SpeechMap: Régions de parole
+    """
+    energy = frame_energy_db(audio, frame_seconds)
+    if len(energy) == 0:
+        return SpeechMap([], len(audio))
+
+    noise, level = np.percentile(energy, [10, 90])
+    threshold = max(min(float(noise) + margin_db, float(level) - 20.0), floor_db)
+    active = energy > threshold
+
+    # Trames actives -> régions (en trames)
+    changes = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+    runs = list(zip(changes[::2], changes[1::2]))
+
+    # Combler les pauses courtes
+    merged = []
+    gap = min_silence / frame_seconds
+    for start, end in runs:
+        if merged and start - merged[-1][1] < gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    # Ignorer les bruits trop courts, élargir et convertir en échantillons
+    frame = int(SAMPLE_RATE * frame_seconds)
+    pad = int(padding * SAMPLE_RATE)
+    regions = []
+    for start, end in merged:
+        if (end - start) * frame_seconds < min_speech:
+            continue
+        start = max(0, int(start) * frame - pad)
+        end = min(len(audio), int(end) * frame + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    return SpeechMap(regions, len(audio))